@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+omnifocus_cli.py 基准测试（基于 fake_omnifocus.py 的内存后端，无需 macOS）
+
+每次后端调用注入固定延迟（模拟 osascript 启动 + 编译 + Apple Event 往返），
+导出/探测再按任务数注入传输开销，比较:
+  - reads:  一组读命令在快照缓存关闭 / 开启时的耗时与后端调用次数
+  - writes: N 次单条写命令 与 一次 batch 提交 N 个操作
+
+Usage:
+    python3 bench_omnifocus.py                                # 默认规模
+    python3 bench_omnifocus.py --tasks 1000,8000 --latency 0.15 --row-cost 0.00002
+    python3 bench_omnifocus.py --scenarios writes --writes 100 --json > results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+import omnifocus_cli  # noqa: E402
+from fake_omnifocus import FakeBackend, FakeOmniFocus  # noqa: E402
+
+SCENARIOS = ("reads", "writes")
+READ_COMMANDS = (
+    ("status", lambda: omnifocus_cli.get_status()),
+    ("list", lambda: omnifocus_cli.list_tasks()),
+    ("inbox", lambda: omnifocus_cli.list_inbox()),
+    ("flagged", lambda: omnifocus_cli.list_flagged()),
+    ("due today", lambda: omnifocus_cli.list_due_by_range("today")),
+    ("due week", lambda: omnifocus_cli.list_due_by_range("week")),
+    ("due overdue", lambda: omnifocus_cli.list_due_by_range("overdue")),
+    ("due ranges", lambda: omnifocus_cli.list_due_ranges(["overdue", "today", "tomorrow", "week"])),
+    ("forecast", lambda: omnifocus_cli.forecast(7)),
+    ("projects", lambda: omnifocus_cli.list_projects()),
+    ("contexts", lambda: omnifocus_cli.list_contexts()),
+)
+
+
+class Bench:
+    """在独立的假数据库和缓存目录上运行场景"""
+
+    def __init__(self, args):
+        self.args = args
+        self.cache_dir = tempfile.TemporaryDirectory()
+        omnifocus_cli.CACHE_DIR = self.cache_dir.name
+
+    def close(self):
+        if omnifocus_cli._snapshot_cache is not None:
+            omnifocus_cli._snapshot_cache.close()
+            omnifocus_cli._snapshot_cache = None
+        self.cache_dir.cleanup()
+
+    def _backend(self, tasks: int) -> FakeBackend:
+        backend = FakeBackend(FakeOmniFocus.seeded(tasks=tasks, seed=self.args.seed),
+                              latency=self.args.latency, jitter=self.args.jitter,
+                              row_cost=self.args.row_cost)
+        omnifocus_cli.set_backend(backend)
+        if omnifocus_cli._snapshot_cache is not None:
+            omnifocus_cli._snapshot_cache.clear()
+        return backend
+
+    def _measure(self, label: str, tasks: int, backend: FakeBackend, fn) -> dict:
+        walls = []
+        calls = []
+        by_kind = {}
+        for _ in range(self.args.repeat):
+            backend.reset_counts()
+            started = time.perf_counter()
+            fn()
+            walls.append(time.perf_counter() - started)
+            calls.append(backend.total_calls())
+            for kind, count in backend.calls.items():
+                by_kind[kind] = by_kind.get(kind, 0) + count
+        return {
+            "case": label,
+            "tasks": tasks,
+            "runs": self.args.repeat,
+            "wall_best": min(walls),
+            "wall_median": statistics.median(walls),
+            "calls": statistics.median(calls),
+            "calls_by_kind": {k: v / self.args.repeat for k, v in sorted(by_kind.items())},
+        }
+
+    def reads(self, tasks: int) -> list:
+        """每轮依次执行全部读命令 rounds 次"""
+        def run_reads():
+            for _ in range(self.args.rounds):
+                for _, command in READ_COMMANDS:
+                    command()
+
+        results = []
+        for mode in ("off", "use"):
+            backend = self._backend(tasks)
+            omnifocus_cli.CACHE_MODE = mode
+            if mode == "use":
+                omnifocus_cli.load_snapshot()  # 预热，只比较命中缓存后的稳态
+            results.append(self._measure(f"reads cache={mode}", tasks, backend, run_reads))
+        return results
+
+    def writes(self, tasks: int) -> list:
+        """单条 set-due 命令逐个执行 与 同样的操作一次 batch"""
+        omnifocus_cli.CACHE_MODE = "use"
+        results = []
+        for label in ("single commands", "batch"):
+            backend = self._backend(tasks)
+            open_tasks = [t for t in backend.model.tasks.values() if not t["completed"]]
+            targets = [t["name"] for t in open_tasks[:self.args.writes]]
+            ops = [{"op": "set-due", "task": name, "date": "+3d"} for name in targets]
+
+            if label == "batch":
+                def run():
+                    _, errors = omnifocus_cli.run_batch(ops)
+                    assert not errors, errors
+            else:
+                def run():
+                    for name in targets:
+                        omnifocus_cli.set_task_due(name, "+3d")
+            results.append(self._measure(f"writes {label} x{len(targets)}", tasks, backend, run))
+        return results
+
+
+def _sizes(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark omnifocus_cli.py against the in-memory fake OmniFocus")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument("--tasks", type=_sizes, default=[1000, 8000], help="Database sizes in tasks (default 1000,8000)")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per backend call, like one osascript run (default 0.1)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency per call, up to this many seconds")
+    parser.add_argument("--row-cost", type=float, default=0.00002, help="Seconds per task exported (default 0.00002)")
+    parser.add_argument("--rounds", type=int, default=2, help="Passes over the read commands per run (default 2)")
+    parser.add_argument("--writes", type=int, default=50, help="Tasks edited in the writes scenario (default 50)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case (default 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the fake database")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    bench = Bench(args)
+    results = []
+    try:
+        for scenario in scenarios:
+            for tasks in args.tasks:
+                for result in getattr(bench, scenario)(tasks):
+                    results.append(result)
+                    if not args.json:
+                        print(f"{result['case']:<28} {tasks:>6} tasks  best {result['wall_best'] * 1000:9.1f}ms  "
+                              f"median {result['wall_median'] * 1000:9.1f}ms  {result['calls']:>5g} calls")
+    finally:
+        bench.close()
+
+    if args.json:
+        print(json.dumps({
+            "config": {k: v for k, v in vars(args).items() if k != "json"},
+            "results": results,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+内存版 OmniFocus 模型与后端
+实现 omnifocus_cli.OmniFocusBackend 接口，模拟任务、项目、上下文、文件夹、
+截止/开始日期和重复规则，可注入每次调用的延迟，用于在 Linux 上运行和基准测试
+整个命令集，无需 macOS 或 osascript。
+
+两种用法:
+  - 代码中: set_backend(FakeBackend(FakeOmniFocus.seeded(tasks=8000), latency=0.05))
+  - 命令行: OMNIFOCUS_BACKEND=fake python3 omnifocus_cli.py list
+    （状态保存在 OMNIFOCUS_FAKE_STATE 指定的 JSON 文件，首次使用时生成示例数据）
+
+Usage:
+    python3 fake_omnifocus.py seed state.json --tasks 8000   # 生成示例数据库
+"""
+
+import argparse
+import calendar
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from omnifocus_cli import OmniFocusBackend  # noqa: E402
+
+BUILT_IN_PERSPECTIVES = ["Inbox", "Projects", "Tags", "Forecast", "Flagged", "Review", "Completed", "Changes"]
+DATE_FIELDS = ("due", "defer", "modified", "completed_at")
+
+WORDS = ("review", "draft", "call", "email", "plan", "fix", "buy", "book", "write", "read",
+         "budget", "report", "invoice", "meeting", "design", "release", "backup", "renew")
+
+
+def _iso_utc(dt: Optional[datetime]) -> Optional[str]:
+    """本地 naive datetime -> 与 JXA toISOString() 相同格式的 UTC 字符串"""
+    if dt is None:
+        return None
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def next_occurrence(rule: str, dt: datetime) -> datetime:
+    """按 iCalendar 规则（FREQ/INTERVAL）推算下一次日期"""
+    parts = dict(p.split("=", 1) for p in rule.upper().split(";") if "=" in p)
+    freq = parts.get("FREQ", "DAILY")
+    interval = int(parts.get("INTERVAL", "1") or 1)
+    if freq == "WEEKLY":
+        return dt + timedelta(weeks=interval)
+    if freq in ("MONTHLY", "YEARLY"):
+        months = interval * (12 if freq == "YEARLY" else 1)
+        month_index = dt.month - 1 + months
+        year, month = dt.year + month_index // 12, month_index % 12 + 1
+        return dt.replace(year=year, month=month, day=min(dt.day, calendar.monthrange(year, month)[1]))
+    return dt + timedelta(days=interval)
+
+
+class FakeOmniFocus:
+    """内存中的 OmniFocus 数据库"""
+
+    def __init__(self):
+        self.tasks: Dict[str, dict] = {}
+        self.projects: Dict[str, dict] = {}
+        self.contexts: Dict[str, dict] = {}
+        self.folders: Dict[str, dict] = {}
+        self.running = True
+        self.active_perspective: Optional[str] = None
+        self._next_id = 1
+        self._last_modified = datetime.min
+
+    def _id(self, prefix: str) -> str:
+        new_id = f"{prefix}{self._next_id:06d}"
+        self._next_id += 1
+        return new_id
+
+    def _touch(self) -> datetime:
+        """严格递增的修改时间，保证每次修改都能被变化探测发现"""
+        now = datetime.now()
+        if now <= self._last_modified:
+            now = self._last_modified + timedelta(microseconds=1000)
+        self._last_modified = now
+        return now
+
+    # -- 建模 --
+
+    def add_folder(self, name: str, parent: Optional[str] = None) -> str:
+        folder_id = self._id("f")
+        self.folders[folder_id] = {"id": folder_id, "name": name, "parent": parent}
+        return folder_id
+
+    def add_project(self, name: str, folder: Optional[str] = None, status: str = "active status",
+                    note: str = "") -> str:
+        project_id = self._id("p")
+        self.projects[project_id] = {"id": project_id, "name": name, "status": status, "note": note,
+                                     "folder": folder, "modified": self._touch()}
+        return project_id
+
+    def add_context(self, name: str) -> str:
+        context_id = self._id("c")
+        self.contexts[context_id] = {"id": context_id, "name": name}
+        return context_id
+
+    def add_task(self, name: str, project: Optional[str] = None, context: Optional[str] = None,
+                 due: Optional[datetime] = None, defer: Optional[datetime] = None, flagged: bool = False,
+                 repeat: Optional[str] = None, note: str = "", completed: bool = False) -> str:
+        task_id = self._id("t")
+        self.tasks[task_id] = {
+            "id": task_id, "name": name, "note": note, "completed": completed, "flagged": flagged,
+            "due": due, "defer": defer, "modified": self._touch(), "completed_at": None,
+            "project": project, "context": context, "inbox": project is None, "repeat": repeat or None,
+        }
+        return task_id
+
+    @classmethod
+    def seeded(cls, tasks: int = 200, projects: Optional[int] = None, contexts: int = 12,
+               folders: int = 6, seed: int = 0) -> "FakeOmniFocus":
+        """
+        生成一个随机但可复现的数据库
+
+        Args:
+            tasks: 任务数
+            projects: 项目数（默认约每 25 个任务一个）
+            contexts: 上下文数
+            folders: 顶层文件夹数
+            seed: 随机种子
+
+        Returns:
+            FakeOmniFocus: 填充好的模型
+        """
+        rng = random.Random(seed)
+        model = cls()
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        folder_ids = [model.add_folder(f"Area {i}") for i in range(folders)]
+        context_ids = [model.add_context(name) for name in
+                       (["Phone", "Errands", "Office", "Home", "Computer", "Waiting"] +
+                        [f"Context {i}" for i in range(max(0, contexts - 6))])[:contexts]]
+        statuses = ["active status"] * 8 + ["on hold status", "done status"]
+        project_ids = [model.add_project(f"Project {i} {rng.choice(WORDS)}",
+                                         folder=rng.choice(folder_ids) if folder_ids and rng.random() < 0.8 else None,
+                                         status=rng.choice(statuses))
+                       for i in range(projects if projects is not None else max(1, tasks // 25))]
+        for i in range(tasks):
+            due = defer = None
+            r = rng.random()
+            if r < 0.35:
+                due = today + timedelta(days=rng.randint(-20, 40), hours=rng.choice((0, 9, 17)))
+            if rng.random() < 0.15:
+                defer = today + timedelta(days=rng.randint(-10, 20))
+            model.add_task(
+                f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+                project=rng.choice(project_ids) if project_ids and rng.random() < 0.9 else None,
+                context=rng.choice(context_ids) if context_ids and rng.random() < 0.6 else None,
+                due=due, defer=defer, flagged=rng.random() < 0.08,
+                repeat=rng.choice(("FREQ=DAILY", "FREQ=WEEKLY", "FREQ=MONTHLY")) if due and rng.random() < 0.1 else None,
+                completed=rng.random() < 0.2,
+            )
+        return model
+
+    # -- 后端语义 --
+
+    def export(self) -> dict:
+        """与 SNAPSHOT_JXA 输出相同结构的快照"""
+        top = {f["id"] for f in self.folders.values() if f["parent"] is None}
+        return {
+            "exported": _iso_utc(datetime.now()),
+            "tasks": [{
+                "id": t["id"], "name": t["name"], "completed": t["completed"], "flagged": t["flagged"],
+                "due": _iso_utc(t["due"]), "defer": _iso_utc(t["defer"]), "modified": _iso_utc(t["modified"]),
+                "project": t["project"], "context": t["context"], "inbox": t["inbox"], "repeat": t["repeat"],
+            } for t in self.tasks.values()],
+            "projects": [{
+                "id": p["id"], "name": p["name"], "status": p["status"], "note": p["note"],
+                "folder": p["folder"], "modified": _iso_utc(p["modified"]),
+            } for p in self.projects.values()],
+            "contexts": [dict(c) for c in self.contexts.values()],
+            "folders": [{"id": f["id"], "name": f["name"], "top": f["id"] in top} for f in self.folders.values()],
+        }
+
+    def probe(self) -> dict:
+        """与 PROBE_JXA 相同的探测字段"""
+        def latest(items):
+            return max((i["modified"] for i in items), default=None)
+        return {
+            "tasks": len(self.tasks),
+            "projects": len(self.projects),
+            "task_modified": _iso_utc(latest(self.tasks.values())),
+            "project_modified": _iso_utc(latest(self.projects.values())),
+            "contexts": [c["name"] for c in self.contexts.values()],
+            "folders": [f["name"] for f in self.folders.values()],
+            "inbox": sum(1 for t in self.tasks.values() if t["inbox"]),
+        }
+
+    def _complete(self, task: dict):
+        task["completed"] = True
+        task["completed_at"] = datetime.now()
+        if task["repeat"] and (task["due"] or task["defer"]):
+            # 重复任务：完成当前实例，并生成日期顺延的下一实例
+            clone = self.add_task(task["name"], project=task["project"], context=task["context"],
+                                  due=next_occurrence(task["repeat"], task["due"]) if task["due"] else None,
+                                  defer=next_occurrence(task["repeat"], task["defer"]) if task["defer"] else None,
+                                  flagged=task["flagged"], repeat=task["repeat"], note=task["note"])
+            self.tasks[clone]["inbox"] = task["inbox"]
+
+    def apply_op(self, op: dict) -> Optional[str]:
+        """执行一个操作，成功返回 None，失败返回错误信息"""
+        task = self.tasks.get(op["id"])
+        if task is None:
+            return f"Can't get flattened task id \"{op['id']}\"."
+        kind = op["op"]
+        if kind == "delete":
+            del self.tasks[op["id"]]
+            return None
+        if kind == "complete":
+            self._complete(task)
+        elif kind == "flag":
+            task["flagged"] = True
+        elif kind == "unflag":
+            task["flagged"] = False
+        elif kind == "toggle-flag":
+            task["flagged"] = not task["flagged"]
+        elif kind == "set-due":
+            task["due"] = op["date"]
+        elif kind == "clear-due":
+            task["due"] = None
+        elif kind == "set-defer":
+            task["defer"] = op["date"]
+        elif kind == "clear-defer":
+            task["defer"] = None
+        elif kind == "set-context":
+            if op["context_id"] not in self.contexts:
+                return f"Can't get flattened context id \"{op['context_id']}\"."
+            task["context"] = op["context_id"]
+        elif kind == "clear-context":
+            task["context"] = None
+        elif kind == "set-repeat":
+            task["repeat"] = op["rule"] or None
+        elif kind == "clear-repeat":
+            task["repeat"] = None
+        elif kind == "append-note":
+            task["note"] = f"{task['note']}\n\n{op['note']}" if task["note"] else op["note"]
+        else:
+            return f"Unknown operation '{kind}'"
+        task["modified"] = self._touch()
+        return None
+
+    # -- 持久化（命令行模式） --
+
+    def to_dict(self) -> dict:
+        def encode(item):
+            return {k: (v.isoformat() if k in DATE_FIELDS and v else v) for k, v in item.items()}
+        return {
+            "next_id": self._next_id,
+            "tasks": [encode(t) for t in self.tasks.values()],
+            "projects": [encode(p) for p in self.projects.values()],
+            "contexts": list(self.contexts.values()),
+            "folders": list(self.folders.values()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FakeOmniFocus":
+        def decode(item):
+            return {k: (datetime.fromisoformat(v) if k in DATE_FIELDS and v else v) for k, v in item.items()}
+        model = cls()
+        model._next_id = data.get("next_id", 1)
+        model.tasks = {t["id"]: decode(t) for t in data.get("tasks", [])}
+        model.projects = {p["id"]: decode(p) for p in data.get("projects", [])}
+        model.contexts = {c["id"]: c for c in data.get("contexts", [])}
+        model.folders = {f["id"]: f for f in data.get("folders", [])}
+        stamps = [i["modified"] for i in list(model.tasks.values()) + list(model.projects.values()) if i["modified"]]
+        model._last_modified = max(stamps, default=datetime.min)
+        return model
+
+
+class FakeBackend(OmniFocusBackend):
+    """
+    基于 FakeOmniFocus 的后端
+    每次调用相当于一次 osascript 往返：等待 latency（加 0~jitter 随机值），
+    导出/探测再按任务数额外等待 row_cost，模拟 Apple Event 传输开销
+    """
+
+    def __init__(self, model: FakeOmniFocus, latency: float = 0.0, jitter: float = 0.0,
+                 row_cost: float = 0.0, path: Optional[str] = None):
+        self.model = model
+        self.latency = latency
+        self.jitter = jitter
+        self.row_cost = row_cost
+        self.path = path
+        self.calls = Counter()
+        self.simulated_seconds = 0.0
+        self._rng = random.Random(0)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FakeBackend":
+        """从 JSON 状态文件加载；文件不存在时生成示例数据"""
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                model = FakeOmniFocus.from_dict(json.load(f))
+        else:
+            model = FakeOmniFocus.seeded()
+        backend = cls(model, path=path, **kwargs)
+        backend.save()
+        return backend
+
+    def save(self):
+        """写回状态文件（未指定文件时不做任何事）"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.model.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _round_trip(self, kind: str, rows: int = 0):
+        self.calls[kind] += 1
+        delay = self.latency + rows * self.row_cost
+        if self.jitter:
+            delay += self._rng.uniform(0, self.jitter)
+        self.simulated_seconds += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_counts(self):
+        self.calls.clear()
+        self.simulated_seconds = 0.0
+
+    def _not_running(self) -> Optional[dict]:
+        return None if self.model.running else {"error": "OmniFocus is not running"}
+
+    def snapshot(self) -> dict:
+        self._round_trip("snapshot", len(self.model.tasks))
+        return self._not_running() or self.model.export()
+
+    def probe(self) -> dict:
+        # 探测只读两列日期和几个计数，约为全量导出的五分之一
+        self._round_trip("probe", len(self.model.tasks) // 5)
+        return self._not_running() or self.model.probe()
+
+    def apply(self, ops: List[dict]) -> dict:
+        self._round_trip("apply", len(ops))
+        if not self.model.running:
+            return {"error": "OmniFocus is not running"}
+        results = {op["index"]: self.model.apply_op(op) for op in ops}
+        self.save()
+        return {"results": results}
+
+    def add_task(self, name: str, note: str = "", project_id: Optional[str] = None,
+                 context_id: Optional[str] = None, due: Optional[datetime] = None,
+                 defer: Optional[datetime] = None, repeat_rule: Optional[str] = None) -> dict:
+        self._round_trip("add_task")
+        if not self.model.running:
+            return {"error": "OmniFocus is not running"}
+        if project_id and project_id not in self.model.projects:
+            return {"error": f"Error: Can't get flattened project id \"{project_id}\"."}
+        task_id = self.model.add_task(name, project=project_id,
+                                      context=context_id if context_id in self.model.contexts else None,
+                                      due=due, defer=defer, repeat=repeat_rule, note=note)
+        self.save()
+        return {"id": task_id}
+
+    def create_project(self, name: str, folder_id: Optional[str] = None) -> dict:
+        self._round_trip("create_project")
+        if not self.model.running:
+            return {"error": "OmniFocus is not running"}
+        if folder_id and folder_id not in self.model.folders:
+            return {"error": f"Error: Can't get folder id \"{folder_id}\"."}
+        project_id = self.model.add_project(name, folder=folder_id)
+        self.save()
+        return {"id": project_id}
+
+    def create_folder(self, name: str) -> dict:
+        self._round_trip("create_folder")
+        if not self.model.running:
+            return {"error": "OmniFocus is not running"}
+        folder_id = self.model.add_folder(name)
+        self.save()
+        return {"id": folder_id}
+
+    def perspectives(self) -> dict:
+        self._round_trip("perspectives")
+        return self._not_running() or {"names": list(BUILT_IN_PERSPECTIVES)}
+
+    def activate_perspective(self, name: str) -> dict:
+        self._round_trip("activate_perspective")
+        if name not in BUILT_IN_PERSPECTIVES:
+            return {"error": f"Error: Perspective '{name}' not found"}
+        self.model.running = True
+        self.model.active_perspective = name
+        return {"ok": True}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a fake OmniFocus database for OMNIFOCUS_BACKEND=fake")
+    parser.add_argument("command", choices=["seed"])
+    parser.add_argument("path", help="State file to write")
+    parser.add_argument("--tasks", type=int, default=200, help="Number of tasks (default 200)")
+    parser.add_argument("--projects", type=int, help="Number of projects (default tasks/25)")
+    parser.add_argument("--contexts", type=int, default=12, help="Number of contexts (default 12)")
+    parser.add_argument("--folders", type=int, default=6, help="Number of folders (default 6)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    model = FakeOmniFocus.seeded(tasks=args.tasks, projects=args.projects, contexts=args.contexts,
+                                 folders=args.folders, seed=args.seed)
+    FakeBackend(model, path=args.path).save()
+    print(f"Wrote {len(model.tasks)} tasks, {len(model.projects)} projects, "
+          f"{len(model.contexts)} contexts, {len(model.folders)} folders to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
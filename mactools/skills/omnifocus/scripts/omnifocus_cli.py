@@ -4,13 +4,26 @@ OmniFocus 4 操作工具
 通过 AppleScript 与 OmniFocus 交互
 """
 
+import os
+import abc
+import bisect
+import hashlib
+import sqlite3
 import subprocess
+import socket
 import sys
 import re
 import json
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Tuple
 
+SCRIPT_TIMEOUT = 30
+CACHE_DIR = os.environ.get("OMNIFOCUS_CACHE_DIR", os.path.expanduser("~/.cache/omnifocus-cli"))
+# omnifocus_daemon.py 监听的 socket；存在时脚本经常驻进程执行
+DAEMON_SOCKET = os.environ.get("OMNIFOCUS_DAEMON_SOCKET", os.path.join(CACHE_DIR, "daemon.sock"))
+# 快照缓存模式：use（探测无变化时用缓存）、refresh（总是重新导出并写入）、off（不读写缓存）
+CACHE_MODE = os.environ.get("OMNIFOCUS_CACHE", "use")
+
 
 def parse_date(date_str: str) -> Optional[datetime]:
     """
@@ -136,14 +149,59 @@ def escape_applescript_string(s: str) -> str:
     return s.replace('\\', '\\\\').replace('"', '\\"')
 
 
-def run_applescript(script: str) -> str:
-    """执行 AppleScript 并返回结果"""
+def daemon_request(request: dict, path: str = DAEMON_SOCKET,
+                   timeout: float = SCRIPT_TIMEOUT + 5) -> Optional[dict]:
+    """
+    向常驻进程发送一条请求
+    返回: 应答字典；socket 不存在或连接失败时返回 None
+    请求发出后的失败不返回 None，避免调用方回退重跑写操作
+    """
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    try:
+        with sock:
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if chunk.endswith(b"\n"):
+                    break
+        return json.loads(b"".join(chunks))
+    except socket.timeout:
+        return {"ok": False, "error": "Script execution timed out"}
+    except (OSError, ValueError) as e:
+        return {"ok": False, "error": f"Daemon request failed - {e}"}
+
+
+def _run_script(source: str, language: str) -> str:
+    """经常驻进程或单次 osascript 执行脚本；language 为 "applescript" 或 "javascript" """
+    if not os.environ.get("OMNIFOCUS_NO_DAEMON"):
+        reply = daemon_request({"op": "run", "lang": language, "source": source})
+        if reply is not None:
+            if not reply.get("ok"):
+                return f"Error: {reply.get('error', 'Unknown error')}"
+            return reply.get("result", "").strip()
+    if language == "javascript":
+        # JXA 脚本以函数体形式编写，osascript 输出其返回值
+        cmd = ['osascript', '-l', 'JavaScript', '-e', f"(function () {{\n{source}\n}})()"]
+    else:
+        cmd = ['osascript', '-e', source]
     try:
         result = subprocess.run(
-            ['osascript', '-e', script],
+            cmd,
             capture_output=True,
             text=True,
-            timeout=30
+            timeout=SCRIPT_TIMEOUT
         )
         if result.returncode != 0:
             return f"Error: {result.stderr}"
@@ -154,1135 +212,1553 @@ def run_applescript(script: str) -> str:
         return f"Error: {str(e)}"
 
 
-def get_status() -> str:
-    """获取 OmniFocus 状态概览"""
-    script = '''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set allTasks to every flattened task
-        set incompleteTasks to every flattened task whose completed is false
-        set flaggedTasks to every flattened task whose flagged is true and completed is false
-        set completedTasks to every flattened task whose completed is true
-        set allProjects to every flattened project
-        set activeProjects to every flattened project whose status is active status
-
-        return "OmniFocus Status Overview
-========================
+def run_applescript(script: str) -> str:
+    """执行 AppleScript 并返回结果；常驻进程可用时经其执行"""
+    return _run_script(script, "applescript")
+
+
+def run_jxa(body: str) -> str:
+    """执行 JXA 函数体（以 return 返回结果）并返回结果"""
+    return _run_script(body, "javascript")
+
+
+# 一次导出整个数据库：按属性批量读取（每个属性一次 Apple Event），
+# 任务所属项目与上下文按项目/上下文逐个反查，避免逐任务访问。
+SNAPSHOT_JXA = r'''
+var app = Application('OmniFocus');
+if (!app.running()) return JSON.stringify({error: 'OmniFocus is not running'});
+var doc = app.defaultDocument;
+
+function iso(d) { return d ? d.toISOString() : null; }
+function column(spec, prop, n) {
+    try {
+        var values = spec[prop]();
+        if (values && values.length === n) return values;
+    } catch (e) {}
+    var empty = [];
+    for (var i = 0; i < n; i++) empty.push(null);
+    return empty;
+}
+function idColumn(spec, prop, n) {
+    try {
+        var values = spec[prop].id();
+        if (values && values.length === n) return values;
+    } catch (e) {}
+    return null;
+}
+
+var folderSpec = doc.flattenedFolders;
+var folderIds = folderSpec.id();
+var folderNames = column(folderSpec, 'name', folderIds.length);
+var topFolders = {};
+doc.folders.id().forEach(function (id) { topFolders[id] = true; });
+var folders = [];
+var projectFolder = {};
+for (var i = 0; i < folderIds.length; i++) {
+    folders.push({id: folderIds[i], name: folderNames[i], top: !!topFolders[folderIds[i]]});
+    folderSpec[i].projects.id().forEach(function (pid) { projectFolder[pid] = folderIds[i]; });
+}
+
+var projectSpec = doc.flattenedProjects;
+var projectIds = projectSpec.id();
+var n = projectIds.length;
+var projectNames = column(projectSpec, 'name', n);
+var projectStatus = column(projectSpec, 'status', n);
+var projectNotes = column(projectSpec, 'note', n);
+var projectModified = column(projectSpec, 'modificationDate', n);
+var projects = [];
+var taskProject = {};
+for (var i = 0; i < n; i++) {
+    projects.push({
+        id: projectIds[i], name: projectNames[i], status: projectStatus[i],
+        note: projectNotes[i] || '', folder: projectFolder[projectIds[i]] || null,
+        modified: iso(projectModified[i])
+    });
+    projectSpec[i].flattenedTasks.id().forEach(function (tid) { taskProject[tid] = projectIds[i]; });
+}
+
+var contextSpec = doc.flattenedContexts;
+var contextIds = contextSpec.id();
+var contextNames = column(contextSpec, 'name', contextIds.length);
+var contexts = [];
+for (var i = 0; i < contextIds.length; i++) {
+    contexts.push({id: contextIds[i], name: contextNames[i]});
+}
+
+var inbox = {};
+doc.inboxTasks.id().forEach(function (id) { inbox[id] = true; });
+
+var taskSpec = doc.flattenedTasks;
+var taskIds = taskSpec.id();
+var m = taskIds.length;
+var names = column(taskSpec, 'name', m);
+var completed = column(taskSpec, 'completed', m);
+var flagged = column(taskSpec, 'flagged', m);
+var due = column(taskSpec, 'dueDate', m);
+var defer = column(taskSpec, 'deferDate', m);
+var modified = column(taskSpec, 'modificationDate', m);
+var repetition = column(taskSpec, 'repetitionRule', m);
+// The primary tag (the legacy "context"), not just any tag assigned to the task
+var primaryTag = idColumn(taskSpec, 'primaryTag', m) || idColumn(taskSpec, 'context', m);
+if (primaryTag === null) {
+    primaryTag = [];
+    for (var i = 0; i < m; i++) {
+        var tag = null;
+        try { tag = taskSpec[i].primaryTag(); } catch (e) {}
+        primaryTag.push(tag ? tag.id() : null);
+    }
+}
+var isProject = {};
+projectIds.forEach(function (id) { isProject[id] = true; });
+var tasks = [];
+for (var i = 0; i < m; i++) {
+    var id = taskIds[i];
+    if (isProject[id]) continue;
+    var rule = repetition[i];
+    tasks.push({
+        id: id, name: names[i], completed: !!completed[i], flagged: !!flagged[i],
+        due: iso(due[i]), defer: iso(defer[i]), modified: iso(modified[i]),
+        project: taskProject[id] || null, context: primaryTag[i] || null,
+        inbox: !!inbox[id],
+        repeat: rule ? (rule.recurrence || String(rule)) : null
+    });
+}
+
+return JSON.stringify({
+    exported: new Date().toISOString(),
+    tasks: tasks, projects: projects, contexts: contexts, folders: folders
+});
+'''
 
-Task Statistics
----------------
-Total:       " & (count of allTasks) & "
-Incomplete:  " & (count of incompleteTasks) & "
-Flagged:     " & (count of flaggedTasks) & "
-Completed:   " & (count of completedTasks) & "
 
-Project Statistics
-------------------
-Total:       " & (count of allProjects) & "
-Active:      " & (count of activeProjects) & "
-"
-    end tell
-end tell
+# 变化探测：数量 + 最大修改时间 + 上下文/文件夹名称，只读少数几列，远比全量导出便宜
+PROBE_JXA = r'''
+var app = Application('OmniFocus');
+if (!app.running()) return JSON.stringify({error: 'OmniFocus is not running'});
+var doc = app.defaultDocument;
+function latest(spec) {
+    var dates = spec.modificationDate();
+    var max = 0;
+    for (var i = 0; i < dates.length; i++) {
+        if (dates[i] && dates[i].getTime() > max) max = dates[i].getTime();
+    }
+    return max;
+}
+return JSON.stringify({
+    tasks: doc.flattenedTasks.length,
+    projects: doc.flattenedProjects.length,
+    task_modified: latest(doc.flattenedTasks),
+    project_modified: latest(doc.flattenedProjects),
+    contexts: doc.flattenedContexts.name(),
+    folders: doc.flattenedFolders.name(),
+    inbox: doc.inboxTasks.length
+});
 '''
-    return run_applescript(script)
 
 
-def list_tasks(project_name: Optional[str] = None, limit: int = 20, context: Optional[str] = None) -> str:
-    """列出任务，可按项目和上下文筛选"""
-    project_str = escape_applescript_string(project_name) if project_name else ""
-    context_str = escape_applescript_string(context) if context else ""
+def _script_error(output: str) -> Optional[str]:
+    """osascript 输出表示失败时返回错误信息，否则返回 None"""
+    if output.startswith("Error:") or output == "OmniFocus is not running":
+        return output
+    return None
 
-    if context:
+
+def _parse_json_output(output: str, what: str) -> dict:
+    error = _script_error(output)
+    if error:
+        return {"error": error}
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return {"error": f"Error: Could not parse OmniFocus {what}"}
+    if "error" in data:
+        return {"error": data["error"]}
+    return data
+
+
+class OmniFocusBackend(abc.ABC):
+    """
+    OmniFocus 后端接口
+    CLI 的所有读写都经过这些方法；失败时统一返回 {"error": 消息}。
+    日期参数为本地时间的 naive datetime。子类须实现全部方法，否则无法实例化。
+    """
+
+    @abc.abstractmethod
+    def snapshot(self) -> dict:
+        """导出快照: {"exported", "tasks", "projects", "contexts", "folders"}"""
+
+    @abc.abstractmethod
+    def probe(self) -> dict:
+        """返回变化探测数据（任意可 JSON 序列化的字典）"""
+
+    @abc.abstractmethod
+    def apply(self, ops: List[dict]) -> dict:
+        """
+        按 id 执行一组已解析的操作（见 BATCH_OPS），一次调用完成
+        返回: {"results": {index: None 表示成功 | 错误信息}}
+        """
+
+    @abc.abstractmethod
+    def add_task(self, name: str, note: str = "", project_id: Optional[str] = None,
+                 context_id: Optional[str] = None, due: Optional[datetime] = None,
+                 defer: Optional[datetime] = None, repeat_rule: Optional[str] = None) -> dict:
+        """创建任务（无项目时进收件箱），返回 {"id": 新任务 id}"""
+
+    @abc.abstractmethod
+    def create_project(self, name: str, folder_id: Optional[str] = None) -> dict:
+        """创建项目，返回 {"id": 新项目 id}"""
+
+    @abc.abstractmethod
+    def create_folder(self, name: str) -> dict:
+        """创建文件夹，返回 {"id": 新文件夹 id}"""
+
+    @abc.abstractmethod
+    def perspectives(self) -> dict:
+        """返回 {"names": 内置透视名称列表}"""
+
+    @abc.abstractmethod
+    def activate_perspective(self, name: str) -> dict:
+        """激活透视，返回 {"ok": True}"""
+
+
+class OsascriptBackend(OmniFocusBackend):
+    """通过 osascript（或 omnifocus_daemon.py 常驻进程）访问真实的 OmniFocus"""
+
+    def snapshot(self) -> dict:
+        return _parse_json_output(run_jxa(SNAPSHOT_JXA), "snapshot")
+
+    def probe(self) -> dict:
+        return _parse_json_output(run_jxa(PROBE_JXA), "probe")
+
+    @staticmethod
+    def _action(op: dict) -> str:
+        """单个操作对应的 AppleScript 语句（作用于变量 t）"""
+        kind = op["op"]
+        if kind == "complete":
+            return "set completed of t to true"
+        if kind == "flag":
+            return "set flagged of t to true"
+        if kind == "unflag":
+            return "set flagged of t to false"
+        if kind == "toggle-flag":
+            return "set flagged of t to (not (flagged of t))"
+        if kind == "delete":
+            return "delete t"
+        if kind == "set-due":
+            return f"set due date of t to {format_date_for_applescript(op['date'])}"
+        if kind == "set-defer":
+            return f"set defer date of t to {format_date_for_applescript(op['date'])}"
+        if kind == "clear-due":
+            return "set due date of t to missing value"
+        if kind == "clear-defer":
+            return "set defer date of t to missing value"
+        if kind == "set-context":
+            return f'set context of t to flattened context id "{escape_applescript_string(op["context_id"])}"'
+        if kind == "clear-context":
+            return "set context of t to missing value"
+        if kind == "set-repeat":
+            return f'set repetition rule of t to "{escape_applescript_string(op["rule"])}"'
+        if kind == "clear-repeat":
+            return 'set repetition rule of t to ""'
+        if kind == "append-note":
+            note = escape_applescript_string(op["note"])
+            return f'''set existingNote to note of t
+            if existingNote is "" then
+                set note of t to "{note}"
+            else
+                set note of t to existingNote & "\\n\\n" & "{note}"
+            end if'''
+        raise ValueError(f"unknown operation: {kind}")
+
+    def apply(self, ops: List[dict]) -> dict:
+        # 一个脚本完成全部操作：按 id 直接取任务，每条结果写成
+        # "index<TAB>ok" 或 "index<TAB>error<TAB>消息" 一行
+        steps = []
+        for op in ops:
+            steps.append(f'''
+        try
+            set t to flattened task id "{escape_applescript_string(op["id"])}"
+            {self._action(op)}
+            set end of results to "{op["index"]}" & tab & "ok"
+        on error errMsg
+            set end of results to "{op["index"]}" & tab & "error" & tab & errMsg
+        end try''')
         script = f'''
 tell application "OmniFocus"
     if not running then return "OmniFocus is not running"
     tell front document
-        try
-            set targetContext to first flattened context whose name is "{context_str}"
-            set contextTasks to every flattened task whose (completed is false) and (context is targetContext)
-            set output to "Tasks in context '{context_str}' (" & (count of contextTasks) & ")
-========================
-
-"
-            set taskCount to 0
-            repeat with t in contextTasks
-                try
-                    set taskCount to taskCount + 1
-                    if taskCount > {limit} then
-                        set output to output & "
-... and " & ((count of contextTasks) - {limit}) & " more tasks
-"
-                        exit repeat
-                    end if
-                    set taskName to name of t
-                    set projName to ""
-                    try
-                        set projName to name of (containing project of t)
-                    end try
-                    set flagStr to ""
-                    if flagged of t then set flagStr to "[Flagged] "
-                    set output to output & taskCount & ". " & flagStr & taskName
-                    if projName is not "" then
-                        set output to output & " [" & projName & "]"
-                    end if
-                    set output to output & "
-"
-                end try
-            end repeat
-            return output
-        on error
-            return "Error: Context '{context_str}' not found"
-        end try
+        set results to {{}}
+{"".join(steps)}
+        set AppleScript's text item delimiters to linefeed
+        return results as text
     end tell
 end tell
 '''
-        return run_applescript(script)
+        output = run_applescript(script)
+        error = _script_error(output)
+        if error:
+            return {"error": error}
+        results = {}
+        for line in output.splitlines():
+            parts = line.split("\t", 2)
+            if len(parts) >= 2:
+                results[int(parts[0])] = parts[2] if len(parts) == 3 else None
+        return {"results": results}
+
+    def add_task(self, name: str, note: str = "", project_id: Optional[str] = None,
+                 context_id: Optional[str] = None, due: Optional[datetime] = None,
+                 defer: Optional[datetime] = None, repeat_rule: Optional[str] = None) -> dict:
+        properties = [f'name:"{escape_applescript_string(name)}"']
+        if note:
+            properties.append(f'note:"{escape_applescript_string(note)}"')
+        if due:
+            properties.append(f'due date:{format_date_for_applescript(due)}')
+        if defer:
+            properties.append(f'defer date:{format_date_for_applescript(defer)}')
+        properties_dict = "{" + ", ".join(properties) + "}"
+
+        if project_id:
+            create = f'''tell flattened project id "{escape_applescript_string(project_id)}"
+            set newTask to make new task with properties {properties_dict}
+        end tell'''
+        else:
+            create = f"set newTask to make new inbox task with properties {properties_dict}"
+
+        extra = ""
+        if context_id:
+            extra += f'''
+        try
+            set context of newTask to flattened context id "{escape_applescript_string(context_id)}"
+        end try'''
+        if repeat_rule:
+            extra += f'''
+        try
+            set repetition rule of newTask to "{escape_applescript_string(repeat_rule)}"
+        end try'''
 
-    if project_name:
         script = f'''
 tell application "OmniFocus"
     if not running then return "OmniFocus is not running"
     tell front document
-        try
-            set targetProject to first flattened project whose name is "{project_str}"
-            set projTasks to every task of targetProject whose completed is false
-            set output to "Project: {project_str} (" & (count of projTasks) & " incomplete tasks)
-========================
-
-"
-            set taskCount to 0
-            repeat with t in projTasks
-                try
-                    set taskCount to taskCount + 1
-                    if taskCount > {limit} then exit repeat
-                    set taskName to name of t
-                    set flagStr to ""
-                    if flagged of t then set flagStr to "[Flagged] "
-                    set output to output & taskCount & ". " & flagStr & taskName & "
-"
-                end try
-            end repeat
-            return output
-        on error
-            return "Error: Project '{project_str}' not found"
-        end try
+        {create}{extra}
+        return id of newTask
     end tell
 end tell
 '''
-    else:
-        script = f'''
+        output = run_applescript(script)
+        error = _script_error(output)
+        return {"error": error} if error else {"id": output}
+
+    def create_project(self, name: str, folder_id: Optional[str] = None) -> dict:
+        properties = f'{{name:"{escape_applescript_string(name)}"}}'
+        if folder_id:
+            create = f'''tell folder id "{escape_applescript_string(folder_id)}"
+            set newProject to make new project with properties {properties}
+        end tell'''
+        else:
+            create = f"set newProject to make new project with properties {properties}"
+        output = run_applescript(f'''
 tell application "OmniFocus"
     if not running then return "OmniFocus is not running"
     tell front document
-        set incompleteTasks to every flattened task whose completed is false
-        set output to "All Incomplete Tasks (" & (count of incompleteTasks) & ")
-========================
-
-"
-        set taskCount to 0
-        repeat with t in incompleteTasks
-            try
-                set taskCount to taskCount + 1
-                if taskCount > {limit} then
-                    set output to output & "
-... and " & ((count of incompleteTasks) - {limit}) & " more tasks
-"
-                    exit repeat
-                end if
-                set taskName to name of t
-                set projName to ""
-                try
-                    set projName to name of (containing project of t)
-                end try
-                set flagStr to ""
-                if flagged of t then set flagStr to "[Flagged] "
-                set output to output & taskCount & ". " & flagStr & taskName
-                if projName is not "" then
-                    set output to output & " [" & projName & "]"
-                end if
-                set output to output & "
-"
-            end try
-        end repeat
-        return output
+        {create}
+        return id of newProject
     end tell
 end tell
-'''
-    return run_applescript(script)
-
+''')
+        error = _script_error(output)
+        return {"error": error} if error else {"id": output}
 
-def list_inbox() -> str:
-    """列出收件箱任务"""
-    script = '''
+    def create_folder(self, name: str) -> dict:
+        output = run_applescript(f'''
 tell application "OmniFocus"
     if not running then return "OmniFocus is not running"
     tell front document
-        set inboxTasks to every inbox task whose completed is false
-        set output to "Inbox Tasks (" & (count of inboxTasks) & ")
-========================
-
-"
-        set taskCount to 0
-        repeat with t in inboxTasks
-            try
-                set taskCount to taskCount + 1
-                set taskName to name of t
-                set flagStr to ""
-                if flagged of t then set flagStr to "[Flagged] "
-                set output to output & taskCount & ". " & flagStr & taskName & "
-"
-            end try
-        end repeat
-        return output
+        set newFolder to make new folder with properties {{name:"{escape_applescript_string(name)}"}}
+        return id of newFolder
     end tell
 end tell
-'''
-    return run_applescript(script)
-
+''')
+        error = _script_error(output)
+        return {"error": error} if error else {"id": output}
 
-def list_flagged() -> str:
-    """列出已标记任务"""
-    script = '''
+    def perspectives(self) -> dict:
+        output = run_applescript('''
 tell application "OmniFocus"
     if not running then return "OmniFocus is not running"
-    tell front document
-        set flaggedTasks to every flattened task whose flagged is true and completed is false
-        set output to "Flagged Tasks (" & (count of flaggedTasks) & ")
-========================
+    set AppleScript's text item delimiters to linefeed
+    return (name of every built-in perspective) as text
+end tell
+''')
+        error = _script_error(output)
+        return {"error": error} if error else {"names": [n for n in output.splitlines() if n]}
 
-"
-        set taskCount to 0
-        repeat with t in flaggedTasks
-            try
-                set taskCount to taskCount + 1
-                set taskName to name of t
-                set projName to ""
-                try
-                    set projName to name of (containing project of t)
-                end try
-                set output to output & taskCount & ". " & taskName
-                if projName is not "" then
-                    set output to output & " [" & projName & "]"
-                end if
-                set output to output & "
-"
-            end try
-        end repeat
-        return output
-    end tell
+    def activate_perspective(self, name: str) -> dict:
+        name_escaped = escape_applescript_string(name)
+        output = run_applescript(f'''
+tell application "OmniFocus"
+    if not running then
+        activate
+    end if
+    try
+        set targetPerspective to first built-in perspective whose name is "{name_escaped}"
+        activate perspective targetPerspective
+        return "ok"
+    on error
+        return "Error: Perspective '{name_escaped}' not found"
+    end try
 end tell
-'''
-    return run_applescript(script)
+''')
+        error = _script_error(output)
+        return {"error": error} if error else {"ok": True}
 
 
-def list_due(days: int = 7) -> str:
-    """列出即将到期的任务"""
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set todayDate to current date
-        set futureDate to todayDate + ({days} * days)
-        set allIncompleteTasks to every flattened task whose completed is false
-        set dueTasks to {{}}
-        repeat with t in allIncompleteTasks
-            try
-                set dueDateVal to due date of t
-                if dueDateVal is not missing value then
-                    if dueDateVal <= futureDate then
-                        set end of dueTasks to t
-                    end if
-                end if
-            end try
-        end repeat
-
-        set output to "Due within {days} days (" & (count of dueTasks) & ")
-========================
+_backend: Optional[OmniFocusBackend] = None
 
-"
-        set taskCount to 0
-        repeat with t in dueTasks
-            try
-                set taskCount to taskCount + 1
-                set taskName to name of t
-                set dueDateVal to due date of t
-                set dateStr to short date string of dueDateVal
-                set projName to ""
-                try
-                    set projName to name of (containing project of t)
-                end try
-                set flagStr to ""
-                if flagged of t then set flagStr to "[Flagged] "
-                set output to output & taskCount & ". " & flagStr & taskName & "
-"
-                set output to output & "   Due: " & dateStr
-                if projName is not "" then
-                    set output to output & " | Project: " & projName
-                end if
-                set output to output & "
-
-"
-            end try
-        end repeat
-        return output
-    end tell
-end tell
-'''
-    return run_applescript(script)
 
+def get_backend() -> OmniFocusBackend:
+    """
+    返回当前后端
+    OMNIFOCUS_BACKEND=fake 时使用 fake_omnifocus.py 的内存模型（状态存于
+    OMNIFOCUS_FAKE_STATE 指定的 JSON 文件），用于在非 macOS 环境运行整个命令集
+    """
+    global _backend
+    if _backend is None:
+        if os.environ.get("OMNIFOCUS_BACKEND") == "fake":
+            from fake_omnifocus import FakeBackend
+            state = os.environ.get("OMNIFOCUS_FAKE_STATE", os.path.join(CACHE_DIR, "fake_state.json"))
+            _backend = FakeBackend.from_file(state)
+        else:
+            _backend = OsascriptBackend()
+    return _backend
 
-def list_due_by_range(range_str: str) -> str:
+
+def set_backend(backend: Optional[OmniFocusBackend]):
+    """替换后端（None 恢复默认选择）"""
+    global _backend
+    _backend = backend
+
+
+def fetch_snapshot() -> dict:
     """
-    按时间范围列出到期任务
-    range_str: "today", "tomorrow", "week", "overdue"
+    一次调用导出任务、项目、上下文和文件夹
+    返回: 快照字典；失败时返回 {"error": 消息}
     """
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date = None
-    end_date = None
-    title = ""
+    return get_backend().snapshot()
 
-    if range_str == "today":
-        start_date = today
-        end_date = today + timedelta(days=1)
-        title = "Due Today"
-    elif range_str == "tomorrow":
-        start_date = today + timedelta(days=1)
-        end_date = today + timedelta(days=2)
-        title = "Due Tomorrow"
-    elif range_str == "week":
-        start_date = today
-        end_date = today + timedelta(days=7)
-        title = "Due This Week"
-    elif range_str == "overdue":
-        end_date = today
-        title = "Overdue"
+
+SNAPSHOT_TABLES = {
+    "tasks": ("id", "name", "completed", "flagged", "due", "defer", "modified",
+              "project", "context", "inbox", "repeat"),
+    "projects": ("id", "name", "status", "note", "folder", "modified"),
+    "contexts": ("id", "name"),
+    "folders": ("id", "name", "top"),
+}
+BOOL_COLUMNS = {"completed", "flagged", "inbox", "top"}
+
+
+class SnapshotCache:
+    """
+    SQLite 快照缓存
+    保存最近一次导出的快照和导出前的变化探测指纹；
+    指纹一致时读命令直接从缓存作答
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        for table, columns in SNAPSHOT_TABLES.items():
+            cols = ", ".join(f'"{c}" TEXT PRIMARY KEY' if c == "id" else f'"{c}"' for c in columns)
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols})")
+        self.conn.commit()
+        # (指纹, 快照)：同一进程内重复读取时免去 SQLite 反序列化
+        self._loaded: Optional[Tuple[str, dict]] = None
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Optional[str]):
+        if value is None:
+            self.conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+        else:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def fingerprint(self) -> Optional[str]:
+        return self.get_meta("fingerprint")
+
+    def store(self, snapshot: dict, fingerprint: str):
+        """整体替换缓存内容"""
+        with self.conn:
+            for table, columns in SNAPSHOT_TABLES.items():
+                self.conn.execute(f"DELETE FROM {table}")
+                placeholders = ", ".join("?" for _ in columns)
+                quoted = ", ".join(f'"{c}"' for c in columns)
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({quoted}) VALUES ({placeholders})",
+                    ([row.get(c) for c in columns] for row in snapshot.get(table, [])),
+                )
+            self._set_meta("fingerprint", fingerprint)
+            self._set_meta("exported", snapshot.get("exported"))
+        self._loaded = (fingerprint, snapshot)
+
+    def load(self) -> Optional[dict]:
+        """读出缓存的快照；没有缓存时返回 None"""
+        fingerprint = self.fingerprint()
+        if self._loaded is not None and fingerprint is not None and self._loaded[0] == fingerprint:
+            return self._loaded[1]
+        exported = self.get_meta("exported")
+        if exported is None:
+            return None
+        snapshot = {"exported": exported, "cached": True}
+        for table, columns in SNAPSHOT_TABLES.items():
+            quoted = ", ".join(f'"{c}"' for c in columns)
+            rows = []
+            for values in self.conn.execute(f"SELECT {quoted} FROM {table} ORDER BY rowid"):
+                row = dict(zip(columns, values))
+                for c in BOOL_COLUMNS.intersection(columns):
+                    row[c] = bool(row[c])
+                rows.append(row)
+            snapshot[table] = rows
+        if fingerprint is not None:
+            self._loaded = (fingerprint, snapshot)
+        return snapshot
+
+    def invalidate(self):
+        """写操作后调用：保留数据，清除指纹，下次读取必定重新导出"""
+        self._loaded = None
+        with self.conn:
+            self._set_meta("fingerprint", None)
+
+    def clear(self):
+        self._loaded = None
+        with self.conn:
+            for table in SNAPSHOT_TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute("DELETE FROM meta")
+
+    def stats(self) -> dict:
+        counts = {t: self.conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in SNAPSHOT_TABLES}
+        counts["exported"] = self.get_meta("exported")
+        counts["fresh"] = self.fingerprint() is not None
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+
+_snapshot_cache: Optional[SnapshotCache] = None
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """返回进程内共享的快照缓存"""
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        _snapshot_cache = SnapshotCache(os.path.join(CACHE_DIR, "snapshot.sqlite"))
+    return _snapshot_cache
+
+
+def probe_database() -> dict:
+    """
+    读取变化探测信息
+    返回: {"fingerprint": 指纹} 或 {"error": 消息}
+    """
+    probe = get_backend().probe()
+    if "error" in probe:
+        return probe
+    digest = hashlib.sha256(json.dumps(probe, sort_keys=True).encode("utf-8")).hexdigest()
+    return {"fingerprint": digest}
+
+
+def load_snapshot() -> dict:
+    """
+    读命令使用的快照入口
+    先做变化探测（在导出之前，期间的修改会让下次探测不一致），
+    指纹与缓存一致时直接返回缓存，否则全量导出并写入缓存
+    """
+    if CACHE_MODE == "off":
+        return fetch_snapshot()
+    probe = probe_database()
+    if "error" in probe:
+        return probe
+    cache = get_snapshot_cache()
+    if CACHE_MODE == "use" and cache.fingerprint() == probe["fingerprint"]:
+        snapshot = cache.load()
+        if snapshot is not None:
+            return snapshot
+    snapshot = fetch_snapshot()
+    if "error" not in snapshot:
+        cache.store(snapshot, probe["fingerprint"])
+    return snapshot
+
+
+def invalidate_snapshot_cache():
+    """标记缓存过期；缓存关闭时不做任何事"""
+    if CACHE_MODE != "off":
+        get_snapshot_cache().invalidate()
+
+
+def parse_snapshot_date(value: Optional[str]) -> Optional[datetime]:
+    """将快照中的 ISO UTC 时间转换为本地时间（naive datetime）"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone().replace(tzinfo=None)
+
+
+def project_status(project: dict) -> str:
+    """统一项目状态：active / on hold / done / dropped"""
+    status = (project.get("status") or "").replace("Status", "").replace(" status", "")
+    return re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', status).strip().lower()
+
+
+def _by_id(items: List[dict]) -> Dict[str, dict]:
+    return {item["id"]: item for item in items}
+
+
+def _task_line(index: int, task: dict, projects: Dict[str, dict], show_flag: bool = True,
+               show_project: bool = True) -> str:
+    """格式化一行任务：序号、标记、名称、[项目]"""
+    line = f"{index}. "
+    if show_flag and task["flagged"]:
+        line += "[Flagged] "
+    line += task["name"]
+    project = projects.get(task.get("project"))
+    if show_project and project:
+        line += f" [{project['name']}]"
+    return line
+
+
+def get_status() -> str:
+    """获取 OmniFocus 状态概览"""
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    tasks = snapshot["tasks"]
+    projects = snapshot["projects"]
+    incomplete = [t for t in tasks if not t["completed"]]
+    flagged = [t for t in incomplete if t["flagged"]]
+    active = [p for p in projects if project_status(p) == "active"]
+
+    return f"""OmniFocus Status Overview
+========================
+
+Task Statistics
+---------------
+Total:       {len(tasks)}
+Incomplete:  {len(incomplete)}
+Flagged:     {len(flagged)}
+Completed:   {len(tasks) - len(incomplete)}
+
+Project Statistics
+------------------
+Total:       {len(projects)}
+Active:      {len(active)}
+"""
+
+
+def list_tasks(project_name: Optional[str] = None, limit: int = 20, context: Optional[str] = None) -> str:
+    """列出任务，可按项目和上下文筛选"""
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    projects = _by_id(snapshot["projects"])
+    incomplete = [t for t in snapshot["tasks"] if not t["completed"]]
+
+    if context:
+        target = next((c for c in snapshot["contexts"] if c["name"] == context), None)
+        if target is None:
+            return f"Error: Context '{context}' not found"
+        matched = [t for t in incomplete if t["context"] == target["id"]]
+        header = f"Tasks in context '{context}' ({len(matched)})"
+        show_project = True
+    elif project_name:
+        target = next((p for p in snapshot["projects"] if p["name"] == project_name), None)
+        if target is None:
+            return f"Error: Project '{project_name}' not found"
+        matched = [t for t in incomplete if t["project"] == target["id"]]
+        header = f"Project: {project_name} ({len(matched)} incomplete tasks)"
+        show_project = False
     else:
-        return f"Error: Invalid range '{range_str}'. Use: today, tomorrow, week, overdue"
+        matched = incomplete
+        header = f"All Incomplete Tasks ({len(matched)})"
+        show_project = True
 
-    start_str = format_date_for_applescript(start_date) if start_date else "missing value"
-    end_str = format_date_for_applescript(end_date) if end_date else "missing value"
+    lines = [header, "========================", ""]
+    for i, task in enumerate(matched[:limit], 1):
+        lines.append(_task_line(i, task, projects, show_project=show_project))
+    if len(matched) > limit and not project_name:
+        lines.append("")
+        lines.append(f"... and {len(matched) - limit} more tasks")
+    return "\n".join(lines)
 
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set allIncompleteTasks to every flattened task whose completed is false
-        set dueTasks to {{}}
 
-        repeat with t in allIncompleteTasks
-            try
-                set dueDateVal to due date of t
-                if dueDateVal is not missing value then
-'''
+def list_inbox() -> str:
+    """列出收件箱任务"""
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    inbox = [t for t in snapshot["tasks"] if t["inbox"] and not t["completed"]]
+    lines = [f"Inbox Tasks ({len(inbox)})", "========================", ""]
+    for i, task in enumerate(inbox, 1):
+        lines.append(_task_line(i, task, {}, show_project=False))
+    return "\n".join(lines)
+
 
+def list_flagged() -> str:
+    """列出已标记任务"""
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    projects = _by_id(snapshot["projects"])
+    flagged = [t for t in snapshot["tasks"] if t["flagged"] and not t["completed"]]
+    lines = [f"Flagged Tasks ({len(flagged)})", "========================", ""]
+    for i, task in enumerate(flagged, 1):
+        lines.append(_task_line(i, task, projects, show_flag=False))
+    return "\n".join(lines)
+
+
+class DateIndex:
+    """
+    未完成任务按某个日期字段（due / defer）排序的索引
+    范围查询用 bisect 定位，O(log n + k)；同一快照上只构建一次
+    """
+
+    def __init__(self, tasks: List[dict], field: str = "due"):
+        entries = sorted(
+            ((parse_snapshot_date(t[field]), i) for i, t in enumerate(tasks) if not t["completed"] and t[field]),
+        )
+        self.field = field
+        self.keys = [when for when, _ in entries]
+        self.tasks = [tasks[i] for _, i in entries]
+
+    def range(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              inclusive_end: bool = False) -> List[dict]:
+        """日期落在 [start, end) 内的任务（inclusive_end 时含 end），按日期升序"""
+        lo = bisect.bisect_left(self.keys, start) if start is not None else 0
+        if end is None:
+            hi = len(self.keys)
+        else:
+            hi = (bisect.bisect_right if inclusive_end else bisect.bisect_left)(self.keys, end)
+        return self.tasks[lo:max(lo, hi)]
+
+    def buckets(self, boundaries: List[datetime]) -> List[List[dict]]:
+        """
+        一次遍历按边界切分: 返回 len(boundaries) + 1 个桶，
+        第 i 个桶为 [boundaries[i-1], boundaries[i])，首尾桶无下界/上界
+        """
+        cuts = [0] + [bisect.bisect_left(self.keys, b) for b in boundaries] + [len(self.keys)]
+        return [self.tasks[cuts[i]:cuts[i + 1]] for i in range(len(cuts) - 1)]
+
+
+def get_date_index(snapshot: dict, field: str = "due") -> DateIndex:
+    """返回快照上的日期索引；快照对象在缓存中复用，索引随之复用"""
+    indexes = snapshot.setdefault("_date_index", {})
+    if field not in indexes:
+        indexes[field] = DateIndex(snapshot["tasks"], field)
+    return indexes[field]
+
+
+DATE_LABELS = {"due": "Due", "defer": "Defer"}
+
+
+def _format_due_tasks(title: str, tasks: List[dict], projects: Dict[str, dict], field: str = "due") -> str:
+    """格式化到期任务列表：每个任务附日期和项目"""
+    lines = [f"{title} ({len(tasks)})", "========================", ""]
+    for i, task in enumerate(tasks, 1):
+        lines.append(_task_line(i, task, projects, show_project=False))
+        detail = f"   {DATE_LABELS[field]}: {parse_snapshot_date(task[field]).strftime('%Y-%m-%d')}"
+        project = projects.get(task.get("project"))
+        if project:
+            detail += f" | Project: {project['name']}"
+        lines.append(detail)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def list_due(days: int = 7, field: str = "due") -> str:
+    """列出即将到期的任务（含已过期）"""
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    future = datetime.now() + timedelta(days=days)
+    due_tasks = get_date_index(snapshot, field).range(None, future, inclusive_end=True)
+    title = f"Due within {days} days" if field == "due" else f"Deferred until within {days} days"
+    return _format_due_tasks(title, due_tasks, _by_id(snapshot["projects"]), field)
+
+
+def parse_date_range(range_str: str) -> Tuple[Optional[datetime], Optional[datetime], str]:
+    """
+    解析时间范围
+    支持: today, tomorrow, week, overdue，以及 "起..止"（两端可用任意日期格式，
+    可省略一端，止日期当天包含在内），如 "2025-02-01..2025-02-28"、"..+3d"
+    返回: (起始, 结束(不含), 标题)；无法解析时标题为空
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if range_str == "today":
+        return today, today + timedelta(days=1), "Due Today"
+    if range_str == "tomorrow":
+        return today + timedelta(days=1), today + timedelta(days=2), "Due Tomorrow"
+    if range_str == "week":
+        return today, today + timedelta(days=7), "Due This Week"
     if range_str == "overdue":
-        script += f'''
-                    if dueDateVal < {end_str} then
-                        set end of dueTasks to t
-                    end if
-'''
-    elif start_date and end_date:
-        script += f'''
-                    if dueDateVal >= {start_str} and dueDateVal < {end_str} then
-                        set end of dueTasks to t
-                    end if
-'''
+        return None, today, "Overdue"
+    if ".." in range_str:
+        start_str, end_str = range_str.split("..", 1)
+        start = parse_date(start_str) if start_str else None
+        end = parse_date(end_str) if end_str else None
+        if (start_str and not start) or (end_str and not end) or not (start_str or end_str):
+            return None, None, ""
+        if end is not None:
+            end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        start_label = start.strftime('%Y-%m-%d') if start else "..."
+        end_label = (end - timedelta(days=1)).strftime('%Y-%m-%d') if end else "..."
+        return start, end, f"Due {start_label} to {end_label}"
+    return None, None, ""
+
+
+def list_due_ranges(ranges: List[str], field: str = "due") -> str:
+    """
+    按一个或多个时间范围列出到期（或开始）任务，共用同一个日期索引
+    ranges: 见 parse_date_range
+    """
+    parsed = []
+    for range_str in ranges:
+        start, end, title = parse_date_range(range_str)
+        if not title:
+            return (f"Error: Invalid range '{range_str}'. "
+                    "Use: today, tomorrow, week, overdue, or START..END")
+        if field == "defer":
+            title = "Deferred Until Before Today" if range_str == "overdue" else title.replace("Due", "Defer")
+        parsed.append((start, end, title))
+
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    index = get_date_index(snapshot, field)
+    projects = _by_id(snapshot["projects"])
+    return "\n".join(_format_due_tasks(title, index.range(start, end), projects, field)
+                     for start, end, title in parsed)
 
-    script += f'''
-                end if
-            end try
-        end repeat
 
-        set output to "{title} (" & (count of dueTasks) & ")
-========================
+def list_due_by_range(range_str: str) -> str:
+    """
+    按时间范围列出到期任务
+    range_str: "today", "tomorrow", "week", "overdue"
+    """
+    return list_due_ranges([range_str])
 
-"
-        set taskCount to 0
-        repeat with t in dueTasks
-            try
-                set taskCount to taskCount + 1
-                set taskName to name of t
-                set dueDateVal to due date of t
-                set dateStr to short date string of dueDateVal
-                set projName to ""
-                try
-                    set projName to name of (containing project of t)
-                end try
-                set flagStr to ""
-                if flagged of t then set flagStr to "[Flagged] "
-                set output to output & taskCount & ". " & flagStr & taskName & "
-"
-                set output to output & "   Due: " & dateStr
-                if projName is not "" then
-                    set output to output & " | Project: " & projName
-                end if
-                set output to output & "
-
-"
-            end try
-        end repeat
-        return output
-    end tell
-end tell
-'''
-    return run_applescript(script)
+
+def forecast(days: int = 7) -> str:
+    """
+    预测视图：已过期、今后每天、更晚三类桶；
+    每天同时列出当天到期和当天开始（defer）的任务，一次切分完成
+    """
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    projects = _by_id(snapshot["projects"])
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    boundaries = [today + timedelta(days=i) for i in range(days + 1)]
+    due_buckets = get_date_index(snapshot, "due").buckets(boundaries)
+    defer_buckets = get_date_index(snapshot, "defer").buckets(boundaries)
+
+    lines = [f"Forecast (next {days} days)", "========================", ""]
+    overdue = due_buckets[0]
+    lines.append(f"[Overdue] ({len(overdue)})")
+    for i, task in enumerate(overdue, 1):
+        lines.append(_task_line(i, task, projects) + f" | Due: {parse_snapshot_date(task['due']).strftime('%Y-%m-%d')}")
+    for day in range(days):
+        date = boundaries[day]
+        due_tasks, starting = due_buckets[day + 1], defer_buckets[day + 1]
+        label = "Today" if day == 0 else "Tomorrow" if day == 1 else date.strftime("%a")
+        lines.append("")
+        lines.append(f"[{date.strftime('%Y-%m-%d')} {label}] ({len(due_tasks)} due, {len(starting)} starting)")
+        for i, task in enumerate(due_tasks, 1):
+            lines.append(_task_line(i, task, projects))
+        for i, task in enumerate(starting, len(due_tasks) + 1):
+            lines.append(_task_line(i, task, projects) + " | Starts")
+    later = due_buckets[-1]
+    lines.append("")
+    lines.append(f"[Later] ({len(later)} due after {boundaries[-1].strftime('%Y-%m-%d')})")
+    return "\n".join(lines)
 
 
 def list_projects() -> str:
     """列出所有项目"""
-    script = '''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set allProjects to every flattened project
-        set activeProjects to every flattened project whose status is active status
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    open_counts: Dict[str, int] = {}
+    for task in snapshot["tasks"]:
+        if not task["completed"] and task["project"]:
+            open_counts[task["project"]] = open_counts.get(task["project"], 0) + 1
 
-        set output to "All Projects (" & (count of allProjects) & ")
-========================
-
-[Active Projects]
-"
-        repeat with proj in activeProjects
-            try
-                set projName to name of proj
-                set projTasks to every task of proj whose completed is false
-                set output to output & "- " & projName & " (" & (count of projTasks) & " tasks)
-"
-            end try
-        end repeat
-
-        return output
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    lines = [f"All Projects ({len(snapshot['projects'])})", "========================", "", "[Active Projects]"]
+    for project in snapshot["projects"]:
+        if project_status(project) == "active":
+            lines.append(f"- {project['name']} ({open_counts.get(project['id'], 0)} tasks)")
+    return "\n".join(lines)
 
 
 def list_contexts() -> str:
     """列出所有上下文"""
-    script = '''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set allContexts to every flattened context
-        set output to "All Contexts (" & (count of allContexts) & ")
-========================
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    open_counts: Dict[str, int] = {}
+    for task in snapshot["tasks"]:
+        if not task["completed"] and task["context"]:
+            open_counts[task["context"]] = open_counts.get(task["context"], 0) + 1
 
-"
-        repeat with ctx in allContexts
-            try
-                set ctxName to name of ctx
-                set ctxTasks to every flattened task whose (completed is false) and (context is ctx)
-                set output to output & "- " & ctxName & " (" & (count of ctxTasks) & " tasks)
-"
-            end try
-        end repeat
-        return output
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    lines = [f"All Contexts ({len(snapshot['contexts'])})", "========================", ""]
+    for ctx in snapshot["contexts"]:
+        lines.append(f"- {ctx['name']} ({open_counts.get(ctx['id'], 0)} tasks)")
+    return "\n".join(lines)
 
 
 def list_folders() -> str:
     """列出所有文件夹"""
-    script = '''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set allFolders to every folder
-        set output to "All Folders (" & (count of allFolders) & ")
-========================
-
-"
-        repeat with f in allFolders
-            try
-                set fName to name of f
-                set output to output & "- " & fName & "
-"
-            end try
-        end repeat
-        return output
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    folders = [f for f in snapshot["folders"] if f.get("top", True)]
+    lines = [f"All Folders ({len(folders)})", "========================", ""]
+    for folder in folders:
+        lines.append(f"- {folder['name']}")
+    return "\n".join(lines)
 
 
 def list_perspectives() -> str:
     """列出所有透视"""
-    script = '''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    set allPerspectives to every built-in perspective
-    set output to "Built-in Perspectives (" & (count of allPerspectives) & ")
-========================
+    reply = get_backend().perspectives()
+    if "error" in reply:
+        return reply["error"]
+    lines = [f"Built-in Perspectives ({len(reply['names'])})", "========================", ""]
+    lines.extend(f"- {name}" for name in reply["names"])
+    return "\n".join(lines)
 
-"
-    repeat with p in allPerspectives
-        try
-            set pName to name of p
-            set output to output & "- " & pName & "
-"
-        end try
-    end repeat
-    return output
-end tell
-'''
-    return run_applescript(script)
 
+# 模糊匹配的最低相似度（trigram Dice 系数）与最多候选数
+FUZZY_MIN_SCORE = 0.3
+FUZZY_LIMIT = 5
 
-def add_task(name: str, project: Optional[str] = None, note: str = "",
-             context: Optional[str] = None, due: Optional[str] = None,
-             defer: Optional[str] = None, repeat_rule: Optional[str] = None) -> str:
-    """创建新任务，支持上下文、截止日期、开始日期、重复规则"""
-    name_str = escape_applescript_string(name)
-    project_str = escape_applescript_string(project) if project else ""
-    note_str = escape_applescript_string(note)
-    context_str = escape_applescript_string(context) if context else ""
-
-    # 构建任务属性
-    properties = [f'name:"{name_str}"']
-    if note_str:
-        properties.append(f'note:"{note_str}"')
-
-    # 处理截止日期
-    due_str = ""
-    if due:
-        due_date = parse_date(due)
-        if due_date:
-            due_str = format_date_for_applescript(due_date)
-            properties.append(f'due date:{due_str}')
-        else:
-            return f"Error: Invalid due date '{due}'"
-
-    # 处理开始日期
-    defer_str = ""
-    if defer:
-        defer_date = parse_date(defer)
-        if defer_date:
-            defer_str = format_date_for_applescript(defer_date)
-            properties.append(f'defer date:{defer_str}')
-        else:
-            return f"Error: Invalid defer date '{defer}'"
-
-    properties_dict = "{" + ", ".join(properties) + "}"
-
-    # 构建上下文设置脚本
-    context_script = ""
-    if context_str:
-        context_script = f'''
-try
-    set targetContext to first flattened context whose name is "{context_str}"
-    set context of newTask to targetContext
-on error
-    -- Context not found, task created without context
-end try
-'''
 
-    # 构建重复规则设置脚本
-    repeat_script = ""
-    if repeat_rule:
-        repeat_rule_escaped = escape_applescript_string(repeat_rule)
-        repeat_script = f'''
-try
-    set repetition rule of newTask to "{repeat_rule_escaped}"
-on error
-    -- Could not set repetition rule
-end try
-'''
+def _trigrams(text: str) -> set:
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
 
-    # 构建项目版本脚本
+class TaskIndex:
+    """
+    快照上的任务名索引：id、精确名、不区分大小写名、排序名（前缀）和 trigram（模糊）
+    同一快照只构建一次，写命令据此在本地解析出 id，OmniFocus 端按 id 直接定位；
+    精确匹配之外的结构在首次用到时才构建
+    """
+
+    def __init__(self, tasks: List[dict]):
+        self.tasks = tasks
+        self.by_id = {t["id"]: t for t in tasks}
+        self.by_name: Dict[str, List[dict]] = {}
+        for task in tasks:
+            self.by_name.setdefault(task["name"], []).append(task)
+        self.lowered: Optional[List[str]] = None
+        self.trigrams: Optional[Dict[str, List[int]]] = None
+
+    def _ensure_lowered(self):
+        if self.lowered is not None:
+            return
+        self.lowered = [t["name"].lower() for t in self.tasks]
+        self.by_lower: Dict[str, List[dict]] = {}
+        for task, name in zip(self.tasks, self.lowered):
+            self.by_lower.setdefault(name, []).append(task)
+        order = sorted(range(len(self.tasks)), key=self.lowered.__getitem__)
+        self.sorted_names = [self.lowered[pos] for pos in order]
+        self.sorted_tasks = [self.tasks[pos] for pos in order]
+
+    def _ensure_trigrams(self):
+        if self.trigrams is not None:
+            return
+        self.trigrams = {}
+        for pos, task in enumerate(self.tasks):
+            for gram in _trigrams(task["name"]):
+                self.trigrams.setdefault(gram, []).append(pos)
+
+    def case_insensitive(self, text: str) -> List[dict]:
+        """名称与 text 不区分大小写相同的任务"""
+        self._ensure_lowered()
+        return self.by_lower.get(text.lower(), [])
+
+    def prefix(self, text: str) -> List[dict]:
+        """名称以 text 开头（不区分大小写）的任务"""
+        self._ensure_lowered()
+        lowered = text.lower()
+        lo = bisect.bisect_left(self.sorted_names, lowered)
+        hi = bisect.bisect_left(self.sorted_names, lowered + "\uffff", lo)
+        return self.sorted_tasks[lo:hi]
+
+    def substring(self, text: str) -> List[dict]:
+        """名称包含 text（不区分大小写）的任务"""
+        self._ensure_lowered()
+        lowered = text.lower()
+        return [self.tasks[pos] for pos, name in enumerate(self.lowered) if lowered in name]
+
+    def fuzzy(self, text: str, accept=None, limit: int = FUZZY_LIMIT) -> List[Tuple[float, dict]]:
+        """
+        trigram 相似度最高的任务
+        返回: [(分数, 任务)]，按分数降序，只含分数不低于 FUZZY_MIN_SCORE 的
+        """
+        self._ensure_trigrams()
+        query = _trigrams(text)
+        shared: Dict[int, int] = {}
+        for gram in query:
+            for pos in self.trigrams.get(gram, ()):
+                shared[pos] = shared.get(pos, 0) + 1
+        scored = []
+        for pos, count in shared.items():
+            task = self.tasks[pos]
+            if accept is not None and not accept(task):
+                continue
+            score = 2 * count / (len(query) + len(_trigrams(task["name"])))
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((score, task))
+        scored.sort(key=lambda item: (-item[0], item[1]["name"]))
+        return scored[:limit]
+
+    def lookup(self, name: str, accept=None) -> Tuple[List[dict], str]:
+        """
+        逐级匹配：精确 → 不区分大小写 → 前缀 → 子串，返回第一级非空的结果
+        accept: 过滤函数（是否含已完成、所属项目）
+        返回: (任务列表, 匹配级别)；都没有时为 ([], "")
+        """
+        tiers = (
+            ("exact", lambda: self.by_name.get(name, [])),
+            ("case-insensitive", lambda: self.case_insensitive(name)),
+            ("prefix", lambda: self.prefix(name)),
+            ("substring", lambda: self.substring(name)),
+        )
+        for tier, candidates in tiers:
+            matches = [t for t in candidates() if accept is None or accept(t)]
+            if matches:
+                return matches, tier
+        return [], ""
+
+
+def get_task_index(snapshot: dict) -> TaskIndex:
+    """返回快照上的任务名索引；与日期索引一样随缓存的快照复用"""
+    if "_task_index" not in snapshot:
+        snapshot["_task_index"] = TaskIndex(snapshot["tasks"])
+    return snapshot["_task_index"]
+
+
+def task_ref(value, project: Optional[str] = None) -> dict:
+    """
+    把命令行的任务参数转换为引用 {"id"} 或 {"task", "project"}
+    "id:<id>" 形式按 id 解析；已是字典时原样返回
+    """
+    if isinstance(value, dict):
+        return value
+    if value.startswith("id:"):
+        return {"id": value[3:].strip()}
+    ref = {"task": value}
     if project:
-        project_msg = f"Project: {project_str}" + (f'\nDue: {due}' if due else '')
-        if context:
-            project_msg += f'\nContext: {context}'
+        ref["project"] = project
+    return ref
 
-        script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set targetProject to first flattened project whose name is "{project_str}"
-            tell targetProject
-                set newTask to make new task with properties {properties_dict}
-            end tell
-            {context_script}
-            {repeat_script}
-            return "Task created
-Name: {name_str}
-{project_msg}"
-        on error
-            return "Error: Project \\"{project_str}\\" not found"
-        end try
-    end tell
-end tell
-'''
-    else:
-        # 构建收件箱版本脚本
-        inbox_msg = f"Task created in inbox\nName: {name_str}" + (f'\nDue: {due}' if due else '')
-        if context:
-            inbox_msg += f'\nContext: {context}'
 
-        script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set newTask to make new inbox task with properties {properties_dict}
-        {context_script}
-        {repeat_script}
-            return "{inbox_msg}"
-    end tell
-end tell
-'''
+def _task_filter(snapshot: dict, include_completed: bool, project: Optional[str]):
+    """构造匹配过滤函数；project 按名称（不区分大小写）限定所属项目"""
+    project_ids = None
+    if project:
+        lowered = project.lower()
+        project_ids = {p["id"] for p in snapshot["projects"] if p["name"].lower() == lowered}
 
-    return run_applescript(script)
+    def accept(task: dict) -> bool:
+        if not include_completed and task["completed"]:
+            return False
+        return project_ids is None or task["project"] in project_ids
+    return accept
 
 
-def set_task_context(task_name: str, context_name: str) -> str:
-    """设置任务上下文"""
-    task_name_escaped = escape_applescript_string(task_name)
-    context_name_escaped = escape_applescript_string(context_name)
+def find_tasks(snapshot: dict, name: str, include_completed: bool = False,
+               project: Optional[str] = None) -> List[dict]:
+    """
+    按名称查找任务：精确匹配 → 不区分大小写 → 前缀 → 子串，取第一级非空结果
+    project: 只在该项目中查找
+    """
+    matches, _ = get_task_index(snapshot).lookup(name, _task_filter(snapshot, include_completed, project))
+    return matches
 
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                try
-                    set targetContext to first flattened context whose name is "{context_name_escaped}"
-                    set context of targetTask to targetContext
-                    return "Task context set
-Task: {task_name_escaped}
-Context: {context_name_escaped}"
-                on error
-                    return "Error: Context '{context_name_escaped}' not found"
-                end try
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to set task context - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
 
+def _candidate_lines(tasks: List[dict], projects: Dict[str, dict]) -> List[str]:
+    """候选任务列表（带 id），供歧义提示"""
+    return [f"{_task_line(i, task, projects, show_flag=False)} (id: {task['id']})"
+            for i, task in enumerate(tasks, 1)]
 
-def clear_task_context(task_name: str) -> str:
-    """清除任务上下文"""
-    task_name_escaped = escape_applescript_string(task_name)
 
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set context of targetTask to missing value
-                return "Task context cleared
-Task: {task_name_escaped}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to clear task context - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+def _match_ref(snapshot: dict, ref: dict, include_completed: bool = False) -> Tuple[List[dict], str]:
+    """
+    按 id 或名称（可限定项目）查找候选任务
+    返回: (候选列表, "")，没有候选时为 ([], 错误信息)
+    """
+    index = get_task_index(snapshot)
+    if not ref.get("id") and str(ref.get("task", "")).startswith("id:"):
+        ref = task_ref(ref["task"])
+    if ref.get("id"):
+        task = index.by_id.get(ref["id"])
+        if task is None:
+            return [], f"No task with id '{ref['id']}'"
+        return [task], ""
+
+    name = ref.get("task")
+    if not name:
+        return [], "Operation needs 'id' or 'task'"
+    accept = _task_filter(snapshot, include_completed, ref.get("project"))
+    matches, _ = index.lookup(name, accept)
+    if matches:
+        return matches, ""
+    where = f" in project '{ref['project']}'" if ref.get("project") else ""
+    suggestions = index.fuzzy(name, accept, limit=3)
+    if suggestions:
+        hints = ", ".join(f"'{t['name']}' (id:{t['id']})" for _, t in suggestions)
+        return [], f"No matching task found '{name}'{where}; did you mean {hints}?"
+    return [], f"No matching task found '{name}'{where}"
+
+
+def resolve_task(snapshot: dict, ref: dict, include_completed: bool = False) -> Tuple[Optional[dict], str]:
+    """
+    按 id 或名称（可限定项目）解析唯一目标任务
+    返回: (任务, "") 或 (None, 错误信息)
+    """
+    matches, error = _match_ref(snapshot, ref, include_completed)
+    if len(matches) > 1:
+        return None, f"Multiple matching tasks found for '{ref['task']}' ({len(matches)}), use an id or project"
+    return (matches[0], "") if matches else (None, error)
+
+
+def apply_ops(ops: List[dict]) -> dict:
+    """经后端执行已解析的操作，并使快照缓存失效"""
+    try:
+        return get_backend().apply(ops)
+    finally:
+        invalidate_snapshot_cache()
+
+
+def search_tasks(query: str, project: Optional[str] = None, include_completed: bool = False) -> str:
+    """按名称查找任务并显示 id；逐级匹配都没有结果时列出模糊匹配"""
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    index = get_task_index(snapshot)
+    accept = _task_filter(snapshot, include_completed, project)
+    projects = _by_id(snapshot["projects"])
+    matches, tier = index.lookup(query, accept)
+    if matches:
+        lines = [f"Matching tasks ({len(matches)}, {tier} match)", "========================", ""]
+        lines.extend(_candidate_lines(matches, projects))
+        return "\n".join(lines)
+    scored = index.fuzzy(query, accept)
+    if not scored:
+        return f"No matching task found '{query}'"
+    lines = [f"Similar tasks ({len(scored)})", "========================", ""]
+    for line, (score, _) in zip(_candidate_lines([t for _, t in scored], projects), scored):
+        lines.append(f"{line} {score:.0%}")
+    return "\n".join(lines)
+
+
+def _resolve_single(task_name, include_completed: bool = False) -> Tuple[Optional[dict], str]:
+    """
+    解析唯一任务；task_name 为名称、"id:<id>" 或 task_ref 返回的引用
+    返回: (任务, "") 或 (None, 要输出的信息)
+    """
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return None, snapshot["error"]
+    ref = task_ref(task_name)
+    matches, error = _match_ref(snapshot, ref, include_completed)
+    if not matches:
+        return None, f"Error: {error}"
+    if len(matches) > 1:
+        lines = ["Multiple matching tasks found, please be more specific (use id:<id> or --project):", ""]
+        lines.extend(_candidate_lines(matches, _by_id(snapshot["projects"])))
+        return None, "\n".join(lines)
+    return matches[0], ""
+
+
+def _apply_single(task: dict, op: dict, failure: str) -> str:
+    """对一个任务执行一个操作；成功返回空字符串，失败返回要输出的信息"""
+    outcome = apply_ops([dict(op, index=1, id=task["id"])])
+    if "error" in outcome:
+        return outcome["error"]
+    error = outcome["results"].get(1, "no result from OmniFocus")
+    if error:
+        return f"Error: {failure} - {error}"
+    return ""
+
+
+def _update_task(task_name, op: dict, failure: str, success: str,
+                 include_completed: bool = False) -> str:
+    """单任务写命令的公共流程；success 中的 "{name}" 替换为任务全名"""
+    task, message = _resolve_single(task_name, include_completed)
+    if task is None:
+        return message
+    message = _apply_single(task, op, failure)
+    return message or success.replace("{name}", task["name"])
+
+
+def _find_context(name: str) -> Tuple[Optional[str], str]:
+    """按名称查找上下文 id"""
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return None, snapshot["error"]
+    context = next((c for c in snapshot["contexts"] if c["name"] == name), None)
+    if context is None:
+        return None, f"Error: Context '{name}' not found"
+    return context["id"], ""
+
+
+def add_task(name: str, project: Optional[str] = None, note: str = "",
+             context: Optional[str] = None, due: Optional[str] = None,
+             defer: Optional[str] = None, repeat_rule: Optional[str] = None) -> str:
+    """创建新任务，支持上下文、截止日期、开始日期、重复规则"""
+    due_date = parse_date(due) if due else None
+    if due and not due_date:
+        return f"Error: Invalid due date '{due}'"
+    defer_date = parse_date(defer) if defer else None
+    if defer and not defer_date:
+        return f"Error: Invalid defer date '{defer}'"
+
+    project_id = None
+    context_id = None
+    if project or context:
+        snapshot = load_snapshot()
+        if "error" in snapshot:
+            return snapshot["error"]
+        if project:
+            target = next((p for p in snapshot["projects"] if p["name"] == project), None)
+            if target is None:
+                return f'Error: Project "{project}" not found'
+            project_id = target["id"]
+        if context:
+            # 上下文不存在时照常创建任务，只是不设置上下文
+            target = next((c for c in snapshot["contexts"] if c["name"] == context), None)
+            context_id = target["id"] if target else None
+
+    try:
+        reply = get_backend().add_task(name, note=note, project_id=project_id, context_id=context_id,
+                                       due=due_date, defer=defer_date, repeat_rule=repeat_rule)
+    finally:
+        invalidate_snapshot_cache()
+    if "error" in reply:
+        return reply["error"]
+
+    message = f"Task created\nName: {name}\nProject: {project}" if project else f"Task created in inbox\nName: {name}"
+    if due:
+        message += f"\nDue: {due}"
+    if context:
+        message += f"\nContext: {context}"
+    return message
+
+
+def set_task_context(task_name: str, context_name: str, project: Optional[str] = None) -> str:
+    """设置任务上下文"""
+    context_id, message = _find_context(context_name)
+    if context_id is None:
+        return message
+    return _update_task(task_ref(task_name, project), {"op": "set-context", "context_id": context_id},
+                        "Failed to set task context",
+                        f"Task context set\nTask: {{name}}\nContext: {context_name}")
+
+
+def clear_task_context(task_name: str, project: Optional[str] = None) -> str:
+    """清除任务上下文"""
+    return _update_task(task_ref(task_name, project), {"op": "clear-context"}, "Failed to clear task context",
+                        "Task context cleared\nTask: {name}")
 
 
-def set_task_due(task_name: str, date_str: str) -> str:
+def set_task_due(task_name: str, date_str: str, project: Optional[str] = None) -> str:
     """设置任务截止日期"""
-    task_name_escaped = escape_applescript_string(task_name)
     due_date = parse_date(date_str)
-
     if not due_date:
         return f"Error: Invalid due date '{date_str}'"
+    return _update_task(task_ref(task_name, project), {"op": "set-due", "date": due_date}, "Failed to set task due date",
+                        f"Task due date set\nTask: {{name}}\nDue: {due_date.strftime('%Y-%m-%d')}")
 
-    due_formatted = format_date_for_applescript(due_date)
-    due_display = due_date.strftime("%Y-%m-%d")
 
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set due date of targetTask to {due_formatted}
-                return "Task due date set
-Task: {task_name_escaped}
-Due: {due_display}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to set task due date - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
-
-
-def clear_task_due(task_name: str) -> str:
+def clear_task_due(task_name: str, project: Optional[str] = None) -> str:
     """清除任务截止日期"""
-    task_name_escaped = escape_applescript_string(task_name)
-
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set due date of targetTask to missing value
-                return "Task due date cleared
-Task: {task_name_escaped}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to clear task due date - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    return _update_task(task_ref(task_name, project), {"op": "clear-due"}, "Failed to clear task due date",
+                        "Task due date cleared\nTask: {name}")
 
 
-def set_task_defer(task_name: str, date_str: str) -> str:
+def set_task_defer(task_name: str, date_str: str, project: Optional[str] = None) -> str:
     """设置任务开始日期（defer date）"""
-    task_name_escaped = escape_applescript_string(task_name)
     defer_date = parse_date(date_str)
-
     if not defer_date:
         return f"Error: Invalid defer date '{date_str}'"
+    return _update_task(task_ref(task_name, project), {"op": "set-defer", "date": defer_date}, "Failed to set task defer date",
+                        f"Task defer date set\nTask: {{name}}\nDefer: {defer_date.strftime('%Y-%m-%d')}")
 
-    defer_formatted = format_date_for_applescript(defer_date)
-    defer_display = defer_date.strftime("%Y-%m-%d")
 
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set defer date of targetTask to {defer_formatted}
-                return "Task defer date set
-Task: {task_name_escaped}
-Defer: {defer_display}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to set task defer date - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
-
-
-def clear_task_defer(task_name: str) -> str:
+def clear_task_defer(task_name: str, project: Optional[str] = None) -> str:
     """清除任务开始日期"""
-    task_name_escaped = escape_applescript_string(task_name)
-
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set defer date of targetTask to missing value
-                return "Task defer date cleared
-Task: {task_name_escaped}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to clear task defer date - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    return _update_task(task_ref(task_name, project), {"op": "clear-defer"}, "Failed to clear task defer date",
+                        "Task defer date cleared\nTask: {name}")
 
 
-def set_task_repetition(task_name: str, recurrence: str) -> str:
+def set_task_repetition(task_name: str, recurrence: str, project: Optional[str] = None) -> str:
     """设置任务重复规则"""
-    task_name_escaped = escape_applescript_string(task_name)
-    recurrence_escaped = escape_applescript_string(recurrence)
+    return _update_task(task_ref(task_name, project), {"op": "set-repeat", "rule": recurrence}, "Failed to set task repetition",
+                        f"Task repetition rule set\nTask: {{name}}\nRule: {recurrence}")
 
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set repetition rule of targetTask to "{recurrence_escaped}"
-                return "Task repetition rule set
-Task: {task_name_escaped}
-Rule: {recurrence_escaped}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to set task repetition - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
 
-
-def clear_task_repetition(task_name: str) -> str:
+def clear_task_repetition(task_name: str, project: Optional[str] = None) -> str:
     """清除任务重复规则"""
-    task_name_escaped = escape_applescript_string(task_name)
-
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set repetition rule of targetTask to ""
-                return "Task repetition rule cleared
-Task: {task_name_escaped}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to clear task repetition - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    return _update_task(task_ref(task_name, project), {"op": "clear-repeat"}, "Failed to clear task repetition",
+                        "Task repetition rule cleared\nTask: {name}")
 
 
-def append_note(task_name: str, note: str) -> str:
+def append_note(task_name: str, note: str, project: Optional[str] = None) -> str:
     """追加任务备注"""
-    task_name_escaped = escape_applescript_string(task_name)
-    note_escaped = escape_applescript_string(note)
-
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{task_name_escaped}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{task_name_escaped}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set existingNote to note of targetTask
-                if existingNote is "" then
-                    set note of targetTask to "{note_escaped}"
-                else
-                    set note of targetTask to existingNote & "\\n\\n" & "{note_escaped}"
-                end if
-                return "Note appended to task
-Task: {task_name_escaped}"
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to append note - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    return _update_task(task_ref(task_name, project), {"op": "append-note", "note": note}, "Failed to append note",
+                        "Note appended to task\nTask: {name}")
 
 
 def show_project(project_name: str) -> str:
     """显示项目详情"""
-    project_name_escaped = escape_applescript_string(project_name)
-
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set targetProject to first flattened project whose name is "{project_name_escaped}"
-            set allTasks to every task of targetProject
-            set incompleteTasks to every task of targetProject whose completed is false
-            set completedTasks to every task of targetProject whose completed is true
-
-            set projectStatus to status of targetProject as string
-            set projectNote to note of targetProject
-            if projectNote is "" then
-                set projectNote to "(no note)"
-            end if
-
-            set output to "Project: {project_name_escaped}
-========================
-
-Status: " & projectStatus & "
-Total Tasks: " & (count of allTasks) & "
-Incomplete: " & (count of incompleteTasks) & "
-Completed: " & (count of completedTasks) & "
-
-Note:
-" & projectNote & "
-
-[Tasks]
-"
-            set taskCount to 0
-            repeat with t in incompleteTasks
-                try
-                    set taskCount to taskCount + 1
-                    set taskName to name of t
-                    set flagStr to ""
-                    if flagged of t then set flagStr to "[Flagged] "
-                    set output to output & taskCount & ". " & flagStr & taskName & "
-"
-                end try
-            end repeat
-            return output
-        on error
-            return "Error: Project '{project_name_escaped}' not found"
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return snapshot["error"]
+    project = next((p for p in snapshot["projects"] if p["name"] == project_name), None)
+    if project is None:
+        return f"Error: Project '{project_name}' not found"
+
+    tasks = [t for t in snapshot["tasks"] if t["project"] == project["id"]]
+    incomplete = [t for t in tasks if not t["completed"]]
+    lines = [
+        f"Project: {project_name}",
+        "========================",
+        "",
+        f"Status: {project_status(project)}",
+        f"Total Tasks: {len(tasks)}",
+        f"Incomplete: {len(incomplete)}",
+        f"Completed: {len(tasks) - len(incomplete)}",
+        "",
+        "Note:",
+        project["note"] or "(no note)",
+        "",
+        "[Tasks]",
+    ]
+    for i, task in enumerate(incomplete, 1):
+        lines.append(_task_line(i, task, {}, show_project=False))
+    return "\n".join(lines)
 
 
 def create_project(project_name: str, folder_name: Optional[str] = None) -> str:
     """创建新项目"""
-    project_name_escaped = escape_applescript_string(project_name)
-    folder_name_escaped = escape_applescript_string(folder_name) if folder_name else ""
+    folder_id = None
+    if folder_name:
+        snapshot = load_snapshot()
+        if "error" in snapshot:
+            return snapshot["error"]
+        folder = next((f for f in snapshot["folders"] if f["name"] == folder_name), None)
+        if folder is None:
+            return f"Error: Folder '{folder_name}' not found"
+        folder_id = folder["id"]
 
+    try:
+        reply = get_backend().create_project(project_name, folder_id)
+    finally:
+        invalidate_snapshot_cache()
+    if "error" in reply:
+        return reply["error"]
     if folder_name:
-        script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set targetFolder to first folder whose name is "{folder_name_escaped}"
-            tell targetFolder
-                set newProject to make new project with properties {{name:"{project_name_escaped}"}}
-            end tell
-            return "Project created
-Name: {project_name_escaped}
-Folder: {folder_name_escaped}"
-        on error
-            return "Error: Folder '{folder_name_escaped}' not found"
-        end try
-    end tell
-end tell
-'''
-    else:
-        script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set newProject to make new project with properties {{name:"{project_name_escaped}"}}
-        return "Project created in root
-Name: {project_name_escaped}"
-    end tell
-end tell
-'''
-    return run_applescript(script)
+        return f"Project created\nName: {project_name}\nFolder: {folder_name}"
+    return f"Project created in root\nName: {project_name}"
 
 
 def create_folder(folder_name: str) -> str:
     """创建新文件夹"""
-    folder_name_escaped = escape_applescript_string(folder_name)
-
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        set newFolder to make new folder with properties {{name:"{folder_name_escaped}"}}
-        return "Folder created
-Name: {folder_name_escaped}"
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    try:
+        reply = get_backend().create_folder(folder_name)
+    finally:
+        invalidate_snapshot_cache()
+    if "error" in reply:
+        return reply["error"]
+    return f"Folder created\nName: {folder_name}"
 
 
 def activate_perspective(perspective_name: str) -> str:
     """激活指定透视"""
-    perspective_name_escaped = escape_applescript_string(perspective_name)
+    reply = get_backend().activate_perspective(perspective_name)
+    if "error" in reply:
+        return reply["error"]
+    return f"Perspective activated: {perspective_name}"
 
-    script = f'''
-tell application "OmniFocus"
-    if not running then
-        activate
-    end if
-    try
-        set targetPerspective to first built-in perspective whose name is "{perspective_name_escaped}"
-        activate perspective targetPerspective
-        return "Perspective activated: {perspective_name_escaped}"
-    on error
-        return "Error: Perspective '{perspective_name_escaped}' not found"
-    end try
-end tell
-'''
-    return run_applescript(script)
 
-
-def complete_task(name: str) -> str:
+def complete_task(name: str, project: Optional[str] = None) -> str:
     """完成任务"""
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{name}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{name}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set taskNameFull to name of targetTask
-                set completed of targetTask to true
-                return "Task completed
-" & taskNameFull
-            else
-                set output to "Multiple matching tasks found, please be more specific:
-
-"
-                set i to 1
-                repeat with t in matchingTasks
-                    try
-                        set n to name of t
-                        set projName to ""
-                        try
-                            set projName to name of (containing project of t)
-                        end try
-                        set output to output & i & ". " & n
-                        if projName is not "" then
-                            set output to output & " [" & projName & "]"
-                        end if
-                        set output to output & "
-"
-                        set i to i + 1
-                    end try
-                end repeat
-                return output
-            end if
-        on error errMsg
-            return "Error: Failed to complete task - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    return _update_task(task_ref(name, project), {"op": "complete"}, "Failed to complete task",
+                        "Task completed\n{name}")
 
 
-def toggle_flag(name: str) -> str:
+def toggle_flag(name: str, project: Optional[str] = None) -> str:
     """切换任务标记状态"""
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{name}" and completed is false
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{name}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set taskNameFull to name of targetTask
-                set currentFlag to flagged of targetTask
-                set flagged of targetTask to (not currentFlag)
-
-                if currentFlag then
-                    return "Task unflagged
-" & taskNameFull
-                else
-                    return "Task flagged
-" & taskNameFull
-                end if
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to flag task - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    task, message = _resolve_single(task_ref(name, project))
+    if task is None:
+        return message
+    message = _apply_single(task, {"op": "toggle-flag"}, "Failed to flag task")
+    if message:
+        return message
+    return f"Task {'unflagged' if task['flagged'] else 'flagged'}\n{task['name']}"
 
 
-def delete_task(name: str) -> str:
+def delete_task(name: str, project: Optional[str] = None) -> str:
     """删除任务"""
-    script = f'''
-tell application "OmniFocus"
-    if not running then return "OmniFocus is not running"
-    tell front document
-        try
-            set matchingTasks to every flattened task whose name contains "{name}"
-
-            if (count of matchingTasks) = 0 then
-                return "Error: No matching task found '{name}'"
-            else if (count of matchingTasks) = 1 then
-                set targetTask to first item of matchingTasks
-                set taskNameFull to name of targetTask
-                delete targetTask
-                return "Task deleted
-" & taskNameFull
-            else
-                return "Multiple matching tasks found, please be more specific"
-            end if
-        on error errMsg
-            return "Error: Failed to delete task - " & errMsg
-        end try
-    end tell
-end tell
-'''
-    return run_applescript(script)
+    return _update_task(task_ref(name, project), {"op": "delete"}, "Failed to delete task", "Task deleted\n{name}",
+                        include_completed=True)
+
+
+# batch 支持的操作 -> 所需参数
+BATCH_OPS = {
+    "complete": (),
+    "flag": (),
+    "unflag": (),
+    "toggle-flag": (),
+    "delete": (),
+    "set-due": ("date",),
+    "clear-due": (),
+    "set-defer": ("date",),
+    "clear-defer": (),
+    "set-context": ("context",),
+    "clear-context": (),
+    "set-repeat": ("rule",),
+    "clear-repeat": (),
+    "append-note": ("note",),
+}
+
+
+def parse_batch_input(text: str) -> List[dict]:
+    """解析 JSON 数组或 NDJSON（每行一个操作）"""
+    text = text.strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        ops = json.loads(text)
+    else:
+        ops = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not all(isinstance(op, dict) for op in ops):
+        raise ValueError("each operation must be a JSON object")
+    return ops
+
+
+def plan_batch(snapshot: dict, ops: List[dict]) -> Tuple[List[dict], List[str]]:
+    """
+    一次性解析所有操作的目标任务和参数
+    返回: (计划列表, 错误列表)；计划项是后端可直接执行的操作
+        {"index", "op", "id", "date"/"context_id"/"rule"/"note"}，另带 "task" 供展示
+    """
+    contexts = {c["name"]: c["id"] for c in snapshot["contexts"]}
+    plan = []
+    errors = []
+    for index, op in enumerate(ops, 1):
+        kind = op.get("op")
+        if kind not in BATCH_OPS:
+            errors.append(f"#{index}: Unknown operation '{kind}'")
+            continue
+        missing = [arg for arg in BATCH_OPS[kind] if op.get(arg) in (None, "")]
+        if missing:
+            errors.append(f"#{index} {kind}: missing {', '.join(missing)}")
+            continue
+        task, error = resolve_task(snapshot, op, include_completed=(kind == "delete"))
+        if error:
+            errors.append(f"#{index} {kind}: {error}")
+            continue
+        item = {"index": index, "op": kind, "id": task["id"], "task": task}
+        if "date" in BATCH_OPS[kind]:
+            item["date"] = parse_date(str(op["date"]))
+            if not item["date"]:
+                errors.append(f"#{index} {kind}: Invalid date '{op['date']}'")
+                continue
+        elif kind == "set-context":
+            item["context_id"] = contexts.get(op["context"])
+            if item["context_id"] is None:
+                errors.append(f"#{index} {kind}: Context '{op['context']}' not found")
+                continue
+        elif kind == "set-repeat":
+            item["rule"] = str(op["rule"])
+        elif kind == "append-note":
+            item["note"] = str(op["note"])
+        plan.append(item)
+    return plan, errors
+
+
+def run_batch(ops: List[dict], dry_run: bool = False) -> Tuple[List[dict], List[str]]:
+    """
+    解析并执行一批操作（单次 OmniFocus 调用）
+    任何操作解析失败时整批不执行
+    返回: (每个操作的结果列表, 错误列表)
+    """
+    snapshot = load_snapshot()
+    if "error" in snapshot:
+        return [], [snapshot["error"]]
+    plan, errors = plan_batch(snapshot, ops)
+    if errors:
+        return [], errors
+    results = [{"index": item["index"], "op": item["op"], "id": item["id"],
+                "task": item["task"]["name"], "status": "planned"} for item in plan]
+    if dry_run or not plan:
+        return results, []
+
+    outcome = apply_ops(plan)
+    if "error" in outcome:
+        return [], [outcome["error"]]
+    for result in results:
+        if result["index"] not in outcome["results"]:
+            result["status"] = "unknown"
+        elif outcome["results"][result["index"]] is None:
+            result["status"] = "ok"
+        else:
+            result["status"] = "error"
+            result["error"] = outcome["results"][result["index"]]
+    return results, []
+
+
+def batch_command(source: Optional[str], dry_run: bool = False, as_json: bool = False) -> str:
+    """batch 命令：从文件或标准输入读取操作并执行"""
+    try:
+        if source and source != "-":
+            with open(os.path.expanduser(source), "r", encoding="utf-8") as f:
+                text = f.read()
+        else:
+            text = sys.stdin.read()
+        ops = parse_batch_input(text)
+    except OSError as e:
+        return f"Error: Could not read batch file - {e}"
+    except ValueError as e:
+        return f"Error: Invalid batch input - {e}"
+    if not ops:
+        return "Error: No operations in batch"
+
+    results, errors = run_batch(ops, dry_run=dry_run)
+    if as_json:
+        return json.dumps({"results": results, "errors": errors}, ensure_ascii=False, indent=2)
+    if errors:
+        return "Batch not applied\n" + "\n".join(f"Error: {e}" if not e.startswith("Error") else e for e in errors)
+
+    lines = [f"Batch {'plan' if dry_run else 'results'} ({len(results)} operations)", "========================", ""]
+    for result in results:
+        line = f"{result['index']}. {result['op']} {result['task']}: {result['status']}"
+        if result.get("error"):
+            line += f" - {result['error']}"
+        lines.append(line)
+    if not dry_run:
+        failed = sum(1 for r in results if r["status"] != "ok")
+        lines.append("")
+        lines.append(f"Applied: {len(results) - failed}  Failed: {failed}")
+    return "\n".join(lines)
 
 
 def print_usage():
@@ -1301,7 +1777,19 @@ Core Commands:
   due tomorrow        - Show tasks due tomorrow
   due week            - Show tasks due this week
   due overdue         - Show overdue tasks
+  due <start>..<end>  - Show tasks due in a date range (either end optional)
+  due today tomorrow  - Several ranges in one call
+  due week --defer    - Filter by defer date instead of due date
+  forecast [days]     - Overdue, then per-day due/starting tasks (default 7)
   projects            - List all projects
+  find <name> [--project <name>] [--all] - Find tasks and show their ids
+                        (exact, then prefix/substring, then fuzzy suggestions)
+
+Task References:
+  Commands that take <task>/<name> of an existing task accept:
+    "Task name"         - exact, case-insensitive, prefix, then substring match
+    id:<task id>        - direct id lookup (see find)
+  --project <name>      - only match tasks in this project
 
 Contexts:
   contexts            - List all contexts
@@ -1349,6 +1837,18 @@ Perspective Operations:
   perspectives        - List all perspectives
   activate-perspective <name> - Activate perspective
 
+Batch Operations:
+  batch [file] [--dry-run] [--json] - Apply JSON/NDJSON operations in one OmniFocus call
+    (reads stdin when file is omitted or "-")
+    Each operation: {"op": ..., "task": <name> [, "project": <name>] | "id": <task id>, ...}
+    Ops: complete, flag, unflag, toggle-flag, delete, clear-due, clear-defer,
+         clear-context, clear-repeat, set-due {"date"}, set-defer {"date"},
+         set-context {"context"}, set-repeat {"rule"}, append-note {"note"}
+
+Snapshot Cache:
+  cache               - Show snapshot cache status
+  cache clear         - Drop the cached snapshot
+
 Date Formats:
   Natural: "今天", "明天", "tomorrow", "next week"
   Relative: "+3d", "+1w", "+2m"
@@ -1402,20 +1902,33 @@ def main():
     elif cmd == "flagged":
         print(list_flagged())
     elif cmd == "due":
+        # --defer 按开始日期筛选；"--defer today" 形式时值也作为范围
+        defer_flag = kwargs.get('defer')
+        if isinstance(defer_flag, str):
+            positional.append(defer_flag)
+        field = "defer" if defer_flag else "due"
         if positional:
-            range_val = positional[0].lower()
-            if range_val in ('today', 'tomorrow', 'week', 'overdue'):
-                print(list_due_by_range(range_val))
+            range_vals = [p.lower() for p in positional]
+            if len(range_vals) == 1 and range_vals[0].isdigit():
+                print(list_due(int(range_vals[0]), field))
             else:
-                try:
-                    days = int(range_val)
-                    print(list_due(days))
-                except ValueError:
-                    print(f"Error: Invalid due range '{range_val}'")
+                print(list_due_ranges(range_vals, field))
         else:
-            print(list_due(7))
+            print(list_due(7, field))
+    elif cmd == "forecast":
+        try:
+            days = int(positional[0]) if positional else 7
+        except ValueError:
+            print(f"Error: Invalid number of days '{positional[0]}'")
+            return
+        print(forecast(days))
     elif cmd == "projects":
         print(list_projects())
+    elif cmd == "find":
+        if not positional:
+            print("Error: Please provide task name")
+            return
+        print(search_tasks(positional[0], kwargs.get('project'), include_completed=bool(kwargs.get('all'))))
 
     # Contexts
     elif cmd == "contexts":
@@ -1424,12 +1937,12 @@ def main():
         if len(positional) < 2:
             print("Error: Please provide task name and context name")
             return
-        print(set_task_context(positional[0], positional[1]))
+        print(set_task_context(positional[0], positional[1], project=kwargs.get('project')))
     elif cmd == "clear-context":
         if not positional:
             print("Error: Please provide task name")
             return
-        print(clear_task_context(positional[0]))
+        print(clear_task_context(positional[0], project=kwargs.get('project')))
 
     # Task operations
     elif cmd == "add":
@@ -1448,60 +1961,60 @@ def main():
         if not positional:
             print("Error: Please provide task name")
             return
-        print(complete_task(positional[0]))
+        print(complete_task(positional[0], project=kwargs.get('project')))
     elif cmd == "flag":
         if not positional:
             print("Error: Please provide task name")
             return
-        print(toggle_flag(positional[0]))
+        print(toggle_flag(positional[0], project=kwargs.get('project')))
     elif cmd == "delete":
         if not positional:
             print("Error: Please provide task name")
             return
-        print(delete_task(positional[0]))
+        print(delete_task(positional[0], project=kwargs.get('project')))
 
     # Due date operations
     elif cmd == "set-due":
         if len(positional) < 2:
             print("Error: Please provide task name and date")
             return
-        print(set_task_due(positional[0], positional[1]))
+        print(set_task_due(positional[0], positional[1], project=kwargs.get('project')))
     elif cmd == "clear-due":
         if not positional:
             print("Error: Please provide task name")
             return
-        print(clear_task_due(positional[0]))
+        print(clear_task_due(positional[0], project=kwargs.get('project')))
 
     # Defer date operations
     elif cmd == "set-defer":
         if len(positional) < 2:
             print("Error: Please provide task name and date")
             return
-        print(set_task_defer(positional[0], positional[1]))
+        print(set_task_defer(positional[0], positional[1], project=kwargs.get('project')))
     elif cmd == "clear-defer":
         if not positional:
             print("Error: Please provide task name")
             return
-        print(clear_task_defer(positional[0]))
+        print(clear_task_defer(positional[0], project=kwargs.get('project')))
 
     # Repetition operations
     elif cmd == "set-repeat":
         if len(positional) < 2:
             print("Error: Please provide task name and repetition rule")
             return
-        print(set_task_repetition(positional[0], positional[1]))
+        print(set_task_repetition(positional[0], positional[1], project=kwargs.get('project')))
     elif cmd == "clear-repeat":
         if not positional:
             print("Error: Please provide task name")
             return
-        print(clear_task_repetition(positional[0]))
+        print(clear_task_repetition(positional[0], project=kwargs.get('project')))
 
     # Note operations
     elif cmd == "append-note":
         if len(positional) < 2:
             print("Error: Please provide task name and note text")
             return
-        print(append_note(positional[0], positional[1]))
+        print(append_note(positional[0], positional[1], project=kwargs.get('project')))
 
     # Project operations
     elif cmd == "show-project":
@@ -1534,6 +2047,26 @@ def main():
             return
         print(activate_perspective(positional[0]))
 
+    # Batch operations
+    elif cmd == "batch":
+        source = positional[0] if positional else None
+        print(batch_command(source, dry_run=bool(kwargs.get('dry_run')), as_json=bool(kwargs.get('json'))))
+
+    # Snapshot cache
+    elif cmd == "cache":
+        cache = get_snapshot_cache()
+        if positional and positional[0] == "clear":
+            cache.clear()
+            print("Snapshot cache cleared")
+            return
+        stats = cache.stats()
+        print(f"Snapshot cache: {cache.path}")
+        print(f"Mode: {CACHE_MODE}")
+        print(f"Exported: {stats['exported'] or 'never'}")
+        print(f"Fresh: {'yes' if stats['fresh'] else 'no (next read re-exports)'}")
+        print(f"Tasks: {stats['tasks']}  Projects: {stats['projects']}  "
+              f"Contexts: {stats['contexts']}  Folders: {stats['folders']}")
+
     else:
         print(f"Unknown command: {cmd}")
         print_usage()
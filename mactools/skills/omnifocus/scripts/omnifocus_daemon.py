@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+OmniFocus 常驻查询进程
+在本地 Unix socket 上监听，复用一个长期运行的 JXA worker 执行 AppleScript。
+worker 通过 NSAppleScript 在进程内执行脚本，已编译的脚本按源码缓存，
+与 OmniFocus 的 Apple Event 连接保持不变，省去每条命令启动 osascript、
+重新编译脚本和重新连接 OmniFocus 的开销。
+
+omnifocus_cli.py 在 socket 存在时自动作为客户端转发脚本，
+连接失败时回退到单次 osascript 调用。
+
+Usage:
+    python3 omnifocus_daemon.py start      # 后台启动
+    python3 omnifocus_daemon.py status     # 查看运行状态与统计
+    python3 omnifocus_daemon.py stop       # 停止
+    python3 omnifocus_daemon.py serve      # 前台运行（调试用）
+"""
+
+import argparse
+import json
+import os
+import select
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from omnifocus_cli import DAEMON_SOCKET, SCRIPT_TIMEOUT, daemon_request  # noqa: E402
+
+# 空闲超过该秒数自动退出，避免常驻进程无限期占用 OmniFocus 连接
+IDLE_TIMEOUT = float(os.environ.get("OMNIFOCUS_DAEMON_IDLE", "900"))
+# worker 中保留的已编译脚本数量上限
+COMPILED_CACHE_SIZE = 128
+
+# JXA worker：逐行读取 JSON 请求，AppleScript 用 NSAppleScript 编译执行，
+# JXA 函数体直接在 worker 内执行，逐行写回 JSON 结果。
+# 请求由 Python 以 ensure_ascii 编码，因此按字节切行不会截断多字节字符。
+WORKER_JS = r'''
+ObjC.import('Foundation');
+
+function errorMessage(info) {
+    if (!info || info.isNil()) return 'Unknown AppleScript error';
+    var msg = info.objectForKey('NSAppleScriptErrorMessage');
+    return msg.isNil() ? 'Unknown AppleScript error' : ObjC.unwrap(msg);
+}
+
+function remember(cache, order, key, value) {
+    cache[key] = value;
+    order.push(key);
+    if (order.length > CACHE_SIZE) delete cache[order.shift()];
+}
+
+function handle(req, cache, order) {
+    var key = (req.lang || 'applescript') + ':' + req.source;
+    var compiled = cache[key];
+    var cached = !!compiled;
+    if (req.lang === 'javascript') {
+        // JXA 函数体在 worker 内直接执行，复用同一个 OmniFocus Application 连接
+        if (!compiled) {
+            compiled = new Function(req.source);
+            remember(cache, order, key, compiled);
+        }
+        var value = compiled();
+        return {ok: true, result: value === undefined || value === null ? '' : String(value), cached: cached};
+    }
+    if (!compiled) {
+        compiled = $.NSAppleScript.alloc.initWithSource($(req.source));
+        var compileErr = Ref();
+        if (!compiled.compileAndReturnError(compileErr)) {
+            return {ok: false, error: errorMessage(compileErr[0])};
+        }
+        remember(cache, order, key, compiled);
+    }
+    var runErr = Ref();
+    var desc = compiled.executeAndReturnError(runErr);
+    if (!desc || desc.isNil()) {
+        return {ok: false, error: errorMessage(runErr[0]), cached: cached};
+    }
+    var text = desc.stringValue;
+    return {ok: true, result: text.isNil() ? '' : ObjC.unwrap(text), cached: cached};
+}
+
+function run() {
+    var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+    var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+    var cache = {};
+    var order = [];
+    var buffer = '';
+    while (true) {
+        var data = stdin.availableData;
+        if (data.length === 0) break;
+        buffer += ObjC.unwrap($.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding));
+        var nl;
+        while ((nl = buffer.indexOf('\n')) >= 0) {
+            var line = buffer.slice(0, nl);
+            buffer = buffer.slice(nl + 1);
+            var reply;
+            try {
+                reply = handle(JSON.parse(line), cache, order);
+            } catch (e) {
+                reply = {ok: false, error: String(e)};
+            }
+            stdout.writeData($(JSON.stringify(reply) + '\n').dataUsingEncoding($.NSUTF8StringEncoding));
+        }
+    }
+}
+'''.replace("CACHE_SIZE", str(COMPILED_CACHE_SIZE))
+
+
+class Worker:
+    """管理 JXA worker 子进程；超时或崩溃时重启"""
+
+    def __init__(self):
+        self.proc = None
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.cached = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+
+    def _ensure(self):
+        if self.proc is None or self.proc.poll() is not None:
+            if self.proc is not None:
+                self.restarts += 1
+            self.proc = subprocess.Popen(
+                ['osascript', '-l', 'JavaScript', '-e', WORKER_JS],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+
+    def kill(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc = None
+
+    def run(self, source: str, lang: str = "applescript", timeout: float = SCRIPT_TIMEOUT) -> dict:
+        """执行一段 AppleScript 或 JXA 函数体，返回 {"ok": bool, "result"/"error": str}"""
+        with self.lock:
+            started = time.monotonic()
+            try:
+                self._ensure()
+                line = json.dumps({"lang": lang, "source": source}, ensure_ascii=True) + "\n"
+                self.proc.stdin.write(line.encode("ascii"))
+                self.proc.stdin.flush()
+                ready, _, _ = select.select([self.proc.stdout], [], [], timeout)
+                if not ready:
+                    self.kill()
+                    return {"ok": False, "error": "Script execution timed out"}
+                raw = self.proc.stdout.readline()
+                if not raw:
+                    self.kill()
+                    return {"ok": False, "error": "OmniFocus worker exited unexpectedly"}
+                reply = json.loads(raw)
+            except (OSError, ValueError) as e:
+                self.kill()
+                return {"ok": False, "error": str(e)}
+            finally:
+                self.requests += 1
+                self.busy_seconds += time.monotonic() - started
+            if reply.get("cached"):
+                self.cached += 1
+            return reply
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        self.worker = Worker()
+        self.started = time.time()
+        self.last_used = time.monotonic()
+        super().__init__(path, RequestHandler)
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "requests": self.worker.requests,
+            "compiled_cache_hits": self.worker.cached,
+            "worker_restarts": self.worker.restarts,
+            "busy_seconds": round(self.worker.busy_seconds, 3),
+        }
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """每个连接一条请求：{"op": "run"|"ping"|"stop", "lang": ..., "source": ...}"""
+
+    def handle(self):
+        raw = self.rfile.readline()
+        if not raw:
+            return
+        self.server.last_used = time.monotonic()
+        try:
+            req = json.loads(raw)
+        except ValueError:
+            reply = {"ok": False, "error": "Invalid request"}
+        else:
+            op = req.get("op", "run")
+            if op == "ping":
+                reply = {"ok": True, "result": self.server.stats()}
+            elif op == "stop":
+                reply = {"ok": True, "result": "stopping"}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif op == "run":
+                reply = self.server.worker.run(req.get("source", ""), req.get("lang", "applescript"))
+            else:
+                reply = {"ok": False, "error": f"Unknown op '{op}'"}
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+        self.server.last_used = time.monotonic()
+
+
+def _ping(path: str, timeout: float = 2) -> dict:
+    reply = daemon_request({"op": "ping"}, path=path, timeout=timeout)
+    return reply if reply and reply.get("ok") else None
+
+
+def _watch_idle(server: DaemonServer):
+    while True:
+        time.sleep(min(30.0, max(IDLE_TIMEOUT / 4, 1.0)))
+        if time.monotonic() - server.last_used > IDLE_TIMEOUT:
+            server.shutdown()
+            return
+
+
+def serve(path: str = DAEMON_SOCKET):
+    """前台运行，直到收到 stop 请求或空闲超时"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        if _ping(path):
+            print(f"Daemon already running on {path}")
+            return
+        os.unlink(path)
+    server = DaemonServer(path)
+    os.chmod(path, 0o600)
+    if IDLE_TIMEOUT > 0:
+        threading.Thread(target=_watch_idle, args=(server,), daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.worker.kill()
+        server.server_close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def start(path: str = DAEMON_SOCKET):
+    """以独立会话在后台启动，等待 socket 就绪"""
+    if _ping(path):
+        print(f"Daemon already running on {path}")
+        return
+    subprocess.Popen(
+        [sys.executable, os.path.realpath(__file__), "serve", "--socket", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if _ping(path, timeout=1):
+            print(f"Daemon started on {path}")
+            return
+        time.sleep(0.1)
+    print("Error: Daemon did not start within 5 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OmniFocus query daemon for omnifocus_cli.py")
+    parser.add_argument("command", choices=["start", "stop", "status", "serve"])
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help=f"Socket path (default {DAEMON_SOCKET})")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.socket)
+    elif args.command == "start":
+        start(args.socket)
+    elif args.command == "stop":
+        reply = daemon_request({"op": "stop"}, path=args.socket, timeout=5)
+        print("Daemon stopped" if reply and reply.get("ok") else "Daemon is not running")
+    elif args.command == "status":
+        reply = _ping(args.socket)
+        if reply is None:
+            print("Daemon is not running")
+        else:
+            print(f"Daemon running on {args.socket}")
+            for key, value in reply.get("result", {}).items():
+                print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
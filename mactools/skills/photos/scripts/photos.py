@@ -6,25 +6,42 @@ Read-only operations only. Never modifies the Photos database.
 Usage: photos.py <command> [options]
 
 Commands:
-  search "keyword"                Search photos by filename or associated text
+  search "keywords"               Search photos by filename, title, people, albums,
+                                  keywords, places, scene labels or date
+  index [--rebuild | --clear]     Show, rebuild or drop the sidecar search index
   recent [days] [-n count]        Recent photos (default: 7 days, 20 results)
   albums                          List all albums
   album "Name" [-n count]         List photos in an album
   info <path_or_uuid>             Show photo metadata
   export <uuid> <output_path>     Export/copy a photo to a specific path
+  bulk-export <dir> [--album A | --search Q] [--from D] [--to D]
+                                  Export many photos in parallel; re-run to resume
 """
 
 import sys
 import os
+import re
+import json
+import time
+import ctypes
+import threading
+import uuid
+import struct
+import hashlib
+import zlib
 import sqlite3
 import shutil
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timedelta
 
 # CoreData epoch: 2001-01-01 00:00:00 UTC
 COREDATA_EPOCH_OFFSET = 978307200
 
+# Sidecar files (search index) live here, never inside the Photos library
+CACHE_DIR = os.environ.get("PHOTOS_CACHE_DIR", os.path.expanduser("~/.cache/photos-cli"))
+
 
 def find_photos_db():
     """Find the Photos.sqlite database, searching common locations."""
@@ -106,6 +123,8 @@ def detect_join_table(conn):
         album_col = None
         asset_col = None
         for col in cols:
+            if col.upper().startswith("Z_FOK_"):
+                continue  # Core Data ordering column (Z_FOK_3ASSETS), not a foreign key
             if "ALBUM" in col.upper():
                 album_col = col
             elif "ASSET" in col.upper():
@@ -116,31 +135,842 @@ def detect_join_table(conn):
     return None, None, None
 
 
-def resolve_photo_path(row, library_root):
-    """Resolve the full file path for a photo asset."""
-    directory = row["ZDIRECTORY"] if "ZDIRECTORY" in row.keys() else None
-    filename = row["ZFILENAME"] if "ZFILENAME" in row.keys() else None
-
-    if directory and filename:
-        full_path = os.path.join(library_root, "originals", directory, filename)
-        if os.path.exists(full_path):
-            return full_path
-
-    # Try alternative path structure
-    if directory and filename:
-        full_path = os.path.join(library_root, "masters", directory, filename)
-        if os.path.exists(full_path):
-            return full_path
-
-    # Return best guess even if not verified
-    if directory and filename:
-        return os.path.join(library_root, "originals", directory, filename)
-    elif filename:
-        return filename
+def detect_face_columns(conn):
+    """Detect the face → asset / person columns of ZDETECTEDFACE (renamed in macOS 13)."""
+    cols = table_columns(conn, "ZDETECTEDFACE")
+    asset_col = next((c for c in ("ZASSETFORFACE", "ZASSET") if c in cols), None)
+    person_col = next((c for c in ("ZPERSONFORFACE", "ZPERSON") if c in cols), None)
+    if asset_col and person_col and table_columns(conn, "ZPERSON"):
+        return asset_col, person_col
+    return None, None
+
+
+def detect_keyword_table(conn):
+    """Detect the keyword join table (Z_1KEYWORDS, ...) linking asset attributes to keywords."""
+    cursor = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'Z_%KEYWORDS' ORDER BY name"
+    )
+    for table in [row["name"] for row in cursor.fetchall()]:
+        attr_col = None
+        keyword_col = None
+        for col in table_columns(conn, table):
+            if "ASSETATTRIBUTES" in col.upper():
+                attr_col = col
+            elif "KEYWORD" in col.upper():
+                keyword_col = col
+        if attr_col and keyword_col:
+            return table, attr_col, keyword_col
+    return None, None, None
+
 
+def get_db_path(conn):
+    """Return the file path of the main database behind a connection."""
+    for row in conn.execute("PRAGMA database_list"):
+        if row["name"] == "main":
+            return row["file"]
     return None
 
 
+def table_columns(conn, table):
+    """Return the column names of a table (empty set if it does not exist)."""
+    return {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def db_signature(db_path):
+    """Size and mtime of the database and its WAL; changes whenever Photos writes."""
+    parts = []
+    for suffix in ("", "-wal"):
+        try:
+            st = os.stat(db_path + suffix)
+        except OSError:
+            continue
+        parts.append(f"{suffix or 'db'}:{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+# ZASSET columns shown by format_photo()
+PHOTO_COLUMNS = ("ZUUID", "ZFILENAME", "ZDATECREATED", "ZDIRECTORY",
+                 "ZLATITUDE", "ZLONGITUDE", "ZWIDTH", "ZHEIGHT")
+
+
+class PhotosSchema:
+    """
+    Table and column names resolved for one Photos database schema.
+
+    Introspection (PRAGMA table_info, join-table detection) runs once per
+    schema version; the result is cached as JSON under CACHE_DIR, keyed by
+    PRAGMA schema_version, so later runs build their queries up front
+    without probing or retrying failed queries.
+    """
+
+    VERSION = 2
+    TABLES = ("ZASSET", "ZADDITIONALASSETATTRIBUTES", "ZGENERICALBUM",
+              "ZDETECTEDFACE", "ZPERSON", "ZKEYWORD", "ZMOMENT")
+
+    def __init__(self, data):
+        self.data = data
+        self.columns = {table: set(cols) for table, cols in data["columns"].items()}
+        self.join_table = tuple(data["join_table"])
+        self.face_columns = tuple(data["face_columns"])
+        self.keyword_table = tuple(data["keyword_table"])
+
+    @classmethod
+    def key(cls, conn):
+        return f"{cls.VERSION}:{conn.execute('PRAGMA schema_version').fetchone()[0]}"
+
+    @classmethod
+    def introspect(cls, conn, key):
+        return cls({
+            "key": key,
+            "columns": {table: sorted(table_columns(conn, table)) for table in cls.TABLES},
+            "join_table": list(detect_join_table(conn)),
+            "face_columns": list(detect_face_columns(conn)),
+            "keyword_table": list(detect_keyword_table(conn)),
+        })
+
+    @classmethod
+    def load(cls, conn, cache_dir=None):
+        """Schema from the on-disk cache if the database schema is unchanged, else introspect and cache it."""
+        key = cls.key(conn)
+        db_path = get_db_path(conn) or ""
+        name = hashlib.sha1(os.path.realpath(db_path).encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(cache_dir or CACHE_DIR, f"schema-{name}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") == key:
+                return cls(data)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+        schema = cls.introspect(conn, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(schema.data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Unwritable cache dir: use the introspected schema for this run only
+            pass
+        return schema
+
+    def has(self, table, column):
+        return column in self.columns.get(table, ())
+
+    def select(self, alias, table, columns):
+        """Select list for the given columns, with NULL for those this schema lacks."""
+        return ", ".join(f"{alias}.{col}" if self.has(table, col) else f"NULL AS {col}" for col in columns)
+
+    def not_trashed(self, alias, table):
+        """WHERE condition excluding trashed rows, or "1" if the table has no ZTRASHEDSTATE."""
+        return f"{alias}.ZTRASHEDSTATE = 0" if self.has(table, "ZTRASHEDSTATE") else "1"
+
+
+_schemas = {}
+
+
+def get_schema(conn):
+    """Return the (cached) PhotosSchema for a connection."""
+    if id(conn) not in _schemas:
+        _schemas[id(conn)] = PhotosSchema.load(conn)
+    return _schemas[id(conn)]
+
+
+def fts_query(text, trigram=False):
+    """
+    Turn free text into an FTS5 query in which every term must match.
+    Returns (query, short terms). With the trigram tokenizer each whitespace-separated
+    term matches as a substring (CJK included); terms under 3 characters have no
+    trigram and are returned separately for an instr() check. Otherwise every word
+    matches as a prefix.
+    """
+    if trigram:
+        terms = [t.strip('"') for t in text.split() if t.strip('"')]
+        query = " ".join('"' + t.replace('"', '""') + '"' for t in terms if len(t) >= 3)
+        return query, [t for t in terms if len(t) < 3]
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{term}"*' for term in terms), []
+
+
+def uuid_to_ints(asset_uuid):
+    """Split an asset UUID into the two signed 64-bit ints used by search/psi.sqlite."""
+    return struct.unpack("<qq", uuid.UUID(asset_uuid).bytes)
+
+
+def ints_to_uuid(uuid_0, uuid_1):
+    """Inverse of uuid_to_ints: the asset UUID string as stored in ZASSET.ZUUID."""
+    return str(uuid.UUID(bytes=struct.pack("<qq", uuid_0, uuid_1))).upper()
+
+
+def text_hash(*values):
+    """31-bit CRC of a row's text columns; registered in SQLite as photos_text_hash()."""
+    return zlib.crc32(repr(values).encode("utf-8")) & 0x7FFFFFFF
+
+
+def date_terms(timestamp):
+    """Searchable date words for a CoreData timestamp, e.g. '2024 July 2024-07'."""
+    if timestamp is None:
+        return None
+    try:
+        dt = datetime.fromtimestamp(timestamp + COREDATA_EPOCH_OFFSET)
+    except (OSError, ValueError, OverflowError):
+        return None
+    return f"{dt.year} {dt.strftime('%B')} {dt.year}-{dt.month:02d}"
+
+
+class SearchIndex:
+    """
+    FTS5 search index kept in a separate SQLite file under CACHE_DIR.
+
+    Built from the read-only Photos connection and refreshed incrementally:
+    new assets by Z_PK, edited ones by ZMODIFICATIONDATE, deleted ones by
+    comparing primary keys. Besides filenames and titles it holds person,
+    album, keyword and place names, scene labels from search/psi.sqlite and
+    date words. For each join table (faces, album and keyword links, psi
+    labels) the index keeps a per-asset summary of the linked ids, and for
+    titles a hash of the text, so only assets whose links or titles changed
+    are re-gathered; a full rebuild happens only
+    when an existing person, album, keyword, moment or label is renamed or
+    deleted. Rows in the ``assets`` table use the ZASSET column names so they
+    can be passed straight to format_photo().
+    """
+
+    VERSION = 6
+    # ZASSET columns copied into the index (format_photo + filtering)
+    ASSET_COLUMNS = ("ZUUID", "ZFILENAME", "ZDATECREATED", "ZDIRECTORY", "ZLATITUDE", "ZLONGITUDE",
+                     "ZWIDTH", "ZHEIGHT", "ZTRASHEDSTATE", "ZMODIFICATIONDATE")
+    # FTS columns and their bm25 weights (names and tags rank above filename hits)
+    TEXT_COLUMNS = (
+        ("filename", 1.0), ("title", 5.0), ("original_filename", 1.0), ("people", 4.0),
+        ("albums", 3.0), ("keywords", 4.0), ("places", 3.0), ("labels", 2.0), ("date", 1.0),
+    )
+    # Per-asset text gathered from other tables
+    RELATED_COLUMNS = ("people", "albums", "keywords", "places", "labels")
+    BATCH_SIZE = 5000
+    # Assets per IN (...) lookup during incremental refreshes
+    LOOKUP_CHUNK = 500
+    # FTS tokenizers in order of preference: trigram matches substrings in any script,
+    # including CJK text without word breaks (remove_diacritics needs SQLite 3.45+)
+    TOKENIZERS = ("trigram remove_diacritics 1", "trigram", "unicode61 remove_diacritics 2")
+
+    def __init__(self, db_path, cache_dir=None):
+        cache_dir = cache_dir or CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        key = hashlib.sha1(os.path.realpath(db_path).encode("utf-8")).hexdigest()[:16]
+        self.db_path = db_path
+        self.psi_path = os.path.join(os.path.dirname(db_path), "search", "psi.sqlite")
+        self.path = os.path.join(cache_dir, f"search-{key}.sqlite")
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if self.get_meta("version") != str(self.VERSION):
+            self._drop_tables()
+            self.conn.execute("DELETE FROM meta")
+        self._create_tables()
+        self._set_meta("version", self.VERSION)
+        self.conn.commit()
+
+    def _create_tables(self):
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS assets (
+                Z_PK INTEGER PRIMARY KEY,
+                ZUUID TEXT, ZFILENAME TEXT, ZDATECREATED REAL, ZDIRECTORY TEXT,
+                ZLATITUDE REAL, ZLONGITUDE REAL, ZWIDTH INTEGER, ZHEIGHT INTEGER,
+                ZTRASHEDSTATE INTEGER, ZMODIFICATIONDATE REAL
+            );
+            CREATE INDEX IF NOT EXISTS assets_uuid ON assets(ZUUID);
+            CREATE TABLE IF NOT EXISTS links (
+                source TEXT, asset INTEGER, n INTEGER, total INTEGER, mix INTEGER,
+                PRIMARY KEY (source, asset)
+            ) WITHOUT ROWID;
+        """)
+        for tokenizer in self.TOKENIZERS:
+            try:
+                self.conn.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts USING fts5(
+                        {', '.join(name for name, _ in self.TEXT_COLUMNS)},
+                        tokenize = '{tokenizer}'
+                    )
+                """)
+                break
+            except sqlite3.OperationalError:
+                continue
+        row = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'assets_fts'").fetchone()
+        self.trigram = "trigram" in row["sql"]
+
+    def _drop_tables(self):
+        self.conn.executescript("""
+            DROP TABLE IF EXISTS assets;
+            DROP TABLE IF EXISTS links;
+            DROP TABLE IF EXISTS assets_fts;
+        """)
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def close(self):
+        self.conn.close()
+
+    def clear(self):
+        """Drop all indexed rows; the next refresh rebuilds from scratch."""
+        # Recreating the tables is much faster than deleting every FTS row
+        self._drop_tables()
+        self._create_tables()
+        self.conn.execute("DELETE FROM meta WHERE key != 'version'")
+        self.conn.commit()
+
+    def _source_query(self, conn):
+        """SELECT over the Photos tables, with NULL for columns this schema lacks."""
+        schema = get_schema(conn)
+        select = schema.select("a", "ZASSET", self.ASSET_COLUMNS)
+        join = ""
+        if schema.has("ZADDITIONALASSETATTRIBUTES", "ZASSET"):
+            join = "LEFT JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.ZASSET = a.Z_PK"
+            attr_select = schema.select("attr", "ZADDITIONALASSETATTRIBUTES", ("ZTITLE", "ZORIGINALFILENAME"))
+        else:
+            attr_select = "NULL AS ZTITLE, NULL AS ZORIGINALFILENAME"
+        query = f"SELECT a.Z_PK, {select}, {attr_select} FROM ZASSET a {join}"
+        return query, schema.has("ZASSET", "ZMODIFICATIONDATE")
+
+    def _related_sources(self, conn):
+        """
+        Queries yielding (asset Z_PK, text) for each related column, detected per schema.
+        Returns {column: (sql, asset pk expression, links, names)}: links is the join
+        table as (FROM clause, rowid, asset and linked id expressions) or None, names
+        is [(table, columns)] for the tables the text comes from.
+        """
+        schema = get_schema(conn)
+        sources = {}
+        asset_col, person_col = schema.face_columns
+        if asset_col:
+            names = [f"p.{c}" for c in ("ZFULLNAME", "ZDISPLAYNAME") if schema.has("ZPERSON", c)]
+            if names:
+                name = f"COALESCE({', '.join(f'NULLIF({n}, {chr(39) * 2})' for n in names)})"
+                sources["people"] = (
+                    f"SELECT f.{asset_col}, {name} FROM ZDETECTEDFACE f "
+                    f"JOIN ZPERSON p ON p.Z_PK = f.{person_col} WHERE {name} IS NOT NULL",
+                    f"f.{asset_col}", ("ZDETECTEDFACE f", "f.rowid", f"f.{asset_col}", f"f.{person_col}"),
+                    [("ZPERSON", ", ".join(n[2:] for n in names))],
+                )
+        join_table, album_col, join_asset_col = schema.join_table
+        if join_table:
+            album_names = "ZTITLE, ZTRASHEDSTATE" if schema.has("ZGENERICALBUM", "ZTRASHEDSTATE") else "ZTITLE"
+            sources["albums"] = (
+                f"SELECT j.{join_asset_col}, g.ZTITLE FROM {join_table} j "
+                f"JOIN ZGENERICALBUM g ON g.Z_PK = j.{album_col} "
+                f"WHERE g.ZTITLE IS NOT NULL AND {schema.not_trashed('g', 'ZGENERICALBUM')}",
+                f"j.{join_asset_col}", (f"{join_table} j", "j.rowid", f"j.{join_asset_col}", f"j.{album_col}"),
+                [("ZGENERICALBUM", album_names)],
+            )
+        keyword_table, attr_col, keyword_col = schema.keyword_table
+        if keyword_table and schema.has("ZKEYWORD", "ZTITLE"):
+            sources["keywords"] = (
+                f"SELECT attr.ZASSET, k.ZTITLE FROM {keyword_table} j "
+                f"JOIN ZKEYWORD k ON k.Z_PK = j.{keyword_col} "
+                f"JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.Z_PK = j.{attr_col} WHERE k.ZTITLE IS NOT NULL",
+                "attr.ZASSET",
+                (f"{keyword_table} j JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.Z_PK = j.{attr_col}",
+                 "j.rowid", "attr.ZASSET", f"j.{keyword_col}"),
+                [("ZKEYWORD", "ZTITLE")],
+            )
+        if schema.has("ZASSET", "ZMOMENT") and schema.has("ZMOMENT", "ZTITLE"):
+            subtitle = "m.ZSUBTITLE" if schema.has("ZMOMENT", "ZSUBTITLE") else "NULL"
+            # An asset's moment is a ZASSET column, so edits reach the index with the asset itself
+            sources["places"] = (
+                f"SELECT a.Z_PK, TRIM(COALESCE(m.ZTITLE, '') || ' ' || COALESCE({subtitle}, '')) "
+                f"FROM ZASSET a JOIN ZMOMENT m ON m.Z_PK = a.ZMOMENT WHERE m.ZTITLE IS NOT NULL",
+                "a.Z_PK", None,
+                [("ZMOMENT", "ZTITLE, ZSUBTITLE" if subtitle != "NULL" else "ZTITLE")],
+            )
+        return sources
+
+    @staticmethod
+    def _name_state(conn, table, columns, upto):
+        """
+        Hash a name table in rowid order. Returns (max rowid, digest of rows up to
+        `upto`, digest of all rows): rows past `upto` were added since the last refresh,
+        so only a change in the first digest means a rename or deletion.
+        """
+        digest = hashlib.sha1()
+        partial = None
+        max_rowid = 0
+        for row in conn.execute(f"SELECT rowid, {columns} FROM {table} ORDER BY rowid"):
+            if partial is None and upto is not None and row[0] > upto:
+                partial = digest.hexdigest()
+            digest.update(repr(tuple(row)).encode("utf-8"))
+            max_rowid = row[0]
+        full = digest.hexdigest()
+        return max_rowid, partial or full, full
+
+    def _names_changed(self, conn, psi, sources):
+        """
+        Whether a name table (persons, albums, keywords, moments, psi label groups)
+        had existing rows renamed or deleted since the last refresh.
+        Returns (changed, state to store for the next refresh).
+        """
+        tables = [(conn, table, columns) for column in sorted(sources) for table, columns in sources[column][3]]
+        if psi is not None:
+            tables.append((psi, "groups", "content_string"))
+        stored = json.loads(self.get_meta("names") or "{}")
+        state = {}
+        changed = False
+        for db, table, columns in tables:
+            key = f"{table}({columns})"
+            previous = stored.get(key)
+            try:
+                max_rowid, partial, full = self._name_state(db, table, columns, previous[0] if previous else None)
+            except sqlite3.Error:
+                continue  # unknown psi.sqlite layout
+            changed = changed or previous is None or previous[1] != partial
+            state[key] = [max_rowid, full]
+        return changed or stored.keys() != state.keys(), state
+
+    @staticmethod
+    def _mix(expr):
+        """
+        SQL for a 31-bit hash of a non-negative integer expression. Nonlinear, so sums
+        over different sets of ids practically never agree (sums of ids or of their
+        squares do: {1, 5, 6} and {2, 3, 7} match on both).
+        """
+        h = f"(({expr}) * 1597334677 + 1013904223) % 2147483629"
+        return f"((({h}) * ({h}) % 2147483587) * ({h}) % 2147483563)"
+
+    # Per-row terms summed over a join table; the last one ties each id to its asset
+    @classmethod
+    def _link_terms(cls, asset_expr, id_expr):
+        return ("1", id_expr, asset_expr, cls._mix(f"({asset_expr} * 1000003 + {id_expr}) % 2147483647"))
+
+    def _changed_links(self, db, source, links):
+        """
+        Assets (as the join table names them) whose links changed since the last refresh.
+        links: (FROM clause, rowid, asset and linked id expressions).
+
+        The table is summarised in one scan, both whole and up to the max rowid seen last
+        time. Unchanged: nothing to do. Only new rows: their assets. Otherwise existing
+        rows were edited or deleted, and per-asset summaries stored in ``links`` are
+        compared to find the assets concerned.
+        """
+        from_clause, rowid_expr, asset_expr, id_expr = links
+        where = f"{asset_expr} IS NOT NULL AND {id_expr} IS NOT NULL"
+        # LIMIT -1 keeps SQLite from flattening the subquery, so each row's id
+        # expression is evaluated once rather than once per term
+        rows = (f"(SELECT {rowid_expr} AS r, {asset_expr} AS asset, {id_expr} AS id "
+                f"FROM {from_clause} WHERE {asset_expr} IS NOT NULL LIMIT -1) WHERE id IS NOT NULL")
+        terms = self._link_terms("asset", "id")
+        stored = json.loads(self.get_meta(f"links:{source}") or "null")
+        upto = stored[0] if stored else -1
+        row = db.execute(f"""
+            SELECT MAX(r),
+                   {", ".join(f"SUM({t})" for t in terms)},
+                   {", ".join(f"SUM(CASE WHEN r <= ? THEN {t} END)" for t in terms)}
+            FROM {rows}
+        """, (upto,) * len(terms)).fetchone()
+        max_rowid, totals, old_totals = row[0] or 0, list(row[1:1 + len(terms)]), list(row[1 + len(terms):])
+        self._set_meta(f"links:{source}", json.dumps([max_rowid, totals]))
+        if stored and stored[1] == totals:
+            return set()
+
+        if stored and stored[1] == old_totals:
+            # Appended rows only: refresh the summaries of the assets they link
+            assets = [r[0] for r in db.execute(
+                f"SELECT DISTINCT {asset_expr} FROM {from_clause} WHERE {where} AND {rowid_expr} > ?", (upto,))]
+            for start in range(0, len(assets), self.LOOKUP_CHUNK):
+                chunk = assets[start:start + self.LOOKUP_CHUNK]
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO links (source, asset, n, total, mix) VALUES (?, ?, ?, ?, ?)",
+                    [(source,) + tuple(r) for r in db.execute(f"""
+                        SELECT {asset_expr}, COUNT(*), SUM({id_expr}), SUM({self._mix(id_expr)})
+                        FROM {from_clause}
+                        WHERE {where} AND {asset_expr} IN ({", ".join("?" * len(chunk))})
+                        GROUP BY {asset_expr}
+                    """, chunk)],
+                )
+            return set(assets)
+
+        summaries = {r[0]: tuple(r[1:]) for r in db.execute(
+            f"SELECT asset, COUNT(*), SUM(id), SUM({self._mix('id')}) FROM {rows} GROUP BY asset")}
+        previous = {r[0]: tuple(r[1:]) for r in self.conn.execute(
+            "SELECT asset, n, total, mix FROM links WHERE source = ?", (source,))}
+        changed = [asset for asset, summary in summaries.items() if previous.get(asset) != summary]
+        removed = [asset for asset in previous if asset not in summaries]
+        self.conn.executemany("DELETE FROM links WHERE source = ? AND asset = ?", [(source, a) for a in removed])
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO links (source, asset, n, total, mix) VALUES (?, ?, ?, ?, ?)",
+            [(source, asset) + summaries[asset] for asset in changed],
+        )
+        return set(changed) | set(removed)
+
+    @staticmethod
+    def _attribute_links(conn):
+        """
+        Title and original filename edits leave ZMODIFICATIONDATE alone, so the
+        attribute rows are fingerprinted like a join table, with a hash of their
+        text as the linked id. None if the schema has no such columns.
+        """
+        schema = get_schema(conn)
+        columns = [f"attr.{c}" for c in ("ZTITLE", "ZORIGINALFILENAME")
+                   if schema.has("ZADDITIONALASSETATTRIBUTES", c)]
+        if not columns or not schema.has("ZADDITIONALASSETATTRIBUTES", "ZASSET"):
+            return None
+        conn.create_function("photos_text_hash", -1, text_hash, deterministic=True)
+        return ("ZADDITIONALASSETATTRIBUTES attr", "attr.rowid", "attr.ZASSET",
+                f"photos_text_hash({', '.join(columns)})")
+
+    def _relinked_assets(self, conn, psi, sources):
+        """
+        Z_PKs of assets whose face, album, keyword or scene label links, title or
+        original filename changed since the last refresh.
+        """
+        relinked = set()
+        for column in sorted(sources):
+            if sources[column][2] is not None:
+                relinked |= self._changed_links(conn, column, sources[column][2])
+        attributes = self._attribute_links(conn)
+        if attributes is not None:
+            relinked |= self._changed_links(conn, "attributes", attributes)
+        if psi is None:
+            return relinked
+        try:
+            psi_assets = sorted(self._changed_links(psi, "labels", ("ga", "ga.rowid", "ga.assetid", "ga.groupid")))
+            uuids = []
+            for start in range(0, len(psi_assets), self.LOOKUP_CHUNK):
+                chunk = psi_assets[start:start + self.LOOKUP_CHUNK]
+                uuids += [ints_to_uuid(u0, u1) for u0, u1 in psi.execute(
+                    f"SELECT uuid_0, uuid_1 FROM assets WHERE rowid IN ({', '.join('?' * len(chunk))})", chunk)]
+        except sqlite3.Error:
+            return relinked  # unknown psi.sqlite layout
+        for start in range(0, len(uuids), self.LOOKUP_CHUNK):
+            chunk = uuids[start:start + self.LOOKUP_CHUNK]
+            relinked.update(r[0] for r in self.conn.execute(
+                f"SELECT Z_PK FROM assets WHERE ZUUID IN ({', '.join('?' * len(chunk))})", chunk))
+        return relinked
+
+    def _related_text(self, conn, psi, sources, rows, full):
+        """
+        Gather related text for a batch of asset rows: {Z_PK: {column: set of strings}}.
+        A full build reads each source once; incremental refreshes look up only these assets.
+        """
+        related = {}
+        pks = [row["Z_PK"] for row in rows]
+        for column, (sql, pk_expr, _, _) in sources.items():
+            if full:
+                chunks = [None]
+            else:
+                chunks = [pks[i:i + self.LOOKUP_CHUNK] for i in range(0, len(pks), self.LOOKUP_CHUNK)]
+            for chunk in chunks:
+                query, params = sql, ()
+                if chunk is not None:
+                    query += f" AND {pk_expr} IN ({', '.join('?' * len(chunk))})"
+                    params = tuple(chunk)
+                for pk, text in conn.execute(query, params):
+                    if text:
+                        related.setdefault(pk, {}).setdefault(column, set()).add(text)
+        for pk, labels in self._scene_labels(psi, rows, full).items():
+            related.setdefault(pk, {})["labels"] = labels
+        return related
+
+    def _open_psi(self):
+        """Read-only connection to search/psi.sqlite, or None if missing or unreadable."""
+        if not os.path.exists(self.psi_path):
+            return None
+        try:
+            return connect_db(self.psi_path)
+        except sqlite3.Error:
+            return None
+
+    def _scene_labels(self, psi, rows, full):
+        """Scene, place and other search labels from search/psi.sqlite, keyed by asset Z_PK."""
+        if psi is None:
+            return {}
+        try:
+            by_ints = {}
+            for row in rows:
+                try:
+                    by_ints[uuid_to_ints(row["ZUUID"])] = row["Z_PK"]
+                except (TypeError, ValueError):
+                    continue
+            query = """
+                SELECT a.uuid_0, a.uuid_1, g.content_string
+                FROM ga
+                JOIN groups g ON g.rowid = ga.groupid
+                JOIN assets a ON a.rowid = ga.assetid
+            """
+            if full:
+                matches = psi.execute(query)
+            else:
+                matches = []
+                for ints in by_ints:
+                    matches.extend(psi.execute(query + " WHERE a.uuid_0 = ? AND a.uuid_1 = ?", ints))
+            labels = {}
+            for uuid_0, uuid_1, text in matches:
+                pk = by_ints.get((uuid_0, uuid_1))
+                if pk is not None and text:
+                    labels.setdefault(pk, set()).add(text)
+            return labels
+        except sqlite3.Error:
+            # Unknown psi.sqlite layout: index without labels
+            return {}
+
+    def refresh(self, conn, force=False):
+        """
+        Bring the index up to date with the Photos database.
+        Returns the number of assets (re)indexed; 0 when nothing changed.
+        """
+        signature = f"{db_signature(self.db_path)}|{db_signature(self.psi_path)}"
+        if not force and self.get_meta("signature") == signature:
+            return 0
+        sources = self._related_sources(conn)
+        psi = self._open_psi()
+        try:
+            return self._refresh(conn, psi, sources, signature, force)
+        finally:
+            if psi is not None:
+                psi.close()
+
+    def _refresh(self, conn, psi, sources, signature, force):
+        names_changed, names = self._names_changed(conn, psi, sources)
+        if force or names_changed:
+            self.clear()
+
+        source_query, has_modified = self._source_query(conn)
+        query = source_query
+        last_pk = self.get_meta("max_pk")
+        last_modified = self.get_meta("max_modified")
+        full = last_pk is None
+        params = ()
+        if not full:
+            query += " WHERE a.Z_PK > ?"
+            params = (int(last_pk),)
+            if has_modified and last_modified is not None:
+                query += " OR a.ZMODIFICATIONDATE > ?"
+                params += (float(last_modified),)
+
+        max_pk = int(last_pk or 0)
+        max_modified = float(last_modified) if last_modified is not None else None
+        rows = conn.execute(query, params).fetchall()
+        if rows:
+            related = self._related_text(conn, psi, sources, rows, full)
+            for start in range(0, len(rows), self.BATCH_SIZE):
+                self._store(rows[start:start + self.BATCH_SIZE], related, replace=not full)
+            max_pk = max(max_pk, max(row["Z_PK"] for row in rows))
+            modified = [row["ZMODIFICATIONDATE"] for row in rows if row["ZMODIFICATIONDATE"] is not None]
+            if modified:
+                max_modified = max(modified + ([max_modified] if max_modified is not None else []))
+        self._prune(conn)
+
+        # Assets gaining or losing a face, album, keyword or label: re-gather just their text
+        count = len(rows)
+        relinked = self._relinked_assets(conn, psi, sources) - {row["Z_PK"] for row in rows}
+        if not full and relinked:
+            relinked = sorted(relinked)
+            for start in range(0, len(relinked), self.LOOKUP_CHUNK):
+                chunk = relinked[start:start + self.LOOKUP_CHUNK]
+                batch = conn.execute(f"{source_query} WHERE a.Z_PK IN ({', '.join('?' * len(chunk))})",
+                                     chunk).fetchall()
+                if batch:
+                    self._store(batch, self._related_text(conn, psi, sources, batch, False))
+                    count += len(batch)
+
+        self._set_meta("max_pk", max_pk)
+        if max_modified is not None:
+            self._set_meta("max_modified", max_modified)
+        self._set_meta("names", json.dumps(names))
+        self._set_meta("signature", signature)
+        self._set_meta("refreshed", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self.conn.commit()
+        return count
+
+    def _store(self, rows, related, replace=True):
+        columns = ("Z_PK",) + self.ASSET_COLUMNS
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO assets ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row[col] for col in columns) for row in rows],
+        )
+        if replace:
+            self.conn.executemany("DELETE FROM assets_fts WHERE rowid = ?", [(row["Z_PK"],) for row in rows])
+        text_columns = [name for name, _ in self.TEXT_COLUMNS]
+        values = []
+        for row in rows:
+            extra = related.get(row["Z_PK"], {})
+            values.append((row["Z_PK"], row["ZFILENAME"], row["ZTITLE"], row["ZORIGINALFILENAME"])
+                          + tuple(" ".join(sorted(extra[c])) if c in extra else None for c in self.RELATED_COLUMNS)
+                          + (date_terms(row["ZDATECREATED"]),))
+        self.conn.executemany(
+            f"INSERT INTO assets_fts (rowid, {', '.join(text_columns)}) "
+            f"VALUES ({', '.join('?' * (len(text_columns) + 1))})",
+            values,
+        )
+
+    def _prune(self, conn):
+        """Remove assets that no longer exist in the Photos database."""
+        source_count = conn.execute("SELECT COUNT(*) FROM ZASSET").fetchone()[0]
+        local_count = self.conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+        if source_count == local_count:
+            return
+        source = {row[0] for row in conn.execute("SELECT Z_PK FROM ZASSET")}
+        gone = [(pk,) for (pk,) in self.conn.execute("SELECT Z_PK FROM assets") if pk not in source]
+        self.conn.executemany("DELETE FROM assets WHERE Z_PK = ?", gone)
+        self.conn.executemany("DELETE FROM assets_fts WHERE rowid = ?", gone)
+
+    def search(self, text, limit, sort="relevance", since=None, until=None):
+        """
+        Assets where every term matches in any indexed field: as a substring with the
+        trigram tokenizer, otherwise as a word prefix.
+        sort: "relevance" (bm25, title/people/keywords weighted highest) or "date" (newest first).
+        since/until: optional Core Data timestamp bounds on ZDATECREATED, applied before the limit.
+        """
+        query, short_terms = fts_query(text, self.trigram)
+        if not query and not short_terms:
+            return []
+        conditions, params = [], []
+        if query:
+            conditions.append("assets_fts MATCH ?")
+            params.append(query)
+        if short_terms:
+            # instr, not LIKE: the trigram tokenizer mishandles short LIKE patterns
+            all_text = " || ' ' || ".join(f"COALESCE(assets_fts.{name}, '')" for name, _ in self.TEXT_COLUMNS)
+            for term in short_terms:
+                conditions.append(f"instr(lower({all_text}), ?)")
+                params.append(term.lower())
+        bounds, bound_params = date_bounds("a", since, until)
+        conditions += bounds
+        params += bound_params
+        weights = ", ".join(str(weight) for _, weight in self.TEXT_COLUMNS)
+        if sort == "date" or not query:
+            order = "a.ZDATECREATED DESC"
+        else:
+            order = f"bm25(assets_fts, {weights}), a.ZDATECREATED DESC"
+        return self.conn.execute(f"""
+            SELECT a.*
+            FROM assets_fts
+            JOIN assets a ON a.Z_PK = assets_fts.rowid
+            WHERE COALESCE(a.ZTRASHEDSTATE, 0) = 0
+              {"".join(f"AND {c} " for c in conditions)}
+            ORDER BY {order}
+            LIMIT ?
+        """, params + [limit]).fetchall()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "assets": self.conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0],
+            "refreshed": self.get_meta("refreshed"),
+            "size": os.path.getsize(self.path),
+        }
+
+
+def open_search_index(conn):
+    """Open and refresh the sidecar index for this library; None if unavailable (e.g. no FTS5)."""
+    db_path = get_db_path(conn)
+    if not db_path:
+        return None
+    try:
+        index = SearchIndex(db_path)
+    except (sqlite3.Error, OSError):
+        return None
+    try:
+        if index.get_meta("signature") is None:
+            print("Building search index (first run)...", file=sys.stderr)
+        index.refresh(conn)
+    except sqlite3.Error:
+        index.close()
+        return None
+    return index
+
+
+class PathResolver:
+    """
+    Resolves asset file paths for one library. Directories referenced by many
+    rows of a result set are listed once with os.scandir and kept for the rest
+    of the process; rows in other directories fall back to a stat per row.
+    """
+
+    BASES = ("originals", "masters")
+    # Below this many rows in one directory, stat calls are cheaper than listing it
+    SCAN_THRESHOLD = 16
+
+    def __init__(self, library_root):
+        self.library_root = library_root
+        self.listings = {}  # (base, directory) -> set of filenames
+
+    def _list(self, base, directory):
+        key = (base, directory)
+        if key not in self.listings:
+            try:
+                with os.scandir(os.path.join(self.library_root, base, directory)) as entries:
+                    self.listings[key] = {entry.name for entry in entries}
+            except OSError:
+                self.listings[key] = set()
+        return self.listings[key]
+
+    def prefetch(self, rows):
+        """List every directory referenced by at least SCAN_THRESHOLD of these rows."""
+        counts = {}
+        for row in rows:
+            directory = row_get(row, "ZDIRECTORY")
+            if directory:
+                counts[directory] = counts.get(directory, 0) + 1
+        present = {base: os.path.isdir(os.path.join(self.library_root, base)) for base in self.BASES}
+        for directory, count in counts.items():
+            if count >= self.SCAN_THRESHOLD:
+                for base in self.BASES:
+                    if present[base]:
+                        self._list(base, directory)
+                    else:
+                        # e.g. no masters/ in modern libraries: nothing to find there
+                        self.listings[(base, directory)] = set()
+
+    def _exists(self, base, directory, filename):
+        listing = self.listings.get((base, directory))
+        if listing is not None:
+            return filename in listing
+        return os.path.exists(os.path.join(self.library_root, base, directory, filename))
+
+    def locate(self, row):
+        """Full path of the asset's file under originals/ or masters/, or None if not present."""
+        directory = row_get(row, "ZDIRECTORY")
+        filename = row_get(row, "ZFILENAME")
+        if directory and filename:
+            for base in self.BASES:
+                if self._exists(base, directory, filename):
+                    return os.path.join(self.library_root, base, directory, filename)
+        return None
+
+    def resolve(self, row):
+        """Like locate(), but returns a best guess when the file is not present."""
+        path = self.locate(row)
+        if path:
+            return path
+        directory = row_get(row, "ZDIRECTORY")
+        filename = row_get(row, "ZFILENAME")
+        if directory and filename:
+            return os.path.join(self.library_root, "originals", directory, filename)
+        return filename or None
+
+
+_path_resolvers = {}
+
+
+def get_path_resolver(library_root):
+    """Return the shared PathResolver for a library."""
+    if library_root not in _path_resolvers:
+        _path_resolvers[library_root] = PathResolver(library_root)
+    return _path_resolvers[library_root]
+
+
+def resolve_photo_path(row, library_root):
+    """Resolve the full file path for a photo asset."""
+    return get_path_resolver(library_root).resolve(row)
+
+
 def format_photo(index, row, library_root):
     """Format a single photo result for display."""
     filename = row["ZFILENAME"] or "Unknown"
@@ -176,49 +1006,64 @@ def format_photo(index, row, library_root):
     return "\n".join(lines)
 
 
-def cmd_search(conn, library_root, args):
-    """Search photos by filename or associated text."""
-    keyword = args.keyword
-    limit = args.n or 20
-
-    query = """
-        SELECT a.ZUUID, a.ZFILENAME, a.ZDATECREATED, a.ZDIRECTORY,
-               a.ZLATITUDE, a.ZLONGITUDE,
-               a.ZWIDTH, a.ZHEIGHT
+def date_bounds(alias, since=None, until=None):
+    """SQL conditions and params bounding {alias}.ZDATECREATED to [since, until) (Core Data timestamps)."""
+    conditions, params = [], []
+    if since is not None:
+        conditions.append(f"{alias}.ZDATECREATED >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append(f"{alias}.ZDATECREATED < ?")
+        params.append(until)
+    return conditions, params
+
+
+def search_like(conn, keyword, limit, since=None, until=None):
+    """Search by LIKE scan over the Photos database (used when the index is unavailable)."""
+    schema = get_schema(conn)
+    bounds, params = date_bounds("a", since, until)
+    conditions = ["a.ZFILENAME LIKE ? COLLATE NOCASE"]
+    join = ""
+    if schema.has("ZADDITIONALASSETATTRIBUTES", "ZASSET"):
+        join = "LEFT JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.ZASSET = a.Z_PK"
+        conditions += [f"attr.{col} LIKE ? COLLATE NOCASE" for col in ("ZTITLE", "ZORIGINALFILENAME")
+                       if schema.has("ZADDITIONALASSETATTRIBUTES", col)]
+    query = f"""
+        SELECT {schema.select("a", "ZASSET", PHOTO_COLUMNS)}
         FROM ZASSET a
-        LEFT JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.ZASSET = a.Z_PK
-        WHERE a.ZTRASHEDSTATE = 0
-          AND (
-            a.ZFILENAME LIKE ? COLLATE NOCASE
-            OR attr.ZTITLE LIKE ? COLLATE NOCASE
-            OR attr.ZORIGINALFILENAME LIKE ? COLLATE NOCASE
-          )
+        {join}
+        WHERE {schema.not_trashed("a", "ZASSET")}
+          AND ({" OR ".join(conditions)})
+          {"".join(f"AND {c} " for c in bounds)}
         ORDER BY a.ZDATECREATED DESC
         LIMIT ?
     """
     pattern = f"%{keyword}%"
-    try:
-        cursor = conn.execute(query, (pattern, pattern, pattern, limit))
-    except sqlite3.OperationalError:
-        # Fallback: some macOS versions may not have ZTRASHEDSTATE or ZORIGINALFILENAME
-        query = """
-            SELECT a.ZUUID, a.ZFILENAME, a.ZDATECREATED, a.ZDIRECTORY,
-                   a.ZLATITUDE, a.ZLONGITUDE,
-                   a.ZWIDTH, a.ZHEIGHT
-            FROM ZASSET a
-            LEFT JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.ZASSET = a.Z_PK
-            WHERE a.ZFILENAME LIKE ? COLLATE NOCASE
-               OR attr.ZTITLE LIKE ? COLLATE NOCASE
-            ORDER BY a.ZDATECREATED DESC
-            LIMIT ?
-        """
-        cursor = conn.execute(query, (pattern, pattern, limit))
+    return conn.execute(query, [pattern] * len(conditions) + params + [limit]).fetchall()
+
+
+def cmd_search(conn, library_root, args):
+    """Search photos by filename, title, people, albums, keywords, places, scene labels or date."""
+    keyword = args.keyword
+    limit = args.n or 20
+
+    index = None if args.no_index else open_search_index(conn)
+    if index is not None:
+        try:
+            rows = index.search(keyword, limit, sort=args.sort)
+            # Without trigrams a word-prefix index misses substrings such as CJK mid-word hits
+            if not rows and not index.trigram:
+                rows = search_like(conn, keyword, limit)
+        finally:
+            index.close()
+    else:
+        rows = search_like(conn, keyword, limit)
 
-    rows = cursor.fetchall()
     if not rows:
         print(f"No photos found matching \"{keyword}\".")
         return
 
+    get_path_resolver(library_root).prefetch(rows)
     for i, row in enumerate(rows, 1):
         print(format_photo(i, row, library_root))
         if i < len(rows):
@@ -227,6 +1072,33 @@ def cmd_search(conn, library_root, args):
     print(f"\n--- {len(rows)} result(s) shown (max {limit}) ---")
 
 
+def cmd_index(conn, library_root, args):
+    """Show, rebuild or drop the sidecar search index."""
+    db_path = get_db_path(conn)
+    try:
+        index = SearchIndex(db_path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error: Cannot open search index — {e}")
+        sys.exit(1)
+    try:
+        if args.clear:
+            index.clear()
+            print(f"Search index cleared: {index.path}")
+            return
+        if args.rebuild:
+            print("Rebuilding search index...", file=sys.stderr)
+        count = index.refresh(conn, force=args.rebuild)
+        stats = index.stats()
+        home = str(Path.home())
+        print(f"Index: {stats['path'].replace(home, '~')}")
+        print(f"Assets indexed: {stats['assets']}")
+        print(f"Updated this run: {count}")
+        print(f"Last refresh: {stats['refreshed'] or 'never'}")
+        print(f"Size: {stats['size'] / 1048576:.1f} MB")
+    finally:
+        index.close()
+
+
 def cmd_recent(conn, library_root, args):
     """List recent photos."""
     days = args.days or 7
@@ -236,24 +1108,16 @@ def cmd_recent(conn, library_root, args):
     cutoff = datetime.now() - timedelta(days=days)
     cutoff_coredata = cutoff.timestamp() - COREDATA_EPOCH_OFFSET
 
-    query = """
-        SELECT a.ZUUID, a.ZFILENAME, a.ZDATECREATED, a.ZDIRECTORY,
-               a.ZLATITUDE, a.ZLONGITUDE,
-               a.ZWIDTH, a.ZHEIGHT
+    schema = get_schema(conn)
+    query = f"""
+        SELECT {schema.select("a", "ZASSET", PHOTO_COLUMNS)}
         FROM ZASSET a
-        WHERE a.ZDATECREATED >= ?
+        WHERE {schema.not_trashed("a", "ZASSET")}
+          AND a.ZDATECREATED >= ?
         ORDER BY a.ZDATECREATED DESC
         LIMIT ?
     """
-    try:
-        # Try with ZTRASHEDSTATE filter first
-        query_with_trash = query.replace(
-            "WHERE a.ZDATECREATED >= ?",
-            "WHERE a.ZTRASHEDSTATE = 0 AND a.ZDATECREATED >= ?"
-        )
-        cursor = conn.execute(query_with_trash, (cutoff_coredata, limit))
-    except sqlite3.OperationalError:
-        cursor = conn.execute(query, (cutoff_coredata, limit))
+    cursor = conn.execute(query, (cutoff_coredata, limit))
 
     rows = cursor.fetchall()
     if not rows:
@@ -261,6 +1125,7 @@ def cmd_recent(conn, library_root, args):
         return
 
     print(f"Photos from the last {days} day(s):\n")
+    get_path_resolver(library_root).prefetch(rows)
     for i, row in enumerate(rows, 1):
         print(format_photo(i, row, library_root))
         if i < len(rows):
@@ -271,58 +1136,33 @@ def cmd_recent(conn, library_root, args):
 
 def cmd_albums(conn, library_root, args):
     """List all user albums."""
-    query = """
-        SELECT ZTITLE, ZUUID,
-               (SELECT COUNT(*) FROM ZASSET) as ZTOTAL
-        FROM ZGENERICALBUM
+    schema = get_schema(conn)
+    query = f"""
+        SELECT Z_PK, ZTITLE, ZUUID
+        FROM ZGENERICALBUM g
         WHERE ZTITLE IS NOT NULL
-          AND ZTRASHEDSTATE = 0
+          AND {schema.not_trashed("g", "ZGENERICALBUM")}
         ORDER BY ZTITLE
     """
-    try:
-        cursor = conn.execute(query)
-    except sqlite3.OperationalError:
-        # Fallback without ZTRASHEDSTATE
-        query = """
-            SELECT ZTITLE, ZUUID
-            FROM ZGENERICALBUM
-            WHERE ZTITLE IS NOT NULL
-            ORDER BY ZTITLE
-        """
-        cursor = conn.execute(query)
-
-    rows = cursor.fetchall()
+    rows = conn.execute(query).fetchall()
     if not rows:
         print("No albums found.")
         return
 
-    # Get photo counts per album using the join table
-    join_table, album_col, asset_col = detect_join_table(conn)
+    # Photo counts for all albums in one pass over the join table
+    counts = {}
+    join_table, album_col, asset_col = schema.join_table
+    if join_table:
+        counts = dict(conn.execute(
+            f"SELECT {album_col}, COUNT(*) FROM {join_table} GROUP BY {album_col}"
+        ).fetchall())
 
     print("Albums:\n")
     for i, row in enumerate(rows, 1):
         title = row["ZTITLE"]
-        uuid = row["ZUUID"] or ""
-
         count_str = ""
-        if join_table and album_col:
-            try:
-                # Get the album's Z_PK
-                pk_cursor = conn.execute(
-                    "SELECT Z_PK FROM ZGENERICALBUM WHERE ZUUID = ?", (uuid,)
-                )
-                pk_row = pk_cursor.fetchone()
-                if pk_row:
-                    count_cursor = conn.execute(
-                        f"SELECT COUNT(*) as cnt FROM {join_table} WHERE {album_col} = ?",
-                        (pk_row["Z_PK"],)
-                    )
-                    count_row = count_cursor.fetchone()
-                    if count_row:
-                        count_str = f" ({count_row['cnt']} photos)"
-            except sqlite3.OperationalError:
-                pass
-
+        if join_table:
+            count_str = f" ({counts.get(row['Z_PK'], 0)} photos)"
         print(f"  {i}. {title}{count_str}")
 
     print(f"\n--- {len(rows)} album(s) ---")
@@ -333,21 +1173,7 @@ def cmd_album(conn, library_root, args):
     album_name = args.name
     limit = args.n or 20
 
-    # Find the album
-    album_cursor = conn.execute(
-        "SELECT Z_PK, ZTITLE, ZUUID FROM ZGENERICALBUM WHERE ZTITLE = ? COLLATE NOCASE",
-        (album_name,)
-    )
-    album_row = album_cursor.fetchone()
-
-    if not album_row:
-        # Try partial match
-        album_cursor = conn.execute(
-            "SELECT Z_PK, ZTITLE, ZUUID FROM ZGENERICALBUM WHERE ZTITLE LIKE ? COLLATE NOCASE",
-            (f"%{album_name}%",)
-        )
-        album_row = album_cursor.fetchone()
-
+    album_row = find_album(conn, album_name)
     if not album_row:
         print(f"Album \"{album_name}\" not found.")
         return
@@ -355,15 +1181,14 @@ def cmd_album(conn, library_root, args):
     album_pk = album_row["Z_PK"]
     actual_title = album_row["ZTITLE"]
 
-    join_table, album_col, asset_col = detect_join_table(conn)
+    schema = get_schema(conn)
+    join_table, album_col, asset_col = schema.join_table
     if not join_table:
         print("Error: Could not detect album-asset join table structure.")
         return
 
     query = f"""
-        SELECT a.ZUUID, a.ZFILENAME, a.ZDATECREATED, a.ZDIRECTORY,
-               a.ZLATITUDE, a.ZLONGITUDE,
-               a.ZWIDTH, a.ZHEIGHT
+        SELECT {schema.select("a", "ZASSET", PHOTO_COLUMNS)}
         FROM ZASSET a
         INNER JOIN {join_table} j ON j.{asset_col} = a.Z_PK
         WHERE j.{album_col} = ?
@@ -378,6 +1203,7 @@ def cmd_album(conn, library_root, args):
         return
 
     print(f"Album: {actual_title}\n")
+    get_path_resolver(library_root).prefetch(rows)
     for i, row in enumerate(rows, 1):
         print(format_photo(i, row, library_root))
         if i < len(rows):
@@ -386,6 +1212,12 @@ def cmd_album(conn, library_root, args):
     print(f"\n--- {len(rows)} result(s) shown (max {limit}) ---")
 
 
+# ZADDITIONALASSETATTRIBUTES columns shown by info
+INFO_ATTRIBUTE_COLUMNS = ("ZTITLE", "ZEXIFTIMESTAMPSTRING", "ZCAMERAMAKE", "ZCAMERAMODEL",
+                          "ZLENSMAKE", "ZLENSMODEL", "ZFOCALLENGTHIN35MMFORMAT",
+                          "ZORIGINALFILESIZE", "ZORIGINALFILENAME")
+
+
 def cmd_info(conn, library_root, args):
     """Show detailed metadata for a photo."""
     identifier = args.identifier
@@ -402,34 +1234,20 @@ def cmd_info(conn, library_root, args):
         where_clause = "a.ZFILENAME = ? COLLATE NOCASE"
         param = filename
 
+    schema = get_schema(conn)
+    select = schema.select("a", "ZASSET", PHOTO_COLUMNS + ("ZDURATION", "ZKIND"))
+    join = ""
+    if schema.has("ZADDITIONALASSETATTRIBUTES", "ZASSET"):
+        join = "LEFT JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.ZASSET = a.Z_PK"
+        select += ", " + schema.select("attr", "ZADDITIONALASSETATTRIBUTES", INFO_ATTRIBUTE_COLUMNS)
     query = f"""
-        SELECT a.ZUUID, a.ZFILENAME, a.ZDATECREATED, a.ZDIRECTORY,
-               a.ZLATITUDE, a.ZLONGITUDE,
-               a.ZWIDTH, a.ZHEIGHT,
-               a.ZDURATION, a.ZKIND,
-               attr.ZTITLE, attr.ZEXIFTIMESTAMPSTRING,
-               attr.ZCAMERAMAKE, attr.ZCAMERAMODEL,
-               attr.ZLENSMAKE, attr.ZLENSMODEL,
-               attr.ZFOCALLENGTHIN35MMFORMAT,
-               attr.ZORIGINALFILESIZE, attr.ZORIGINALFILENAME
+        SELECT {select}
         FROM ZASSET a
-        LEFT JOIN ZADDITIONALASSETATTRIBUTES attr ON attr.ZASSET = a.Z_PK
+        {join}
         WHERE {where_clause}
         LIMIT 1
     """
-    try:
-        cursor = conn.execute(query, (param,))
-    except sqlite3.OperationalError:
-        # Simplified fallback query
-        query = f"""
-            SELECT a.ZUUID, a.ZFILENAME, a.ZDATECREATED, a.ZDIRECTORY,
-                   a.ZLATITUDE, a.ZLONGITUDE,
-                   a.ZWIDTH, a.ZHEIGHT
-            FROM ZASSET a
-            WHERE {where_clause}
-            LIMIT 1
-        """
-        cursor = conn.execute(query, (param,))
+    cursor = conn.execute(query, (param,))
 
     row = cursor.fetchone()
     if not row:
@@ -556,6 +1374,285 @@ def cmd_export(conn, library_root, args):
     print(f"  To:   {output_path}")
 
 
+def _load_clonefile():
+    """libc clonefile() on macOS (copy-on-write copy on APFS); None elsewhere."""
+    if sys.platform != "darwin":
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        clonefile = libc.clonefile
+    except (OSError, AttributeError):
+        return None
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+    clonefile.restype = ctypes.c_int
+    return clonefile
+
+
+_clonefile = _load_clonefile()
+
+
+def fast_copy(source_path, dest_path):
+    """
+    Copy a file with the cheapest mechanism available, preserving mtime:
+    APFS clone on macOS, copy_file_range on Linux, otherwise shutil.copyfile
+    (which itself uses fcopyfile on macOS and sendfile on Linux).
+    """
+    if _clonefile is not None and _clonefile(os.fsencode(source_path), os.fsencode(dest_path), 0) == 0:
+        shutil.copystat(source_path, dest_path)
+        return
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), min(remaining, 1 << 30))
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                shutil.copystat(source_path, dest_path)
+                return
+        except OSError:
+            # e.g. EXDEV on older kernels or unsupported filesystems
+            pass
+    shutil.copyfile(source_path, dest_path)
+    shutil.copystat(source_path, dest_path)
+
+
+class ExportManifest:
+    """
+    Append-only JSON Lines log of finished files in an export directory.
+    Every completed copy is flushed immediately, so an interrupted export
+    resumes by skipping the entries already recorded. Assets not available
+    locally are logged once, not again on every re-run.
+    """
+
+    FILENAME = ".photos-export.jsonl"
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.done = {}
+        self.missing = set()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Last line cut short by an interruption
+                        continue
+                    key = (entry.get("uuid"), entry.get("file"))
+                    if entry.get("status") in ("copied", "present"):
+                        self.done[entry["uuid"]] = entry
+                        self.missing.discard(key)
+                    elif entry.get("status") == "missing":
+                        self.missing.add(key)
+        self.lock = threading.Lock()
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def is_done(self, asset_uuid, dest_path):
+        """True if the manifest records this asset and the exported file still matches."""
+        entry = self.done.get(asset_uuid)
+        if not entry or entry.get("file") != os.path.basename(dest_path):
+            return False
+        try:
+            return os.stat(dest_path).st_size == entry["size"]
+        except OSError:
+            return False
+
+    def record(self, entry):
+        with self.lock:
+            if entry.get("status") == "missing":
+                key = (entry["uuid"], entry["file"])
+                if key in self.missing:
+                    return
+                self.missing.add(key)
+            else:
+                self.missing.discard((entry["uuid"], entry.get("file")))
+            self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def export_one(row, source_path, dest_path, manifest):
+    """Copy one asset unless an identical file is already there; returns the status."""
+    asset_uuid = row["ZUUID"]
+    if manifest.is_done(asset_uuid, dest_path):
+        return "skipped"
+    try:
+        src_stat = os.stat(source_path)
+    except OSError:
+        manifest.record({"uuid": asset_uuid, "file": os.path.basename(dest_path), "status": "missing"})
+        return "missing"
+
+    entry = {"uuid": asset_uuid, "file": os.path.basename(dest_path), "size": src_stat.st_size}
+    try:
+        dst_stat = os.stat(dest_path)
+    except OSError:
+        dst_stat = None
+    if dst_stat and dst_stat.st_size == src_stat.st_size and int(dst_stat.st_mtime) == int(src_stat.st_mtime):
+        manifest.record(dict(entry, status="present"))
+        return "skipped"
+
+    # Copy to a temporary name first so an interrupted copy never looks complete
+    part_path = dest_path + ".part"
+    try:
+        if os.path.exists(part_path):
+            os.unlink(part_path)
+        fast_copy(source_path, part_path)
+        os.replace(part_path, dest_path)
+    except OSError as e:
+        manifest.record(dict(entry, status="failed", error=str(e)))
+        return "failed"
+    manifest.record(dict(entry, status="copied"))
+    return "copied"
+
+
+def find_album(conn, album_name):
+    """Find an album by exact (case-insensitive) title, then by partial match."""
+    album_row = conn.execute(
+        "SELECT Z_PK, ZTITLE, ZUUID FROM ZGENERICALBUM WHERE ZTITLE = ? COLLATE NOCASE",
+        (album_name,)
+    ).fetchone()
+    if not album_row:
+        album_row = conn.execute(
+            "SELECT Z_PK, ZTITLE, ZUUID FROM ZGENERICALBUM WHERE ZTITLE LIKE ? COLLATE NOCASE",
+            (f"%{album_name}%",)
+        ).fetchone()
+    return album_row
+
+
+def parse_day(value):
+    """argparse type for YYYY-MM-DD dates."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}' (expected YYYY-MM-DD)")
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid count '{value}' (expected a positive integer)")
+    return number
+
+
+def select_export_rows(conn, args):
+    """Assets chosen by --album / --search and the --from / --to date range, newest first."""
+    schema = get_schema(conn)
+    since = args.since.timestamp() - COREDATA_EPOCH_OFFSET if args.since else None
+    until = (args.until + timedelta(days=1)).timestamp() - COREDATA_EPOCH_OFFSET if args.until else None
+
+    if args.search:
+        index = None if args.no_index else open_search_index(conn)
+        if index is not None:
+            try:
+                rows = index.search(args.search, args.limit or -1, sort="date", since=since, until=until)
+                if rows or index.trigram:
+                    return rows
+            finally:
+                index.close()
+        return search_like(conn, args.search, args.limit or -1, since=since, until=until)
+
+    conditions = [schema.not_trashed("a", "ZASSET")]
+    params = []
+    join = ""
+    if args.album:
+        album_row = find_album(conn, args.album)
+        if not album_row:
+            print(f"Album \"{args.album}\" not found.")
+            sys.exit(1)
+        join_table, album_col, asset_col = schema.join_table
+        if not join_table:
+            print("Error: Could not detect album-asset join table structure.")
+            sys.exit(1)
+        join = f"INNER JOIN {join_table} j ON j.{asset_col} = a.Z_PK"
+        conditions.append(f"j.{album_col} = ?")
+        params.append(album_row["Z_PK"])
+    bounds, bound_params = date_bounds("a", since, until)
+    conditions += bounds
+    params += bound_params
+    query = f"""
+        SELECT {schema.select("a", "ZASSET", PHOTO_COLUMNS)}
+        FROM ZASSET a
+        {join}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY a.ZDATECREATED DESC
+        LIMIT ?
+    """
+    return conn.execute(query, params + [args.limit or -1]).fetchall()
+
+
+def cmd_bulk_export(conn, library_root, args):
+    """Export many photos in parallel; re-running resumes an interrupted export."""
+    if not (args.album or args.search or args.since or args.until):
+        print("Error: Choose photos with --album, --search, or a --from/--to date range.")
+        sys.exit(1)
+
+    rows = select_export_rows(conn, args)
+    if not rows:
+        print("No photos matched.")
+        return
+
+    output_dir = os.path.expanduser(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Destination names: library filename, disambiguated if two assets share one
+    resolver = get_path_resolver(library_root)
+    resolver.prefetch(rows)
+    jobs = []
+    used = set()
+    for row in rows:
+        filename = row["ZFILENAME"] or f"{row['ZUUID']}"
+        if filename.lower() in used:
+            stem, ext = os.path.splitext(filename)
+            filename = f"{stem}-{row['ZUUID'][:8]}{ext}"
+        used.add(filename.lower())
+        jobs.append((row, resolver.resolve(row), os.path.join(output_dir, filename)))
+
+    if args.dry_run:
+        present = sum(1 for row, _, _ in jobs if resolver.locate(row))
+        print(f"Would export {len(jobs)} photo(s) to {output_dir}")
+        print(f"  Available locally: {present}")
+        print(f"  Not downloaded (iCloud): {len(jobs) - present}")
+        return
+
+    manifest = ExportManifest(output_dir)
+    counts = {"copied": 0, "skipped": 0, "missing": 0, "failed": 0}
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(export_one, row, source, dest, manifest) for row, source, dest in jobs]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    counts[future.result()] += 1
+                    if done % 500 == 0:
+                        print(f"  {done}/{len(jobs)}...", file=sys.stderr)
+            except KeyboardInterrupt:
+                # Drop queued copies; only those already running finish and reach the manifest
+                pool.shutdown(wait=True, cancel_futures=True)
+                print("\nInterrupted — run the same command again to resume.")
+                sys.exit(130)
+    finally:
+        manifest.close()
+
+    elapsed = time.monotonic() - started
+    print(f"Exported to: {output_dir}")
+    print(f"  Copied: {counts['copied']}")
+    print(f"  Already present: {counts['skipped']}")
+    if counts["missing"]:
+        print(f"  Not downloaded (iCloud): {counts['missing']}")
+    if counts["failed"]:
+        print(f"  Failed: {counts['failed']} (see {ExportManifest.FILENAME})")
+    print(f"  Time: {elapsed:.1f}s")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Search and browse Apple Photos library",
@@ -567,6 +1664,16 @@ def main():
     p_search = subparsers.add_parser("search", help="Search photos by keyword")
     p_search.add_argument("keyword", help="Search keyword")
     p_search.add_argument("-n", type=int, default=20, help="Max results (default: 20)")
+    p_search.add_argument("--sort", choices=["relevance", "date"], default="relevance",
+                          help="Order of indexed results (default: relevance)")
+    p_search.add_argument("--no-index", action="store_true",
+                          help="Scan filenames and titles in the Photos database instead of using the search index")
+
+    # index
+    p_index = subparsers.add_parser("index", help="Show or maintain the sidecar search index")
+    p_index_action = p_index.add_mutually_exclusive_group()
+    p_index_action.add_argument("--rebuild", action="store_true", help="Rebuild the index from scratch")
+    p_index_action.add_argument("--clear", action="store_true", help="Drop all indexed data")
 
     # recent
     p_recent = subparsers.add_parser("recent", help="Recent photos")
@@ -590,6 +1697,20 @@ def main():
     p_export.add_argument("uuid", help="Photo UUID")
     p_export.add_argument("output_path", help="Output file or directory path")
 
+    # bulk-export
+    p_bulk = subparsers.add_parser("bulk-export", help="Export many photos in parallel (resumable)")
+    p_bulk.add_argument("output_dir", help="Output directory")
+    p_bulk_source = p_bulk.add_mutually_exclusive_group()
+    p_bulk_source.add_argument("--album", help="Photos in this album (exact or partial match)")
+    p_bulk_source.add_argument("--search", help="Photos matching this search")
+    p_bulk.add_argument("--from", dest="since", type=parse_day, help="Taken on or after YYYY-MM-DD")
+    p_bulk.add_argument("--to", dest="until", type=parse_day, help="Taken on or before YYYY-MM-DD")
+    p_bulk.add_argument("-n", "--limit", type=int, default=0, help="Export at most this many (newest first)")
+    p_bulk.add_argument("-j", "--jobs", type=positive_int, default=min(8, (os.cpu_count() or 2) * 2),
+                        help="Parallel copies (default: 2x CPUs, max 8)")
+    p_bulk.add_argument("--dry-run", action="store_true", help="Only count what would be exported")
+    p_bulk.add_argument("--no-index", action="store_true", help="With --search, scan instead of using the index")
+
     args = parser.parse_args()
 
     if not args.command:
@@ -626,11 +1747,13 @@ def main():
     try:
         commands = {
             "search": cmd_search,
+            "index": cmd_index,
             "recent": cmd_recent,
             "albums": cmd_albums,
             "album": cmd_album,
             "info": cmd_info,
             "export": cmd_export,
+            "bulk-export": cmd_bulk_export,
         }
         commands[args.command](conn, library_root, args)
     except sqlite3.OperationalError as e:
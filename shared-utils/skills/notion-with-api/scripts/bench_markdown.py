@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Benchmark markdown -> Notion block conversion on large synthetic documents.
+
+Generates design-doc shaped markdown (headings, paragraphs with inline
+formatting, nested lists, code fences, tables, quotes) and times
+markdown_to_notion_blocks / parse_inline_formatting. No network or token needed.
+
+Usage:
+    python3 bench_markdown.py                 # 100 KB, 1 MB and 5 MB documents
+    python3 bench_markdown.py --size 1000000 --repeat 5
+    python3 bench_markdown.py --file design.md
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from notion_api import iter_notion_blocks, markdown_to_notion_blocks, parse_inline_formatting  # noqa: E402
+
+WORDS = ("latency", "cache", "notion", "block", "request", "schema", "page", "token",
+         "worker", "retry", "budget", "index", "query", "payload", "diff", "commit")
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    parts = []
+    for _ in range(words):
+        w = rng.choice(WORDS)
+        r = rng.random()
+        if r < 0.05:
+            w = f"**{w}**"
+        elif r < 0.09:
+            w = f"*{w}*"
+        elif r < 0.13:
+            w = f"`{w}()`"
+        elif r < 0.15:
+            w = f"[{w}](https://example.com/{w})"
+        parts.append(w)
+    return " ".join(parts) + "."
+
+
+def generate_markdown(size: int, seed: int = 0) -> str:
+    """Build a synthetic markdown document of roughly `size` bytes.
+
+    Args:
+        size: Target size in bytes
+        seed: Random seed, so runs are comparable
+
+    Returns:
+        str: Markdown text
+    """
+    rng = random.Random(seed)
+    chunks = []
+    total = 0
+    section = 0
+    while total < size:
+        section += 1
+        r = rng.random()
+        if r < 0.10:
+            chunk = f"## Section {section}\n\n### Details {section}"
+        elif r < 0.45:
+            chunk = "\n".join(_sentence(rng) for _ in range(rng.randint(1, 4)))
+        elif r < 0.70:
+            items = []
+            depth = 0
+            for _ in range(rng.randint(3, 10)):
+                depth = max(0, min(depth + rng.choice((-1, 0, 1)), 2))
+                marker = "1." if rng.random() < 0.3 else "-"
+                items.append("  " * depth + f"{marker} {_sentence(rng, 8)}")
+            chunk = "\n".join(items)
+        elif r < 0.80:
+            body = "\n".join(f"    value_{i} = compute({i})" for i in range(rng.randint(3, 15)))
+            chunk = f"```python\ndef step_{section}():\n{body}\n```"
+        elif r < 0.90:
+            rows = [f"| {rng.choice(WORDS)} | {rng.randint(0, 999)} | {_sentence(rng, 4)} |"
+                    for _ in range(rng.randint(2, 8))]
+            chunk = "\n".join(["| Name | Value | Notes |", "|------|-------|-------|"] + rows)
+        elif r < 0.95:
+            chunk = f"> {_sentence(rng)}"
+        else:
+            chunk = "---"
+        chunks.append(chunk)
+        total += len(chunk) + 2
+    return "\n\n".join(chunks)
+
+
+def _time(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench(markdown: str, repeat: int, label: str):
+    """Time conversion of one document and print a summary line per benchmark."""
+    blocks = markdown_to_notion_blocks(markdown)
+    lines = [line for line in markdown.split("\n") if line.strip()]
+    mb = len(markdown.encode("utf-8")) / 1_000_000
+
+    cases = [
+        ("markdown_to_notion_blocks", lambda: markdown_to_notion_blocks(markdown)),
+        ("iter_notion_blocks (first block)", lambda: next(iter_notion_blocks(markdown), None)),
+        ("parse_inline_formatting (per line)", lambda: [parse_inline_formatting(line) for line in lines]),
+    ]
+    print(f"{label}: {mb:.2f} MB, {len(lines)} lines, {len(blocks)} top-level blocks")
+    for name, fn in cases:
+        samples = _time(fn, repeat)
+        best = min(samples)
+        rate = f"{mb / best:.1f} MB/s" if best > 0 else "-"
+        print(f"  {name:<36} best {best * 1000:9.2f}ms  median {statistics.median(samples) * 1000:9.2f}ms  {rate}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark markdown to Notion block conversion")
+    parser.add_argument("--size", type=int, action="append",
+                        help="Synthetic document size in bytes (repeatable; default 100K, 1M, 5M)")
+    parser.add_argument("--file", help="Benchmark an existing markdown file instead")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (default 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for synthetic documents")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "r") as f:
+            bench(f.read(), args.repeat, args.file)
+        return
+    for size in args.size or [100_000, 1_000_000, 5_000_000]:
+        bench(generate_markdown(size, args.seed), args.repeat, f"synthetic {size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Benchmark notion_api.py operations against the local fake Notion server.
+
+Times read_page, query_db, update_page and update_page_incremental at
+configurable sizes and reports wall-clock, requests sent per endpoint, and
+retries, so throughput can be tracked across releases without touching the
+real API. No token needed.
+
+Usage:
+    python3 bench_notion.py                            # default sizes, no latency
+    python3 bench_notion.py --blocks 100,1000 --rows 1000,5000 --latency 0.05
+    python3 bench_notion.py --rate-limit 3 --rate-429 0.02 --json > results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+import notion_api  # noqa: E402
+from fake_notion_server import FakeNotionServer  # noqa: E402
+
+OPERATIONS = ("read_page", "query_db", "update_page", "update_page_incremental")
+
+
+def page_markdown(blocks: int, seed: int = 0) -> str:
+    """Markdown with `blocks` top-level blocks: headings, paragraphs and nested lists."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(blocks):
+        if i % 10 == 9:
+            lines.append(f"- Item {i} with **bold** text\n  - nested {i}\n  - nested {i} again")
+        elif i % 7 == 0:
+            lines.append(f"## Heading {i}")
+        else:
+            lines.append(f"Paragraph {i}: {rng.random():.6f} the quick brown fox jumps over the lazy dog.")
+    return "\n\n".join(lines)
+
+
+def edit_markdown(markdown: str, fraction: float, seed: int = 1) -> str:
+    """Change, insert and delete about `fraction` of the top-level blocks."""
+    rng = random.Random(seed)
+    chunks = markdown.split("\n\n")
+    for _ in range(max(1, int(len(chunks) * fraction))):
+        i = rng.randrange(len(chunks))
+        r = rng.random()
+        if r < 0.4:
+            chunks[i] += " (edited)"
+        elif r < 0.7:
+            chunks.insert(i, f"Inserted paragraph {rng.random():.6f}")
+        elif len(chunks) > 1:
+            del chunks[i]
+    return "\n\n".join(chunks)
+
+
+class Bench:
+    """Runs operations against one fake server, collecting per-run measurements."""
+
+    def __init__(self, server: FakeNotionServer, edit_fraction: float):
+        self.server = server
+        self.state = server.state
+        self.edit_fraction = edit_fraction
+
+    def _prepare(self, op: str, size: int, run: int):
+        """Seed data for one run; returns a no-arg callable performing the operation."""
+        if op == "read_page":
+            page_id = self.state.seed_page(blocks=size)
+            return lambda: notion_api.read_page(page_id)
+        if op == "query_db":
+            db_id = self.state.seed_database(rows=size)
+            return lambda: notion_api.query_db(db_id, output_format="ndjson")
+        if op == "update_page":
+            page_id = self.state.seed_page(blocks=size)
+            content = page_markdown(size, seed=run)
+            return lambda: notion_api.update_page(page_id, content)
+        if op == "update_page_incremental":
+            page_id = self.state.seed_page(blocks=0)
+            content = page_markdown(size, seed=run)
+            self.state.append(page_id, notion_api.markdown_to_notion_blocks(content))
+            edited = edit_markdown(content, self.edit_fraction, seed=run)
+            return lambda: notion_api.update_page_incremental(page_id, edited, quiet=True)
+        raise ValueError(f"unknown operation: {op}")
+
+    def run(self, op: str, size: int, repeat: int) -> dict:
+        """Time `repeat` runs of one operation at one size.
+
+        Returns:
+            dict: op, size, wall-clock stats, requests per run (total and per
+                endpoint) and client retries/backoff
+        """
+        walls = []
+        requests_per_run = []
+        endpoints = {}
+        retries = 0
+        backoff = 0.0
+        for r in range(repeat):
+            action = self._prepare(op, size, r)
+            client = notion_api.get_client()
+            client_retries, client_backoff = client.retries, client.backoff_seconds
+            self.server.reset_counts()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                action()
+            walls.append(time.perf_counter() - started)
+            requests_per_run.append(self.server.total_requests())
+            for key, count in self.server.requests.items():
+                endpoints[key] = endpoints.get(key, 0) + count
+            retries += client.retries - client_retries
+            backoff += client.backoff_seconds - client_backoff
+        return {
+            "op": op,
+            "size": size,
+            "runs": repeat,
+            "wall_best": min(walls),
+            "wall_median": statistics.median(walls),
+            "requests": statistics.median(requests_per_run),
+            "endpoints": {k: v / repeat for k, v in sorted(endpoints.items())},
+            "retries": retries / repeat,
+            "backoff_seconds": backoff / repeat,
+        }
+
+
+def _sizes(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark notion_api.py against a local fake Notion server")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help=f"Comma-separated operations (default: {','.join(OPERATIONS)})")
+    parser.add_argument("--blocks", type=_sizes, default=[100, 1000], help="Page sizes in top-level blocks (default 100,1000)")
+    parser.add_argument("--rows", type=_sizes, default=[100, 1000], help="Database sizes in rows for query_db (default 100,1000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (default 3)")
+    parser.add_argument("--edit-fraction", type=float, default=0.05, help="Share of blocks changed for update_page_incremental (default 0.05)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random server latency, up to this many seconds")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability the server answers 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds on injected 429s (default 0.1)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Client requests/second (default 0 = unlimited)")
+    parser.add_argument("--pool-size", type=int, default=notion_api.POOL_SIZE, help="Client connection pool size")
+    parser.add_argument("--cache", choices=["use", "refresh", "off"], default="off", help="Block cache mode (default off)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    ops = [op.strip() for op in args.ops.split(",") if op.strip()]
+    unknown = set(ops) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    server = FakeNotionServer(latency=args.latency, jitter=args.jitter,
+                              rate_429=args.rate_429, retry_after=args.retry_after).start()
+    cache_dir = tempfile.TemporaryDirectory()
+    notion_api.CACHE_DIR = cache_dir.name
+    notion_api.set_cache_mode(args.cache)
+    notion_api.configure_client(base_url=server.base_url, pool_size=args.pool_size,
+                                rate_limit=args.rate_limit, max_retries=notion_api.MAX_RETRIES)
+    bench = Bench(server, args.edit_fraction)
+
+    results = []
+    try:
+        for op in ops:
+            for size in (args.rows if op == "query_db" else args.blocks):
+                result = bench.run(op, size, args.repeat)
+                results.append(result)
+                if not args.json:
+                    unit = "rows" if op == "query_db" else "blocks"
+                    print(f"{op:<24} {size:>6} {unit:<6}  best {result['wall_best'] * 1000:9.1f}ms  "
+                          f"median {result['wall_median'] * 1000:9.1f}ms  {result['requests']:>6g} requests  "
+                          f"{result['retries']:g} retries")
+    finally:
+        notion_api.get_client().close()
+        if notion_api._cache is not None:
+            notion_api._cache.close()
+        server.stop()
+        cache_dir.cleanup()
+
+    if args.json:
+        print(json.dumps({
+            "config": {k: v for k, v in vars(args).items() if k != "json"},
+            "results": results,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""Local in-memory stand-in for the Notion API, for benchmarks and regression tests.
+
+Implements the endpoints notion_api.py uses: users/me, search, pages,
+blocks (children pagination, append with `after`, delete), databases and
+database queries. Optional latency and 429 injection approximate the
+real API's behaviour under load. Every request is counted per endpoint.
+
+Usage:
+    python3 fake_notion_server.py --port 8700 --pages 5 --blocks 500 --rows 1000 \\
+        --latency 0.05 --rate-429 0.02
+    NOTION_BASE_URL=http://127.0.0.1:8700 NOTION_TOKEN=x python3 notion_api.py read-page PAGE_ID
+
+From Python (see bench_notion.py):
+    server = FakeNotionServer(latency=0.02)
+    server.start()
+    page_id = server.state.seed_page(blocks=1000)
+    ...
+    server.stop()
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MAX_PAGE_SIZE = 100
+MAX_APPEND = 100
+
+
+def _now() -> str:
+    # Notion reports last_edited_time truncated to the minute
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def _rich_text(items: list) -> list:
+    """Fill in the read-side fields (plain_text, href, annotations) of rich_text input."""
+    out = []
+    for item in items or []:
+        text = dict(item.get("text") or {})
+        link = text.get("link")
+        annotations = {"bold": False, "italic": False, "strikethrough": False,
+                       "underline": False, "code": False, "color": "default"}
+        annotations.update(item.get("annotations") or {})
+        out.append({
+            "type": item.get("type", "text"),
+            "text": text,
+            "annotations": annotations,
+            "plain_text": text.get("content", ""),
+            "href": link.get("url") if link else None,
+        })
+    return out
+
+
+def _plain(items: list) -> str:
+    return "".join(rt.get("plain_text", "") for rt in items or [])
+
+
+class FakeNotionState:
+    """In-memory workspace: pages, blocks, parent -> children lists, databases."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.pages = {}
+        self.blocks = {}
+        self.children = {}
+        self.databases = {}
+        self.rows = {}  # database id -> page ids, in creation order
+
+    # -- construction -------------------------------------------------------
+
+    def _touch(self, obj_id: str):
+        # A page under another page is also a child_page block; keep both in step
+        for table in (self.pages, self.blocks):
+            if obj_id in table:
+                table[obj_id]["last_edited_time"] = _now()
+
+    def _make_block(self, block: dict, parent_id: str) -> dict:
+        btype = block.get("type") or next(k for k in block if k not in ("object", "children"))
+        payload = dict(block.get(btype) or {})
+        nested = payload.pop("children", None) or block.get("children") or []
+        if "rich_text" in payload:
+            payload["rich_text"] = _rich_text(payload["rich_text"])
+        if btype == "table_row":
+            payload["cells"] = [_rich_text(cell) for cell in payload.get("cells", [])]
+        now = _now()
+        obj = {
+            "object": "block",
+            "id": _new_id(),
+            "parent": {"type": "block_id", "block_id": parent_id},
+            "created_time": now,
+            "last_edited_time": now,
+            "has_children": bool(nested),
+            "archived": False,
+            "type": btype,
+            btype: payload,
+        }
+        self.blocks[obj["id"]] = obj
+        self.children[obj["id"]] = [self._make_block(c, obj["id"])["id"] for c in nested]
+        return obj
+
+    def append(self, parent_id: str, blocks: list, after: str = None) -> list:
+        """Insert blocks under a parent (after a sibling, or at the end)."""
+        with self.lock:
+            created = [self._make_block(b, parent_id) for b in blocks]
+            ids = self.children.setdefault(parent_id, [])
+            pos = ids.index(after) + 1 if after else len(ids)
+            ids[pos:pos] = [b["id"] for b in created]
+            if parent_id in self.blocks:
+                self.blocks[parent_id]["has_children"] = True
+            self._touch(parent_id)
+            return created
+
+    def create_page(self, parent: dict, properties: dict, children: list = None) -> dict:
+        with self.lock:
+            page_id = _new_id()
+            now = _now()
+            props = {}
+            for name, value in (properties or {}).items():
+                value = dict(value)
+                if "title" in value:
+                    value = {"type": "title", "title": _rich_text(value["title"])}
+                elif "rich_text" in value:
+                    value = {"type": "rich_text", "rich_text": _rich_text(value["rich_text"])}
+                else:
+                    value["type"] = next(iter(value), "unknown")
+                props[name] = dict(value, id=name[:4])
+            page = {
+                "object": "page",
+                "id": page_id,
+                "created_time": now,
+                "last_edited_time": now,
+                "archived": False,
+                "parent": parent,
+                "properties": props,
+                "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+                "public_url": None,
+            }
+            self.pages[page_id] = page
+            self.children[page_id] = []
+            if parent.get("database_id") in self.rows:
+                self.rows[parent["database_id"]].append(page_id)
+            elif parent.get("page_id") in self.children:
+                self.blocks[page_id] = {
+                    "object": "block",
+                    "id": page_id,
+                    "parent": {"type": "block_id", "block_id": parent["page_id"]},
+                    "created_time": now,
+                    "last_edited_time": now,
+                    "has_children": False,
+                    "archived": False,
+                    "type": "child_page",
+                    "child_page": {"title": self.title_of(page)},
+                }
+                self.children[parent["page_id"]].append(page_id)
+                self._touch(parent["page_id"])
+            if children:
+                self.append(page_id, children)
+            return page
+
+    def create_database(self, parent: dict, title: list, properties: dict) -> dict:
+        with self.lock:
+            db_id = _new_id()
+            now = _now()
+            props = {}
+            for name, spec in (properties or {}).items():
+                ptype = next(iter(spec), "rich_text")
+                props[name] = {"id": name[:4], "name": name, "type": ptype, ptype: spec.get(ptype) or {}}
+            db = {
+                "object": "database",
+                "id": db_id,
+                "created_time": now,
+                "last_edited_time": now,
+                "parent": parent,
+                "title": _rich_text(title),
+                "properties": props,
+                "url": f"https://www.notion.so/{db_id.replace('-', '')}",
+            }
+            self.databases[db_id] = db
+            self.rows[db_id] = []
+            return db
+
+    @staticmethod
+    def title_of(obj: dict) -> str:
+        if obj.get("object") == "database":
+            return _plain(obj.get("title"))
+        for prop in obj.get("properties", {}).values():
+            if prop.get("type") == "title":
+                return _plain(prop.get("title"))
+        return ""
+
+    # -- seeding ------------------------------------------------------------
+
+    def seed_page(self, title: str = "Benchmark page", blocks: int = 100, nested_every: int = 10,
+                  parent_id: str = None) -> str:
+        """Create a page with `blocks` top-level blocks.
+
+        Every `nested_every`-th block is a bulleted item with two nested items
+        (0 disables nesting), so tree fetches exercise the children endpoints.
+
+        Returns:
+            str: The new page ID
+        """
+        parent = {"type": "page_id", "page_id": parent_id} if parent_id else {"type": "workspace", "workspace": True}
+        page = self.create_page(parent, {"title": {"title": [{"type": "text", "text": {"content": title}}]}})
+        content = []
+        for i in range(blocks):
+            text = [{"type": "text", "text": {"content": f"Block {i}: the quick brown fox jumps over the lazy dog."}}]
+            if nested_every and i % nested_every == nested_every - 1:
+                nested = [{"type": "bulleted_list_item", "bulleted_list_item": {"rich_text": text}}] * 2
+                content.append({"type": "bulleted_list_item",
+                                "bulleted_list_item": {"rich_text": text, "children": nested}})
+            elif i % 7 == 0:
+                content.append({"type": "heading_2", "heading_2": {"rich_text": text}})
+            else:
+                content.append({"type": "paragraph", "paragraph": {"rich_text": text}})
+        self.append(page["id"], content)
+        return page["id"]
+
+    def seed_database(self, title: str = "Benchmark DB", rows: int = 100) -> str:
+        """Create a database (Name, Status, Tags, Due, Done) with `rows` items.
+
+        Returns:
+            str: The new database ID
+        """
+        options = [{"name": n, "color": "default"} for n in ("todo", "doing", "done")]
+        db = self.create_database(
+            {"type": "workspace", "workspace": True},
+            [{"type": "text", "text": {"content": title}}],
+            {
+                "Name": {"title": {}},
+                "Status": {"select": {"options": options}},
+                "Tags": {"multi_select": {"options": options}},
+                "Due": {"date": {}},
+                "Done": {"checkbox": {}},
+            },
+        )
+        for i in range(rows):
+            self.create_page({"type": "database_id", "database_id": db["id"]}, {
+                "Name": {"title": [{"type": "text", "text": {"content": f"Item {i}"}}]},
+                "Status": {"select": {"name": options[i % 3]["name"]}},
+                "Tags": {"multi_select": [{"name": options[i % 2]["name"]}]},
+                "Due": {"date": {"start": f"2026-01-{i % 28 + 1:02d}"}},
+                "Done": {"checkbox": i % 2 == 0},
+            })
+        return db["id"]
+
+    def render(self, parent_id: str) -> list:
+        """Plain text of a parent's child blocks, nested as (type, text, children) tuples."""
+        with self.lock:
+            out = []
+            for bid in self.children.get(parent_id, []):
+                block = self.blocks[bid]
+                payload = block[block["type"]]
+                out.append((block["type"], _plain(payload.get("rich_text")), self.render(bid)))
+            return out
+
+
+def _paginate(items: list, cursor: str, page_size) -> dict:
+    start = int(cursor or 0)
+    size = max(1, min(int(page_size or MAX_PAGE_SIZE), MAX_PAGE_SIZE))
+    end = start + size
+    return {
+        "object": "list",
+        "results": items[start:end],
+        "has_more": end < len(items),
+        "next_cursor": str(end) if end < len(items) else None,
+    }
+
+
+# (method, path regex, handler name, endpoint class used in stats)
+ROUTES = [
+    ("GET", r"/v1/users/me", "users_me", "users"),
+    ("POST", r"/v1/search", "search", "search"),
+    ("GET", r"/v1/blocks/(?P<id>[\w-]+)/children", "list_children", "blocks.children"),
+    ("PATCH", r"/v1/blocks/(?P<id>[\w-]+)/children", "append_children", "blocks.append"),
+    ("GET", r"/v1/blocks/(?P<id>[\w-]+)", "get_block", "blocks"),
+    ("DELETE", r"/v1/blocks/(?P<id>[\w-]+)", "delete_block", "blocks.delete"),
+    ("POST", r"/v1/pages", "create_page", "pages.create"),
+    ("GET", r"/v1/pages/(?P<id>[\w-]+)", "get_page", "pages"),
+    ("PATCH", r"/v1/pages/(?P<id>[\w-]+)", "update_page", "pages.update"),
+    ("POST", r"/v1/databases", "create_database", "databases.create"),
+    ("POST", r"/v1/databases/(?P<id>[\w-]+)/query", "query_database", "databases.query"),
+    ("GET", r"/v1/databases/(?P<id>[\w-]+)", "get_database", "databases"),
+]
+_COMPILED_ROUTES = [(m, re.compile(p + r"$"), h, c) for m, p, h, c in ROUTES]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeNotion/1.0"
+    # Headers and body go out as separate writes; without TCP_NODELAY every
+    # keep-alive response stalls ~40ms on delayed ACKs.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, code: str, message: str, headers: dict = None):
+        self._send(status, {"object": "error", "status": status, "code": code, "message": message}, headers)
+
+    def _handle(self, method: str):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        for route_method, pattern, handler, endpoint in _COMPILED_ROUTES:
+            m = pattern.match(url.path)
+            if route_method == method and m:
+                break
+        else:
+            fake.count(method, "unknown")
+            return self._error(404, "object_not_found", f"No route for {method} {url.path}")
+
+        fake.count(method, endpoint)
+        if fake.latency or fake.jitter:
+            time.sleep(fake.latency + random.uniform(0, fake.jitter))
+        if fake.rate_429 and random.random() < fake.rate_429:
+            fake.count(method, endpoint, injected=True)
+            return self._error(429, "rate_limited", "Injected rate limit",
+                               {"Retry-After": f"{fake.retry_after:g}"})
+        try:
+            body = json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            return self._error(400, "invalid_json", "Body is not valid JSON")
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        status, payload = getattr(self, f"do_{handler}")(fake.state, body, query, **m.groupdict())
+        self._send(status, payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    # -- endpoints (each returns (status, body)) -----------------------------
+
+    @staticmethod
+    def _not_found(obj_id):
+        return 404, {"object": "error", "status": 404, "code": "object_not_found",
+                     "message": f"Could not find object with ID: {obj_id}."}
+
+    def do_users_me(self, state, body, query):
+        return 200, {"object": "user", "id": "fake-bot", "type": "bot", "name": "Fake Notion"}
+
+    def do_search(self, state, body, query):
+        text = (body.get("query") or "").lower()
+        wanted = (body.get("filter") or {}).get("value")
+        with state.lock:
+            objects = []
+            if wanted in (None, "page"):
+                objects += list(state.pages.values())
+            if wanted in (None, "database"):
+                objects += list(state.databases.values())
+            hits = [o for o in objects if text in state.title_of(o).lower()]
+        hits.sort(key=lambda o: o["last_edited_time"], reverse=True)
+        return 200, _paginate(hits, body.get("start_cursor"), body.get("page_size"))
+
+    def do_list_children(self, state, body, query, id):
+        with state.lock:
+            if id not in state.children:
+                return self._not_found(id)
+            items = [state.blocks[b] for b in state.children[id]]
+        return 200, _paginate(items, query.get("start_cursor"), query.get("page_size"))
+
+    def do_append_children(self, state, body, query, id):
+        children = body.get("children") or []
+        if len(children) > MAX_APPEND:
+            return 400, {"object": "error", "status": 400, "code": "validation_error",
+                         "message": f"body.children.length should be ≤ `{MAX_APPEND}`"}
+        with state.lock:
+            if id not in state.children:
+                return self._not_found(id)
+            after = body.get("after")
+            if after and after not in state.children[id]:
+                return 400, {"object": "error", "status": 400, "code": "validation_error",
+                             "message": f"Block {after} is not a child of {id}"}
+            created = state.append(id, children, after)
+        return 200, {"object": "list", "results": created, "has_more": False, "next_cursor": None}
+
+    def do_get_block(self, state, body, query, id):
+        with state.lock:
+            if id in state.blocks:
+                return 200, state.blocks[id]
+            if id in state.pages:
+                page = state.pages[id]
+                return 200, {"object": "block", "id": id, "type": "child_page",
+                             "child_page": {"title": state.title_of(page)},
+                             "last_edited_time": page["last_edited_time"],
+                             "has_children": bool(state.children.get(id))}
+        return self._not_found(id)
+
+    def do_delete_block(self, state, body, query, id):
+        with state.lock:
+            block = state.blocks.get(id)
+            if block is None or block["archived"]:
+                return self._not_found(id)
+            block["archived"] = True
+            parent_id = block["parent"]["block_id"]
+            if id in state.children.get(parent_id, []):
+                state.children[parent_id].remove(id)
+            state._touch(parent_id)
+            return 200, block
+
+    def do_create_page(self, state, body, query):
+        parent = body.get("parent") or {}
+        if len(body.get("children") or []) > MAX_APPEND:
+            return 400, {"object": "error", "status": 400, "code": "validation_error",
+                         "message": f"body.children.length should be ≤ `{MAX_APPEND}`"}
+        with state.lock:
+            db_id = parent.get("database_id")
+            if db_id and db_id not in state.databases:
+                return self._not_found(db_id)
+            if not db_id and parent.get("page_id") not in state.children:
+                return self._not_found(parent.get("page_id"))
+            return 200, state.create_page(parent, body.get("properties"), body.get("children"))
+
+    def do_get_page(self, state, body, query, id):
+        with state.lock:
+            page = state.pages.get(id)
+        return (200, page) if page else self._not_found(id)
+
+    def do_update_page(self, state, body, query, id):
+        with state.lock:
+            page = state.pages.get(id)
+            if page is None:
+                return self._not_found(id)
+            for name, value in (body.get("properties") or {}).items():
+                ptype = next(iter(value), "unknown")
+                page["properties"][name] = dict(value, type=ptype, id=name[:4])
+            if "archived" in body:
+                page["archived"] = bool(body["archived"])
+            state._touch(id)
+            return 200, page
+
+    def do_create_database(self, state, body, query):
+        return 200, state.create_database(body.get("parent") or {}, body.get("title"), body.get("properties"))
+
+    def do_get_database(self, state, body, query, id):
+        with state.lock:
+            db = state.databases.get(id)
+        return (200, db) if db else self._not_found(id)
+
+    def do_query_database(self, state, body, query, id):
+        with state.lock:
+            if id not in state.rows:
+                return self._not_found(id)
+            rows = [state.pages[p] for p in state.rows[id] if not state.pages[p]["archived"]]
+        return 200, _paginate(rows, body.get("start_cursor"), body.get("page_size"))
+
+
+class FakeNotionServer:
+    """Threaded HTTP server around a FakeNotionState.
+
+    Args:
+        host: Bind address
+        port: Port (0 picks a free one; see `base_url`)
+        latency: Seconds added to every response
+        jitter: Extra random latency, uniform in [0, jitter]
+        rate_429: Probability of answering a request with 429 rate_limited
+        retry_after: Retry-After seconds sent with injected 429s
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 rate_429: float = 0.0, retry_after: float = 1.0):
+        self.state = FakeNotionState()
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.requests = Counter()
+        self.injected = Counter()
+        self._count_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, method: str, endpoint: str, injected: bool = False):
+        with self._count_lock:
+            (self.injected if injected else self.requests)[f"{method} {endpoint}"] += 1
+
+    def reset_counts(self):
+        with self._count_lock:
+            self.requests.clear()
+            self.injected.clear()
+
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Notion API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--pages", type=int, default=1, help="Seed pages to create (default 1)")
+    parser.add_argument("--blocks", type=int, default=100, help="Top-level blocks per seeded page (default 100)")
+    parser.add_argument("--rows", type=int, default=100, help="Rows in the seeded database (default 100; 0 for none)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability of injecting a 429 per request")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    args = parser.parse_args()
+
+    server = FakeNotionServer(args.host, args.port, args.latency, args.jitter, args.rate_429, args.retry_after)
+    for i in range(args.pages):
+        print(f"Page: {server.state.seed_page(f'Benchmark page {i}', args.blocks)}")
+    if args.rows:
+        print(f"Database: {server.state.seed_database(rows=args.rows)}")
+    print(f"Serving fake Notion API on {server.base_url} (Ctrl-C to stop)")
+    print(f"  NOTION_BASE_URL={server.base_url} NOTION_TOKEN=fake python3 notion_api.py ...")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print("\nRequests served:")
+        for key, count in sorted(server.requests.items()):
+            print(f"  {key}: {count}")
+
+
+if __name__ == "__main__":
+    main()
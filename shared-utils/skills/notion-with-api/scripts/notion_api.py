@@ -12,13 +12,23 @@ Supports:
 """
 
 import argparse
+import contextlib
+import csv
+import hashlib
 import json
+import math
 import os
+import random
 import sys
 import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Load environment
@@ -47,7 +57,799 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
-BASE_URL = "https://api.notion.com"
+# Override to point at a proxy or the local stand-in (fake_notion_server.py).
+BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com")
+
+# Connection pool size for the shared HTTP client. Bulk commands run several
+# requests concurrently, so the pool must be at least as large as the worker count.
+POOL_SIZE = int(os.getenv("NOTION_POOL_SIZE", "10"))
+REQUEST_TIMEOUT = float(os.getenv("NOTION_TIMEOUT", "60"))
+# Concurrent children requests when fetching nested block trees.
+TREE_WORKERS = int(os.getenv("NOTION_TREE_WORKERS", "8"))
+
+# Local block cache (SQLite). Modes: "use" (revalidate against last_edited_time),
+# "refresh" (refetch everything and rewrite), "off".
+CACHE_DIR = os.getenv("NOTION_CACHE_DIR", os.path.join(SKILL_DIR, ".cache"))
+CACHE_MODE = os.getenv("NOTION_CACHE", "use")
+# Seconds a cached database schema is trusted before it is refetched.
+SCHEMA_TTL = float(os.getenv("NOTION_SCHEMA_TTL", "600"))
+
+# Notion allows an average of ~3 requests/second per integration, with short bursts.
+RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "5"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# 429 (rate_limited) and 409 (conflict_error) mean Notion rejected the request
+# without applying it, so they are safe to retry for any method. 5xx and
+# transport errors may have been applied server-side, so only idempotent
+# requests retry on those.
+REJECTED_STATUSES = {409, 429}
+TRANSIENT_STATUSES = {500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    `rate` tokens are added per second up to `capacity`; acquire() blocks until
+    a token is available. pause() stops all callers until a deadline, used when
+    the server answers 429 with Retry-After.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping as needed. Returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Block every caller for `seconds` and drain the burst allowance."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+def _is_idempotent(method: str, path: str) -> bool:
+    """Whether replaying a request cannot duplicate its effect.
+
+    PATCH /v1/blocks/{id}/children appends blocks and POST /v1/pages creates
+    a page, so neither may be retried after an ambiguous failure. Query and
+    search POSTs are reads.
+    """
+    path = path.split("?", 1)[0]
+    if method in ("GET", "DELETE"):
+        return True
+    if method == "PATCH":
+        return not path.endswith("/children")
+    if method == "POST":
+        return path.endswith("/query") or path.endswith("/v1/search")
+    return False
+
+
+# (method, path pattern, endpoint class) for grouping requests in traces and
+# summaries; IDs vary per call, the class does not.
+_ENDPOINT_CLASSES = [
+    ("GET", re.compile(r"/v1/users/"), "users"),
+    ("POST", re.compile(r"/v1/search$"), "search"),
+    ("GET", re.compile(r"/v1/blocks/[^/]+/children$"), "blocks.children"),
+    ("PATCH", re.compile(r"/v1/blocks/[^/]+/children$"), "blocks.append"),
+    ("GET", re.compile(r"/v1/blocks/[^/]+$"), "blocks.get"),
+    ("PATCH", re.compile(r"/v1/blocks/[^/]+$"), "blocks.update"),
+    ("DELETE", re.compile(r"/v1/blocks/[^/]+$"), "blocks.delete"),
+    ("POST", re.compile(r"/v1/pages$"), "pages.create"),
+    ("GET", re.compile(r"/v1/pages/[^/]+$"), "pages.get"),
+    ("PATCH", re.compile(r"/v1/pages/[^/]+$"), "pages.update"),
+    ("POST", re.compile(r"/v1/databases$"), "databases.create"),
+    ("POST", re.compile(r"/v1/databases/[^/]+/query$"), "databases.query"),
+    ("GET", re.compile(r"/v1/databases/[^/]+$"), "databases.get"),
+]
+
+
+def _endpoint_class(method: str, path: str) -> str:
+    """Group a request path into an endpoint class, e.g. "blocks.children"."""
+    path = path.split("?", 1)[0]
+    for m, pattern, name in _ENDPOINT_CLASSES:
+        if m == method and pattern.search(path):
+            return name
+    return f"{method} other"
+
+
+def _percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 when empty)."""
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values), math.ceil(q * len(values))) - 1)]
+
+
+def _retry_after(resp: requests.Response):
+    """Parse a Retry-After header (seconds) if present."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class NotionClient:
+    """Shared HTTP client for the Notion API.
+
+    Wraps a single pooled requests.Session so every command reuses keep-alive
+    connections instead of paying a TCP+TLS handshake per call. All requests
+    pass through one token bucket and are retried on 429/409 (honouring
+    Retry-After) and, when idempotent, on 5xx and transport errors, with
+    jittered exponential backoff.
+
+    Every request is recorded (endpoint class, status, latency split into
+    network / rate-limit wait / backoff, bytes, retries) in `records`, and
+    written as a JSON line to `trace` when one is given. Commands can time
+    their own CPU work with `phase()`; see `stats()` and `report()`.
+    """
+
+    def __init__(self, base_url: str = BASE_URL, headers: dict = None,
+                 pool_size: int = POOL_SIZE, timeout: float = REQUEST_TIMEOUT,
+                 rate_limit: float = RATE_LIMIT, max_retries: int = MAX_RETRIES,
+                 trace=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(rate_limit)
+        self.session = requests.Session()
+        self.session.headers.update(headers or HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # One dict per request, in completion order (see _record)
+        self.records = []
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.phases = {}  # phase name -> seconds
+        self.trace = trace  # file object receiving one JSON line per request
+        self._lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}{path}"
+
+    def _backoff(self, attempt: int, retry_after: float = None) -> float:
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, BACKOFF_BASE)
+        else:
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+        return delay
+
+    def _record(self, method: str, path: str, started: float, timing: dict, attempts: int,
+                resp: requests.Response = None, error: str = None):
+        """Store (and trace) one finished request, including all its retries."""
+        body = resp.request.body if resp is not None else None
+        rec = {
+            "type": "request",
+            "ts": round(started, 3),
+            "method": method,
+            "endpoint": _endpoint_class(method, path),
+            "path": path.split("?", 1)[0],
+            "status": resp.status_code if resp is not None else None,
+            "latency_ms": round(timing["network"] * 1000, 1),
+            "wait_ms": round(timing["wait"] * 1000, 1),
+            "backoff_ms": round(timing["backoff"] * 1000, 1),
+            "retries": attempts,
+            "req_bytes": len(body.encode("utf-8") if isinstance(body, str) else body or b""),
+            "resp_bytes": len(resp.content) if resp is not None else 0,
+        }
+        if error:
+            rec["error"] = error
+        with self._lock:
+            self.records.append(rec)
+            if self.trace is not None:
+                self.trace.write(json.dumps(rec) + "\n")
+                self.trace.flush()
+
+    def request(self, method: str, path: str, idempotent: bool = None, **kwargs) -> requests.Response:
+        """Send a rate-limited request through the pooled session, retrying per policy.
+
+        Args:
+            method: HTTP method
+            path: API path (e.g. "/v1/pages/ID") or absolute URL
+            idempotent: Override the method/path based idempotency guess
+
+        Returns:
+            requests.Response: the final response (may still be an error status)
+
+        Raises:
+            requests.RequestException: transport error after retries are exhausted
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if idempotent is None:
+            idempotent = _is_idempotent(method, path)
+        attempt = 0
+        started = time.time()
+        timing = {"network": 0.0, "wait": 0.0, "backoff": 0.0}
+        while True:
+            timing["wait"] += self.limiter.acquire()
+            sent = time.perf_counter()
+            try:
+                resp = self.session.request(method, self.url(path), **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                timing["network"] += time.perf_counter() - sent
+                # A connect timeout never reached the server, so it is always safe.
+                safe = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not safe or attempt >= self.max_retries:
+                    self._record(method, path, started, timing, attempt, error=type(e).__name__)
+                    raise
+                delay = self._backoff(attempt)
+                timing["backoff"] += delay
+                time.sleep(delay)
+                attempt += 1
+                continue
+            timing["network"] += time.perf_counter() - sent
+
+            status = resp.status_code
+            retryable = status in REJECTED_STATUSES or (idempotent and status in TRANSIENT_STATUSES)
+            if not retryable or attempt >= self.max_retries:
+                self._record(method, path, started, timing, attempt, resp=resp)
+                return resp
+
+            retry_after = _retry_after(resp) if status == 429 else None
+            delay = self._backoff(attempt, retry_after)
+            timing["backoff"] += delay
+            if status == 429:
+                self.limiter.pause(delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Accumulate wall time spent in a named non-network phase (e.g. "diff")."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def stats(self, wall: float = None) -> dict:
+        """Aggregate the recorded requests: calls, p50/p95 latency, bytes, time split.
+
+        Network, wait and backoff are summed over requests, so with concurrent
+        workers they can exceed `wall`.
+
+        Args:
+            wall: Command wall-clock seconds, included as-is when given
+
+        Returns:
+            dict: the "summary" record written at the end of a trace
+        """
+        with self._lock:
+            records = list(self.records)
+            phases = dict(self.phases)
+
+        def aggregate(group):
+            latencies = sorted(r["latency_ms"] for r in group)
+            return {
+                "calls": len(group),
+                "errors": sum(1 for r in group if r["status"] is None or r["status"] >= 400),
+                "retries": sum(r["retries"] for r in group),
+                "p50_ms": _percentile(latencies, 0.50),
+                "p95_ms": _percentile(latencies, 0.95),
+                "max_ms": latencies[-1] if latencies else 0.0,
+                "req_bytes": sum(r["req_bytes"] for r in group),
+                "resp_bytes": sum(r["resp_bytes"] for r in group),
+            }
+
+        by_endpoint = {}
+        for r in records:
+            by_endpoint.setdefault(r["endpoint"], []).append(r)
+        out = {"type": "summary"}
+        if wall is not None:
+            out["wall_s"] = round(wall, 3)
+        out.update(aggregate(records))
+        out.update({
+            "network_s": round(sum(r["latency_ms"] for r in records) / 1000, 3),
+            "wait_s": round(sum(r["wait_ms"] for r in records) / 1000, 3),
+            "backoff_s": round(sum(r["backoff_ms"] for r in records) / 1000, 3),
+            "phases_s": {k: round(v, 3) for k, v in sorted(phases.items())},
+            "endpoints": {k: aggregate(v) for k, v in sorted(by_endpoint.items())},
+        })
+        return out
+
+    def report(self, wall: float = None) -> list:
+        """Human-readable lines of stats(), for --timing."""
+        st = self.stats(wall)
+        head = f"{st['calls']} requests"
+        if wall is not None:
+            head += f" in {wall:.2f}s wall"
+        lines = [
+            f"{head}: p50 {st['p50_ms']:.0f}ms, p95 {st['p95_ms']:.0f}ms, "
+            f"{st['req_bytes'] / 1024:.1f} KiB sent, {st['resp_bytes'] / 1024:.1f} KiB received",
+            f"time: network {st['network_s']:.2f}s, rate-limit wait {st['wait_s']:.2f}s, "
+            f"backoff {st['backoff_s']:.2f}s ({st['retries']} retries)"
+            + "".join(f", {k} {v:.2f}s" for k, v in st["phases_s"].items()),
+        ]
+        for name, ep in st["endpoints"].items():
+            lines.append(
+                f"  {name:<18} {ep['calls']:>5} calls  p50 {ep['p50_ms']:>6.0f}ms  p95 {ep['p95_ms']:>6.0f}ms  "
+                f"{ep['retries']} retries  {ep['errors']} errors"
+            )
+        return lines
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+
+
+def get_client() -> NotionClient:
+    """Return the process-wide NotionClient, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = NotionClient()
+    return _client
+
+
+def configure_client(**kwargs) -> NotionClient:
+    """Replace the process-wide client (e.g. with a different pool size)."""
+    global _client
+    if _client is not None:
+        _client.close()
+    _client = NotionClient(**kwargs)
+    return _client
+
+
+def _parse_notion_time(value: str) -> float:
+    """Parse a Notion ISO-8601 timestamp ("2024-05-01T12:34:00.000Z") to epoch seconds."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class BlockCache:
+    """On-disk cache of block children keyed by their parent's last_edited_time.
+
+    Each cached parent (page or block) records the last_edited_time it had when
+    its children were fetched; each child block is stored without its nested
+    children. A lookup only hits when the caller-supplied last_edited_time
+    matches, so revalidating a tree refetches just the subtrees whose parent
+    changed.
+
+    Notion truncates last_edited_time to the minute, so an entry fetched in the
+    same minute as the edit it records is never trusted: an edit later in that
+    minute would leave the timestamp unchanged.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS parents (
+            id TEXT PRIMARY KEY,
+            last_edited_time TEXT,
+            fetched_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blocks (
+            id TEXT PRIMARY KEY,
+            parent_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            last_edited_time TEXT,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS blocks_parent ON blocks(parent_id, position);
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, parent_id: str, last_edited_time: str):
+        """Return cached children of parent_id, or None if missing or stale."""
+        if not last_edited_time:
+            self.misses += 1
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_edited_time, fetched_at FROM parents WHERE id = ?", (parent_id,)
+            ).fetchone()
+            if (row is None or row[0] != last_edited_time
+                    or row[1] < _parse_notion_time(last_edited_time) + 60):
+                self.misses += 1
+                return None
+            rows = self.conn.execute(
+                "SELECT payload FROM blocks WHERE parent_id = ? ORDER BY position", (parent_id,)
+            ).fetchall()
+        self.hits += 1
+        return [json.loads(r[0]) for r in rows]
+
+    def store(self, parent_id: str, last_edited_time: str, children: list, fetched_at: float):
+        """Replace the cached children of parent_id.
+
+        Args:
+            fetched_at: Epoch time the children request was started
+        """
+        rows = []
+        for pos, block in enumerate(children):
+            payload = {k: v for k, v in block.items() if k != "children"}
+            rows.append((block["id"], parent_id, pos, block.get("last_edited_time"),
+                         json.dumps(payload, ensure_ascii=False)))
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM blocks WHERE parent_id = ?", (parent_id,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO blocks (id, parent_id, position, last_edited_time, payload) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parents (id, last_edited_time, fetched_at) VALUES (?, ?, ?)",
+                (parent_id, last_edited_time, fetched_at))
+
+    def invalidate(self, parent_id: str):
+        """Drop cached children of parent_id and all their descendants."""
+        with self.lock, self.conn:
+            stack = [parent_id]
+            while stack:
+                pid = stack.pop()
+                stack.extend(r[0] for r in self.conn.execute(
+                    "SELECT id FROM blocks WHERE parent_id = ?", (pid,)))
+                self.conn.execute("DELETE FROM blocks WHERE parent_id = ?", (pid,))
+                self.conn.execute("DELETE FROM parents WHERE id = ?", (pid,))
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM blocks")
+            self.conn.execute("DELETE FROM parents")
+
+    def close(self):
+        self.conn.close()
+
+
+_cache = None
+_cache_mode = CACHE_MODE
+
+
+def get_cache():
+    """Return the process-wide BlockCache, or None when caching is off."""
+    global _cache
+    if _cache_mode == "off":
+        return None
+    if _cache is None:
+        _cache = BlockCache(os.path.join(CACHE_DIR, "blocks.sqlite"))
+    return _cache
+
+
+class SchemaCache:
+    """On-disk TTL cache of database objects (property types and options).
+
+    Notion has no ETag or conditional GET, so an entry is trusted for `ttl`
+    seconds and then refetched; every fetch overwrites the entry, since
+    last_edited_time (truncated to the minute) cannot tell whether a schema
+    changed within the same minute. Callers that get a validation error
+    from a write built on a cached schema should invalidate and retry once.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS schemas (
+            id TEXT PRIMARY KEY,
+            last_edited_time TEXT,
+            fetched_at REAL NOT NULL,
+            payload TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, database_id: str, ttl: float = SCHEMA_TTL):
+        """Return the cached database object if younger than ttl, else None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fetched_at, payload FROM schemas WHERE id = ?", (database_id,)
+            ).fetchone()
+        if row is None or time.time() - row[0] > ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[1])
+
+    def store(self, database_id: str, data: dict):
+        """Cache a freshly fetched database object."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO schemas (id, last_edited_time, fetched_at, payload) VALUES (?, ?, ?, ?)",
+                (database_id, data.get("last_edited_time"), time.time(), json.dumps(data, ensure_ascii=False)))
+
+    def invalidate(self, database_id: str):
+        """Forget one database's cached schema."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM schemas WHERE id = ?", (database_id,))
+
+    def clear(self):
+        """Drop every cached schema."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM schemas")
+
+    def close(self):
+        self.conn.close()
+
+
+_schema_cache = None
+
+
+def get_schema_cache():
+    """Return the process-wide SchemaCache, or None when caching is off."""
+    global _schema_cache
+    if _cache_mode == "off":
+        return None
+    if _schema_cache is None:
+        _schema_cache = SchemaCache(os.path.join(CACHE_DIR, "schemas.sqlite"))
+    return _schema_cache
+
+
+def fetch_database_schema(database_id: str, refresh: bool = False):
+    """Return a database object, from the schema cache when possible.
+
+    Args:
+        database_id: The database ID
+        refresh: Skip the cache lookup (the result is still stored)
+
+    Returns:
+        tuple: (database object, from_cache bool)
+
+    Raises:
+        RuntimeError: on a non-200 response
+    """
+    cache = get_schema_cache()
+    if cache is not None and not refresh and _cache_mode == "use":
+        data = cache.lookup(database_id)
+        if data is not None:
+            return data, True
+    resp = get_client().get(f"/v1/databases/{database_id}")
+    if resp.status_code != 200:
+        raise RuntimeError(f"{resp.status_code}\n{resp.text}")
+    data = resp.json()
+    if cache is not None:
+        cache.store(database_id, data)
+    return data, False
+
+
+def invalidate_database_schema(database_id: str):
+    """Forget a cached schema, e.g. after a write built from it was rejected."""
+    cache = get_schema_cache()
+    if cache is not None:
+        cache.invalidate(database_id)
+
+
+def set_cache_mode(mode: str):
+    """Select cache behaviour: "use", "refresh" or "off"."""
+    global _cache_mode
+    _cache_mode = mode
+
+
+class SearchIndex:
+    """Local SQLite FTS5 index of page titles and block text.
+
+    Filled by index_workspace(); each page row records the last_edited_time it
+    was indexed at, so a crawl only refetches pages that changed. The
+    "watermark" meta key is the newest last_edited_time seen by the last
+    complete crawl.
+
+    The trigram tokenizer is used when SQLite has it (3.34+): it matches
+    substrings in any script, including CJK text without word breaks.
+    Older SQLite falls back to unicode61 word/prefix matching.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            rowid INTEGER PRIMARY KEY,
+            id TEXT UNIQUE NOT NULL,
+            object TEXT NOT NULL,
+            title TEXT,
+            url TEXT,
+            last_edited_time TEXT,
+            indexed_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        row = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'page_fts'").fetchone()
+        if row is None:
+            try:
+                self.conn.execute("CREATE VIRTUAL TABLE page_fts USING fts5(title, body, tokenize='trigram')")
+            except sqlite3.OperationalError:
+                self.conn.execute(
+                    "CREATE VIRTUAL TABLE page_fts USING fts5(title, body, tokenize='unicode61 remove_diacritics 2')"
+                )
+            row = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'page_fts'").fetchone()
+        self.trigram = "trigram" in row[0]
+
+    def get_meta(self, key: str):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def is_current(self, obj_id: str, last_edited_time: str) -> bool:
+        """Whether the indexed copy is known to match this last_edited_time.
+
+        Like BlockCache, an entry indexed within a minute of the edit it
+        records is not trusted, since Notion truncates the timestamp.
+        """
+        row = self.conn.execute(
+            "SELECT last_edited_time, indexed_at FROM pages WHERE id = ?", (obj_id,)
+        ).fetchone()
+        if row is None or row[0] != last_edited_time or not last_edited_time:
+            return False
+        return row[1] >= _parse_notion_time(last_edited_time) + 60
+
+    def store(self, item: dict, title: str, body: str, indexed_at: float):
+        """Insert or replace one page/database and its text."""
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT rowid FROM pages WHERE id = ?", (item["id"],)).fetchone()
+            if row is not None:
+                self.conn.execute("DELETE FROM page_fts WHERE rowid = ?", (row[0],))
+            cur = self.conn.execute(
+                "INSERT OR REPLACE INTO pages (rowid, id, object, title, url, last_edited_time, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (row[0] if row else None, item["id"], item.get("object", "page"), title,
+                 item.get("url"), item.get("last_edited_time"), indexed_at),
+            )
+            self.conn.execute("INSERT INTO page_fts (rowid, title, body) VALUES (?, ?, ?)",
+                              (cur.lastrowid, title, body))
+
+    def prune(self, keep: set) -> int:
+        """Drop entries whose IDs are not in `keep` (after a full crawl). Returns the count."""
+        with self.lock, self.conn:
+            stale = [(rowid, obj_id) for rowid, obj_id in self.conn.execute("SELECT rowid, id FROM pages")
+                     if obj_id not in keep]
+            for rowid, _ in stale:
+                self.conn.execute("DELETE FROM page_fts WHERE rowid = ?", (rowid,))
+                self.conn.execute("DELETE FROM pages WHERE rowid = ?", (rowid,))
+        return len(stale)
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """Rank indexed pages against a free-text query.
+
+        Every whitespace-separated term must match (title or body). Title
+        matches rank above body matches.
+
+        Args:
+            query: Free text, not FTS syntax (quotes and operators are literal)
+            limit: Max results
+
+        Returns:
+            list: dicts with id, object, title, url, last_edited_time, snippet
+        """
+        terms = [t.strip('"') for t in query.split() if t.strip('"')]
+        if self.trigram:
+            # Trigrams need 3+ characters; shorter terms are substring-checked.
+            fts_terms = [t for t in terms if len(t) >= 3]
+            like_terms = [t for t in terms if len(t) < 3]
+        else:
+            fts_terms = [w for t in terms for w in re.findall(r"\w+", t)]
+            like_terms = []
+        if not fts_terms and not like_terms:
+            return []
+
+        where, params = [], []
+        if fts_terms:
+            quoted = " ".join('"' + t.replace('"', '""') + '"' + ("" if self.trigram else "*") for t in fts_terms)
+            where.append("page_fts MATCH ?")
+            params.append(quoted)
+        for term in like_terms:
+            # instr, not LIKE: the trigram tokenizer mishandles short LIKE patterns
+            where.append("(instr(lower(page_fts.title), ?) OR instr(lower(page_fts.body), ?))")
+            params += [term.lower(), term.lower()]
+        # Titles containing the whole query first, then by relevance
+        order = "instr(lower(p.title), ?) = 0, " + (
+            "bm25(page_fts, 10.0, 1.0)" if fts_terms else "p.last_edited_time DESC")
+        params.append(" ".join(terms).lower())
+        # snippet() needs a MATCH; without one it returns the whole body
+        snippet = "snippet(page_fts, 1, '[', ']', '...', 24)" if fts_terms else "page_fts.body"
+        sql = (
+            f"SELECT p.id, p.object, p.title, p.url, p.last_edited_time, {snippet} "
+            "FROM page_fts JOIN pages p ON p.rowid = page_fts.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?"
+        )
+        with self.lock:
+            rows = self.conn.execute(sql, params + [limit]).fetchall()
+        keys = ("id", "object", "title", "url", "last_edited_time", "snippet")
+        results = [dict(zip(keys, row)) for row in rows]
+        if not fts_terms:
+            for result in results:
+                result["snippet"] = self._snippet(result["snippet"] or "", like_terms)
+        return results
+
+    @staticmethod
+    def _snippet(body: str, terms: list, context: int = 60) -> str:
+        """Excerpt of `body` around the first hit of any term, marked like snippet()."""
+        lowered = body.lower()
+        hits = [(lowered.find(t.lower()), len(t)) for t in terms]
+        hits = [(pos, length) for pos, length in hits if pos >= 0]
+        if not hits:
+            return body[:2 * context] + ("..." if len(body) > 2 * context else "")
+        pos, length = min(hits)
+        start, end = max(0, pos - context), min(len(body), pos + length + context)
+        return (("..." if start else "") + body[start:pos] + "[" + body[pos:pos + length] + "]"
+                + body[pos + length:end] + ("..." if end < len(body) else ""))
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM page_fts")
+            self.conn.execute("DELETE FROM pages")
+            self.conn.execute("DELETE FROM meta")
+
+    def close(self):
+        self.conn.close()
+
+
+_search_index = None
+
+
+def get_search_index() -> SearchIndex:
+    """Return the process-wide SearchIndex (independent of --cache mode)."""
+    global _search_index
+    if _search_index is None:
+        _search_index = SearchIndex(os.path.join(CACHE_DIR, "search.sqlite"))
+    return _search_index
 
 
 # Notion code block language mapping
@@ -91,11 +893,50 @@ CODE_LANG_MAP = {
 }
 
 
+# Notion rejects text objects longer than 2000 characters.
+MAX_TEXT_LENGTH = 2000
+
+# Pattern matches: ***bold italic***, **bold**, *italic*, `code`, [text](url).
+# Compiled once; the outer group that matched (m.lastindex) selects the handler.
+INLINE_PATTERN = re.compile(
+    r'(\*\*\*(.+?)\*\*\*)'     # 1, 2: ***bold italic***
+    r'|(\*\*(.+?)\*\*)'         # 3, 4: **bold**
+    r'|(\*(.+?)\*)'             # 5, 6: *italic*
+    r'|(`(.+?)`)'               # 7, 8: `code`
+    r'|(\[(.+?)\]\((.+?)\))'    # 9, 10, 11: [text](url)
+)
+
+# outer group -> (content group, annotations)
+_INLINE_STYLES = {
+    1: (2, {"bold": True, "italic": True}),
+    3: (4, {"bold": True}),
+    5: (6, {"italic": True}),
+    7: (8, {"code": True}),
+}
+
+
+def _text_objects(content: str, annotations: dict = None, link: str = None) -> list:
+    """Build rich_text objects for one run of text, split at MAX_TEXT_LENGTH."""
+    out = []
+    for start in range(0, max(len(content), 1), MAX_TEXT_LENGTH):
+        obj = {"type": "text", "text": {"content": content[start:start + MAX_TEXT_LENGTH]}}
+        if link:
+            obj["text"]["link"] = {"url": link}
+        if annotations:
+            obj["annotations"] = dict(annotations)
+        out.append(obj)
+    return out
+
+
 def parse_inline_formatting(text: str) -> list:
     """Parse inline markdown formatting into Notion rich_text array.
 
     Supports: **bold**, *italic*, `code`, [link](url), ***bold italic***
 
+    A single finditer pass over a precompiled alternation; plain text between
+    matches is emitted as-is. Runs longer than Notion's 2000-character limit
+    are split into consecutive text objects.
+
     Args:
         text: Markdown text with inline formatting
 
@@ -106,64 +947,24 @@ def parse_inline_formatting(text: str) -> list:
         return []
 
     rich_text = []
-    # Pattern matches: ***bold italic***, **bold**, *italic*, `code`, [text](url)
-    pattern = re.compile(
-        r'(\*\*\*(.+?)\*\*\*)'     # ***bold italic***
-        r'|(\*\*(.+?)\*\*)'         # **bold**
-        r'|(\*(.+?)\*)'             # *italic*
-        r'|(`(.+?)`)'               # `code`
-        r'|(\[(.+?)\]\((.+?)\))'    # [text](url)
-    )
-
     last_end = 0
-    for m in pattern.finditer(text):
+    for m in INLINE_PATTERN.finditer(text):
         # Add plain text before this match
         if m.start() > last_end:
-            plain = text[last_end:m.start()]
-            if plain:
-                rich_text.append({"type": "text", "text": {"content": plain}})
-
-        if m.group(2):  # ***bold italic***
-            rich_text.append({
-                "type": "text",
-                "text": {"content": m.group(2)},
-                "annotations": {"bold": True, "italic": True}
-            })
-        elif m.group(4):  # **bold**
-            rich_text.append({
-                "type": "text",
-                "text": {"content": m.group(4)},
-                "annotations": {"bold": True}
-            })
-        elif m.group(6):  # *italic*
-            rich_text.append({
-                "type": "text",
-                "text": {"content": m.group(6)},
-                "annotations": {"italic": True}
-            })
-        elif m.group(8):  # `code`
-            rich_text.append({
-                "type": "text",
-                "text": {"content": m.group(8)},
-                "annotations": {"code": True}
-            })
-        elif m.group(10):  # [text](url)
-            rich_text.append({
-                "type": "text",
-                "text": {"content": m.group(10), "link": {"url": m.group(11)}}
-            })
+            rich_text.extend(_text_objects(text[last_end:m.start()]))
+
+        outer = m.lastindex
+        if outer == 9:  # [text](url)
+            rich_text.extend(_text_objects(m.group(10), link=m.group(11)))
+        else:
+            group, annotations = _INLINE_STYLES[outer]
+            rich_text.extend(_text_objects(m.group(group), annotations))
 
         last_end = m.end()
 
     # Add remaining plain text
     if last_end < len(text):
-        remaining = text[last_end:]
-        if remaining:
-            rich_text.append({"type": "text", "text": {"content": remaining}})
-
-    # If no formatting found, return plain text
-    if not rich_text:
-        rich_text = [{"type": "text", "text": {"content": text}}]
+        rich_text.extend(_text_objects(text[last_end:]))
 
     return rich_text
 
@@ -196,12 +997,58 @@ def is_table_separator(line: str) -> bool:
     return len(content) == 0 and "-" in stripped
 
 
-def markdown_to_notion_blocks(markdown: str) -> list:
-    """Convert markdown text to Notion block structure.
+# Block lexer: one match per line classifies it. The named group that closes
+# last (m.lastgroup) identifies the block kind.
+_BLOCK_LINE = re.compile(
+    r'(?P<indent>[ \t]*)(?:'
+    r'(?P<fence>```)'
+    r'|#{1,3} (?P<heading>.*)'
+    r'|> (?P<quote>.*)'
+    r'|(?P<hr>---|\*\*\*|___)\s*$'
+    r'|\d+\.\s+(?P<numbered>.+)'
+    r'|[-*+]\s+(?P<bulleted>.+)'
+    r'|(?P<pipe>\|)'
+    r')'
+)
+# Lines that end a paragraph (tested against the stripped line)
+_PARAGRAPH_STOP = re.compile(r'#{1,3} |```|> |---|\*\*\*|___|\|')
+_NUMBERED_START = re.compile(r'\s*\d+\.\s+')
+
+# Notion accepts two levels of nested children in one request, so deeper
+# list items are attached at the deepest allowed level.
+MAX_LIST_NESTING = 2
+LIST_ITEM_TYPES = ("bulleted_list_item", "numbered_list_item")
+
+
+def _rich_block(block_type: str, text: str) -> dict:
+    return {
+        "object": "block",
+        "type": block_type,
+        block_type: {
+            "rich_text": parse_inline_formatting(text)
+        }
+    }
+
+
+def _indent_width(indent: str) -> int:
+    return len(indent.replace("\t", "    "))
+
+
+def _ends_paragraph(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or _PARAGRAPH_STOP.match(stripped):
+        return True
+    if stripped.startswith(("- ", "* ", "+ ")) and not line.startswith("    "):
+        return True
+    return bool(_NUMBERED_START.match(line))
+
+
+def iter_notion_blocks(markdown: str):
+    """Convert markdown text to Notion blocks, yielding each block as it completes.
 
     Supports:
     - Headings: #, ##, ###
-    - Lists: - (bullet), 1. (numbered)
+    - Lists: - (bullet), 1. (numbered), nested by indentation
     - Code blocks: ```lang```
     - Blockquotes: >
     - Horizontal rules: ---
@@ -209,20 +1056,26 @@ def markdown_to_notion_blocks(markdown: str) -> list:
     - Inline formatting: **bold**, *italic*, `code`, [link](url)
     - Paragraphs (plain text)
 
+    Each line is classified once by a precompiled block pattern. A top-level
+    list item is held back until the next non-nested line, since later lines
+    may add children to it.
+
     Args:
         markdown: The markdown string
 
-    Returns:
-        list: Notion block objects
+    Yields:
+        dict: Notion block objects
     """
     if not markdown:
-        return []
+        return
 
-    blocks = []
     lines = markdown.split("\n")
+    n = len(lines)
     i = 0
+    list_root = None    # top-level list item still collecting children
+    list_stack = []     # (indent width, block) of open list items, outermost first
 
-    while i < len(lines):
+    while i < n:
         line = lines[i]
 
         # Empty line (skip)
@@ -230,53 +1083,74 @@ def markdown_to_notion_blocks(markdown: str) -> list:
             i += 1
             continue
 
+        m = _BLOCK_LINE.match(line)
+        kind = m.lastgroup if m else None
+        if kind in ("heading", "quote") and not m.group(kind).strip():
+            kind = None  # "# " or "> " with no text is a paragraph
+
+        # List items (possibly nested)
+        if kind in ("numbered", "bulleted"):
+            block = _rich_block(f"{kind}_list_item", m.group(kind))
+            indent = _indent_width(m.group("indent"))
+            while list_stack and list_stack[-1][0] >= indent:
+                list_stack.pop()
+            if list_stack:
+                del list_stack[MAX_LIST_NESTING:]
+                parent = list_stack[-1][1]
+                parent[parent["type"]].setdefault("children", []).append(block)
+            else:
+                if list_root is not None:
+                    yield list_root
+                list_root = block
+            list_stack.append((indent, block))
+            i += 1
+            continue
+
+        # Any other block closes the open list
+        if list_root is not None:
+            yield list_root
+            list_root = None
+            list_stack.clear()
+
         # Code block ```lang
-        if line.strip().startswith("```"):
+        if kind == "fence":
             lang = line.strip()[3:].strip().lower() or "plain text"
             code_lines = []
             i += 1
-            while i < len(lines) and not lines[i].strip().startswith("```"):
+            while i < n and not lines[i].strip().startswith("```"):
                 code_lines.append(lines[i])
                 i += 1
-            code_content = "\n".join(code_lines)
-            blocks.append({
+            yield {
                 "object": "block",
                 "type": "code",
                 "code": {
-                    "rich_text": [{"type": "text", "text": {"content": code_content}}],
+                    "rich_text": _text_objects("\n".join(code_lines)),
                     "language": lang
                 }
-            })
+            }
             i += 1
             continue
 
-        # Table detection: line starts with | and next line is separator
-        if line.strip().startswith("|") and i + 1 < len(lines) and is_table_separator(lines[i + 1]):
+        # Table: line starts with | and next line is separator
+        if kind == "pipe" and i + 1 < n and is_table_separator(lines[i + 1]):
             header_cells = parse_table_row(line)
             table_width = len(header_cells)
             i += 2  # skip header and separator
 
-            # Build table rows (header first)
-            table_rows = []
-            # Header row
-            table_rows.append({
+            # Header row first, then data rows
+            table_rows = [{
                 "type": "table_row",
                 "table_row": {
-                    "cells": [[{"type": "text", "text": {"content": cell}}] if cell else [{"type": "text", "text": {"content": ""}}] for cell in header_cells]
+                    "cells": [[{"type": "text", "text": {"content": cell}}] for cell in header_cells]
                 }
-            })
-
-            # Data rows
-            while i < len(lines) and lines[i].strip().startswith("|"):
+            }]
+            while i < n and lines[i].strip().startswith("|"):
                 if is_table_separator(lines[i]):
                     i += 1
                     continue
                 row_cells = parse_table_row(lines[i])
                 # Pad or trim to match table_width
-                while len(row_cells) < table_width:
-                    row_cells.append("")
-                row_cells = row_cells[:table_width]
-
+                row_cells = (row_cells + [""] * table_width)[:table_width]
                 table_rows.append({
                     "type": "table_row",
                     "table_row": {
@@ -285,7 +1159,7 @@ def markdown_to_notion_blocks(markdown: str) -> list:
                 })
                 i += 1
 
-            blocks.append({
+            yield {
                 "object": "block",
                 "type": "table",
                 "table": {
@@ -294,129 +1168,58 @@ def markdown_to_notion_blocks(markdown: str) -> list:
                     "has_row_header": False,
                     "children": table_rows
                 }
-            })
-            continue
-
-        # Heading 1
-        if line.strip().startswith("# ") and not line.strip().startswith("##"):
-            text = line.strip()[2:].strip()
-            blocks.append({
-                "object": "block",
-                "type": "heading_1",
-                "heading_1": {
-                    "rich_text": parse_inline_formatting(text)
-                }
-            })
-            i += 1
-            continue
-
-        # Heading 2
-        if line.strip().startswith("## ") and not line.strip().startswith("###"):
-            text = line.strip()[3:].strip()
-            blocks.append({
-                "object": "block",
-                "type": "heading_2",
-                "heading_2": {
-                    "rich_text": parse_inline_formatting(text)
-                }
-            })
-            i += 1
+            }
             continue
 
-        # Heading 3
-        if line.strip().startswith("### "):
-            text = line.strip()[4:].strip()
-            blocks.append({
-                "object": "block",
-                "type": "heading_3",
-                "heading_3": {
-                    "rich_text": parse_inline_formatting(text)
-                }
-            })
+        if kind == "heading":
+            level = line.lstrip().index(" ")
+            yield _rich_block(f"heading_{level}", m.group("heading").strip())
             i += 1
             continue
 
-        # Blockquote
-        if line.strip().startswith("> "):
-            text = line.strip()[2:].strip()
-            blocks.append({
-                "object": "block",
-                "type": "quote",
-                "quote": {
-                    "rich_text": parse_inline_formatting(text)
-                }
-            })
+        if kind == "quote":
+            yield _rich_block("quote", m.group("quote").strip())
             i += 1
             continue
 
-        # Horizontal rule
-        if line.strip() in ["---", "***", "___"]:
-            blocks.append({
+        if kind == "hr":
+            yield {
                 "object": "block",
                 "type": "divider",
                 "divider": {}
-            })
+            }
             i += 1
             continue
 
-        # Numbered list (1.)
-        numbered_match = re.match(r'^\s*(\d+)\.\s+(.+)', line)
-        if numbered_match:
-            text = numbered_match.group(2)
-            blocks.append({
-                "object": "block",
-                "type": "numbered_list_item",
-                "numbered_list_item": {
-                    "rich_text": parse_inline_formatting(text)
-                }
-            })
+        # Paragraph: this line plus following lines until a block boundary
+        para_lines = [line]
+        i += 1
+        while i < n and not _ends_paragraph(lines[i]):
+            para_lines.append(lines[i])
             i += 1
-            continue
+        yield _rich_block("paragraph", "\n".join(para_lines).strip())
 
-        # Bullet list (-)
-        bullet_match = re.match(r'^\s*[-*+]\s+(.+)', line)
-        if bullet_match:
-            text = bullet_match.group(1)
-            blocks.append({
-                "object": "block",
-                "type": "bulleted_list_item",
-                "bulleted_list_item": {
-                    "rich_text": parse_inline_formatting(text)
-                }
-            })
-            i += 1
-            continue
+    if list_root is not None:
+        yield list_root
 
-        # Paragraph (collect consecutive non-empty lines)
-        para_lines = []
-        while i < len(lines) and lines[i].strip() and not lines[i].strip().startswith(("# ", "## ", "### ", "```", "> ", "---", "***", "___")):
-            # Stop at table rows
-            if lines[i].strip().startswith("|"):
-                break
-            if lines[i].strip().startswith(("- ", "* ", "+ ")) and not lines[i].startswith("    "):
-                break
-            if re.match(r'^\s*\d+\.\s+', lines[i]):
-                break
-            para_lines.append(lines[i])
-            i += 1
-        if para_lines:
-            para_text = "\n".join(para_lines).strip()
-            blocks.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": parse_inline_formatting(para_text)
-                }
-            })
-        else:
-            i += 1
 
-    return blocks
+def markdown_to_notion_blocks(markdown: str) -> list:
+    """Convert markdown text to Notion block structure.
+
+    See iter_notion_blocks for supported syntax.
+
+    Args:
+        markdown: The markdown string
+
+    Returns:
+        list: Notion block objects
+    """
+    return list(iter_notion_blocks(markdown))
 
 
 def verify():
     """Verify token validity."""
-    resp = requests.get(f"{BASE_URL}/v1/users/me", headers=HEADERS)
+    resp = get_client().get(f"/v1/users/me")
     if resp.status_code == 200:
         data = resp.json()
         print(f"Token valid. User: {data.get('name', 'Unknown')}")
@@ -428,11 +1231,30 @@ def verify():
         return False
 
 
-def search(query: str):
-    """Search pages and databases."""
-    resp = requests.post(
-        f"{BASE_URL}/v1/search",
-        headers=HEADERS,
+def _object_title(item: dict) -> str:
+    """Plain-text title of a page (its title-type property) or database."""
+    if item.get("object") == "database":
+        return "".join(t.get("plain_text", "") for t in item.get("title", []))
+    for prop in item.get("properties", {}).values():
+        if isinstance(prop, dict) and prop.get("type") == "title":
+            return "".join(t.get("plain_text", "") for t in prop.get("title", []))
+    return ""
+
+
+def search(query: str, local: bool = False, limit: int = 20, output_format: str = "human"):
+    """Search pages and databases.
+
+    Args:
+        query: Search text
+        local: Answer from the local index (see index_workspace) instead of the API
+        limit: Max results for local search
+        output_format: 'human' or 'json'
+    """
+    if local:
+        return search_local(query, limit, output_format)
+
+    resp = get_client().post(
+        "/v1/search",
         json={"query": query},
     )
     if resp.status_code != 200:
@@ -441,35 +1263,183 @@ def search(query: str):
         return
 
     results = resp.json().get("results", [])
+    if output_format == "json":
+        print(json.dumps([{"id": item.get("id"), "object": item.get("object"), "title": _object_title(item),
+                           "url": item.get("url"), "last_edited_time": item.get("last_edited_time")}
+                          for item in results], ensure_ascii=False, indent=2))
+        return
     print(f"Found {len(results)} results:")
     for item in results:
         obj_type = item.get("object", "unknown")
         item_id = item.get("id", "")
+        title = _object_title(item)
+        print(f"  [{obj_type}] {item_id}: {title or '(no title)'}")
 
-        # Extract title
-        title = ""
-        if obj_type == "page":
-            props = item.get("properties", {})
-            # Try common title property names
-            for prop_name in ["title", "Title", "Name", "name", "Doc name"]:
-                title_prop = props.get(prop_name, {})
-                if isinstance(title_prop, dict) and title_prop.get("type") == "title":
-                    title_list = title_prop.get("title", [])
-                    if title_list:
-                        title = title_list[0].get("plain_text", "")
-                        break
-        elif obj_type == "database":
-            title_list = item.get("title", [])
-            if title_list:
-                title = title_list[0].get("plain_text", "")
 
-        print(f"  [{obj_type}] {item_id}: {title or '(no title)'}")
+def search_local(query: str, limit: int = 20, output_format: str = "human"):
+    """Search the local full-text index; no API request is made.
+
+    Args:
+        query: Free-text query; every term must match
+        limit: Max results
+        output_format: 'human' or 'json'
+    """
+    index = get_search_index()
+    if index.count() == 0:
+        print("Local index is empty. Run: notion_api.py index")
+        return
+    results = index.search(query, limit)
+    if output_format == "json":
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"Found {len(results)} results (local index):")
+    for item in results:
+        print(f"  [{item['object']}] {item['id']}: {item['title'] or '(no title)'}")
+        if item["snippet"]:
+            print(f"      {' '.join(item['snippet'].split())}")
+    crawled = index.get_meta("crawled_at")
+    if crawled:
+        age = time.time() - float(crawled)
+        print(f"(index updated {age / 60:.0f} min ago; run `index` to refresh)")
+
+
+def _tree_plain_text(blocks: list) -> list:
+    """Plain text of every block in a fetched tree, depth first, one string per block."""
+    out = []
+    for block in blocks:
+        payload = block.get(block.get("type", ""), {}) or {}
+        if "rich_text" in payload:
+            out.append("".join(rt.get("plain_text", "") for rt in payload["rich_text"]))
+        elif "cells" in payload:
+            out.append(" | ".join("".join(rt.get("plain_text", "") for rt in cell) for cell in payload["cells"]))
+        elif "title" in payload and isinstance(payload["title"], str):
+            out.append(payload["title"])
+        if block.get("children"):
+            out.extend(_tree_plain_text(block["children"]))
+    return [t for t in out if t]
+
+
+def index_workspace(full: bool = False, workers: int = 4):
+    """Crawl pages and databases shared with the integration into the local index.
+
+    /v1/search is walked newest-edited first. An incremental crawl stops at
+    the first result older than the previous crawl's watermark, and skips
+    pages whose indexed last_edited_time is unchanged. Changed pages have
+    their block trees fetched concurrently (through the block cache, so
+    unchanged subtrees are not refetched). A full crawl visits everything
+    and drops pages that are no longer returned (deleted or unshared).
 
+    Args:
+        full: Ignore the watermark and prune missing pages
+        workers: Pages fetched concurrently
+    """
+    index = get_search_index()
+    watermark = None if full else index.get_meta("watermark")
+    payload = {"sort": {"direction": "descending", "timestamp": "last_edited_time"}, "page_size": 100}
+    seen = set()
+    changed = []
+    newest = watermark
+    stats = {"indexed": 0, "unchanged": 0, "failed": 0}
 
-def read_page(page_id: str):
-    """Read page content."""
+    while True:
+        resp = get_client().post("/v1/search", json=payload)
+        if resp.status_code != 200:
+            print(f"Error: {resp.status_code}")
+            print(resp.text[:300])
+            return
+        data = resp.json()
+        stop = False
+        for item in data.get("results", []):
+            edited = item.get("last_edited_time") or ""
+            if watermark and edited < watermark:
+                stop = True  # everything after this was covered by the last crawl
+                break
+            newest = max(newest or edited, edited)
+            seen.add(item["id"])
+            if index.is_current(item["id"], edited):
+                stats["unchanged"] += 1
+            else:
+                changed.append(item)
+        if stop or not data.get("has_more"):
+            break
+        payload["start_cursor"] = data.get("next_cursor")
+
+    print(f"Indexing {len(changed)} changed pages/databases ({stats['unchanged']} unchanged)...")
+
+    def fetch_text(item):
+        started = time.time()
+        if item.get("object") == "database":
+            body = " ".join(item.get("properties", {}))
+        else:
+            # Child pages are indexed as their own results, not inlined here.
+            blocks = fetch_block_tree(item["id"], max_workers=2, last_edited_time=item.get("last_edited_time"))
+            body = "\n".join(_tree_plain_text(blocks))
+        return body, started
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch_text, item): item for item in changed}
+        for fut in as_completed(futures):
+            item = futures[fut]
+            try:
+                body, started = fut.result()
+            except (RuntimeError, requests.RequestException) as e:
+                stats["failed"] += 1
+                print(f"  {item['id']}: {e}")
+                continue
+            index.store(item, _object_title(item), body, started)
+            stats["indexed"] += 1
+            if stats["indexed"] % 50 == 0:
+                print(f"  ... {stats['indexed']} indexed")
+
+    pruned = index.prune(seen) if full and not stats["failed"] else 0
+    # Failed pages must be picked up again next time, so the watermark only
+    # advances after a clean crawl.
+    if not stats["failed"] and newest:
+        index.set_meta("watermark", newest)
+    index.set_meta("crawled_at", str(time.time()))
+    print(
+        f"Indexed {stats['indexed']}, unchanged {stats['unchanged']}, failed {stats['failed']}"
+        + (f", pruned {pruned}" if pruned else "")
+        + f"; {index.count()} entries in {index.path}"
+    )
+
+
+def _block_text(block: dict) -> str:
+    """Render one block as a single '[type] text' line."""
+    block_type = block.get("type", "unknown")
+    content = block.get(block_type, {})
+
+    # Extract text from rich_text
+    if "rich_text" in content:
+        text_parts = [rt.get("plain_text", "") for rt in content.get("rich_text", [])]
+        return f"[{block_type}] {''.join(text_parts)}"
+    elif "text" in content:
+        text_parts = [rt.get("plain_text", "") for rt in content.get("text", [])]
+        return f"[{block_type}] {''.join(text_parts)}"
+    elif "title" in content:
+        return f"[{block_type}] {content.get('title', '')}"
+    else:
+        return f"[{block_type}] (non-text block)"
+
+
+def _print_block_tree(blocks: list, depth: int = 1):
+    """Print blocks and their nested children, indenting two spaces per level."""
+    for block in blocks:
+        print(f"{'  ' * depth}{_block_text(block)}")
+        if block.get("children"):
+            _print_block_tree(block["children"], depth + 1)
+
+
+def read_page(page_id: str, max_depth: int = None, workers: int = None):
+    """Read page content, including nested blocks.
+
+    Args:
+        page_id: The page ID
+        max_depth: Levels of nesting to fetch (1 = top-level blocks only; default: all)
+        workers: Concurrent child fetches (default TREE_WORKERS)
+    """
     # Get page metadata
-    resp = requests.get(f"{BASE_URL}/v1/pages/{page_id}", headers=HEADERS)
+    resp = get_client().get(f"/v1/pages/{page_id}")
     if resp.status_code != 200:
         print(f"Error getting page: {resp.status_code}")
         print(resp.text)
@@ -493,31 +1463,125 @@ def read_page(page_id: str):
     print()
 
     # Get blocks (content)
-    resp = requests.get(f"{BASE_URL}/v1/blocks/{page_id}/children", headers=HEADERS)
-    if resp.status_code != 200:
-        print(f"Error getting blocks: {resp.status_code}")
+    try:
+        blocks = fetch_block_tree(page_id, max_depth=max_depth, max_workers=workers or TREE_WORKERS,
+                                  last_edited_time=page.get("last_edited_time"))
+    except RuntimeError as e:
+        print(f"Error getting blocks: {e}")
         return
 
-    blocks = resp.json().get("results", [])
     print("Content:")
-    for block in blocks:
-        block_type = block.get("type", "unknown")
-        content = block.get(block_type, {})
-
-        # Extract text from rich_text
-        if "rich_text" in content:
-            text_parts = [rt.get("plain_text", "") for rt in content.get("rich_text", [])]
-            text = "".join(text_parts)
-            print(f"  [{block_type}] {text}")
-        elif "text" in content:
-            text_parts = [rt.get("plain_text", "") for rt in content.get("text", [])]
-            text = "".join(text_parts)
-            print(f"  [{block_type}] {text}")
+    _print_block_tree(blocks)
+
+
+def _plain_text(rich_text: list) -> str:
+    """Concatenate the plain_text of a rich_text array."""
+    return "".join(rt.get("plain_text", "") for rt in rich_text or [])
+
+
+def flatten_property_value(prop: dict):
+    """Reduce a Notion page property value to a plain JSON value.
+
+    Text becomes a string, selects their option name(s), relations/people
+    lists of IDs/names, dates "start" or "start/end", formulas and rollups
+    their computed value. Unknown types yield None.
+    """
+    if not isinstance(prop, dict):
+        return None
+    ptype = prop.get("type")
+    value = prop.get(ptype)
+    if ptype in ("title", "rich_text"):
+        return _plain_text(value)
+    if ptype in ("number", "checkbox", "url", "email", "phone_number",
+                 "created_time", "last_edited_time"):
+        return value
+    if ptype in ("select", "status"):
+        return value.get("name") if value else None
+    if ptype == "multi_select":
+        return [opt.get("name") for opt in value or []]
+    if ptype == "date":
+        if not value:
+            return None
+        return f"{value['start']}/{value['end']}" if value.get("end") else value.get("start")
+    if ptype in ("people", "created_by", "last_edited_by"):
+        users = value if isinstance(value, list) else [value]
+        names = [u.get("name") or u.get("id") for u in users if u]
+        return names if ptype == "people" else (names[0] if names else None)
+    if ptype == "relation":
+        return [r.get("id") for r in value or []]
+    if ptype == "files":
+        return [f.get("name") or (f.get(f.get("type"), {}) or {}).get("url") for f in value or []]
+    if ptype == "formula":
+        return value.get(value.get("type")) if value else None
+    if ptype == "rollup":
+        if not value:
+            return None
+        if value.get("type") == "array":
+            return [flatten_property_value(item) for item in value.get("array", [])]
+        return value.get(value.get("type"))
+    if ptype == "unique_id":
+        if not value or value.get("number") is None:
+            return None
+        return f"{value['prefix']}-{value['number']}" if value.get("prefix") else value["number"]
+    return None
+
+
+def flatten_page(page: dict, fields: list = None) -> dict:
+    """Flatten a database row to {"id", "url", <property>: value, ...}.
+
+    Args:
+        page: Page object from a database query
+        fields: Property names to keep (default: all); "id"/"url" are always included
+    """
+    row = {"id": page.get("id"), "url": page.get("url")}
+    props = page.get("properties", {})
+    names = fields if fields else props.keys()
+    for name in names:
+        if name in ("id", "url"):
+            continue
+        row[name] = flatten_property_value(props.get(name))
+    return row
+
+
+def iter_db_query(database_id: str, payload: dict, limit: int = None):
+    """Yield database rows page by page as each response arrives.
+
+    Only one page of results (<= 100 rows) is held at a time. With `limit`,
+    the last request's page_size is shrunk so no extra rows are fetched.
+
+    Raises:
+        RuntimeError: on a non-200 response
+    """
+    payload = dict(payload)
+    page_size = payload.get("page_size", 100)
+    remaining = limit
+    url = f"/v1/databases/{database_id}/query"
+    while remaining is None or remaining > 0:
+        if remaining is not None:
+            payload["page_size"] = min(page_size, remaining)
+        resp = get_client().post(url, json=payload)
+        if resp.status_code != 200:
+            try:
+                detail = json.dumps(resp.json(), indent=2, ensure_ascii=False)
+            except (json.JSONDecodeError, ValueError):
+                detail = resp.text
+            raise RuntimeError(f"{resp.status_code}\n{detail}")
+
+        data = resp.json()
+        results = data.get("results", [])
+        if remaining is not None:
+            results = results[:remaining]
+            remaining -= len(results)
+        yield from results
+
+        if data.get("has_more") and data.get("next_cursor"):
+            payload["start_cursor"] = data["next_cursor"]
         else:
-            print(f"  [{block_type}] (non-text block)")
+            break
 
 
-def query_db(database_id: str, filter_json: str = None, sort_json: str = None, page_size: int = 100):
+def query_db(database_id: str, filter_json: str = None, sort_json: str = None, page_size: int = 100,
+             output_format: str = "human", limit: int = None, fields: list = None):
     """Query database with optional filter, sort, and pagination.
 
     Args:
@@ -525,6 +1589,10 @@ def query_db(database_id: str, filter_json: str = None, sort_json: str = None, p
         filter_json: JSON string of Notion filter object
         sort_json: JSON string of Notion sort array
         page_size: Number of results per page (default 100, max 100)
+        output_format: 'human' for id + title list, 'ndjson' to stream one
+            flattened JSON row per line as each page of results arrives
+        limit: Stop after this many rows
+        fields: Property names to include in ndjson rows (default: all)
     """
     payload = {"page_size": min(page_size, 100)}
 
@@ -542,46 +1610,41 @@ def query_db(database_id: str, filter_json: str = None, sort_json: str = None, p
             print(f"Error parsing sort JSON: {e}")
             return
 
-    all_results = []
-    url = f"{BASE_URL}/v1/databases/{database_id}/query"
+    rows = iter_db_query(database_id, payload, limit)
 
-    while True:
+    if output_format == "ndjson":
         try:
-            resp = requests.post(url, headers=HEADERS, json=payload)
+            for item in rows:
+                sys.stdout.write(json.dumps(flatten_page(item, fields), ensure_ascii=False) + "\n")
+                sys.stdout.flush()
         except requests.RequestException as e:
-            print(f"Request error: {e}")
-            return
-        if resp.status_code != 200:
-            print(f"Error: {resp.status_code}")
-            try:
-                print(json.dumps(resp.json(), indent=2, ensure_ascii=False))
-            except (json.JSONDecodeError, ValueError):
-                print(resp.text)
-            return
-
-        data = resp.json()
-        results = data.get("results", [])
-        all_results.extend(results)
+            print(f"Request error: {e}", file=sys.stderr)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+        return
 
-        if data.get("has_more") and data.get("next_cursor"):
-            payload["start_cursor"] = data["next_cursor"]
-        else:
-            break
+    all_results = []
+    try:
+        for item in rows:
+            # Keep only id + title so memory does not grow with property payloads
+            title = ""
+            for prop_val in item.get("properties", {}).values():
+                if prop_val.get("type") == "title":
+                    title_list = prop_val.get("title", [])
+                    if title_list:
+                        title = title_list[0].get("plain_text", "")
+                    break
+            all_results.append((item.get("id", ""), title))
+    except requests.RequestException as e:
+        print(f"Request error: {e}")
+        return
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
 
     print(f"Found {len(all_results)} items:")
 
-    for item in all_results:
-        item_id = item.get("id", "")
-        props = item.get("properties", {})
-
-        title = ""
-        for prop_name, prop_val in props.items():
-            if prop_val.get("type") == "title":
-                title_list = prop_val.get("title", [])
-                if title_list:
-                    title = title_list[0].get("plain_text", "")
-                break
-
+    for item_id, title in all_results:
         print(f"  {item_id}: {title or '(no title)'}")
 
 
@@ -592,14 +1655,14 @@ def get_db_schema(database_id: str, output_format: str = "human"):
         database_id: The database ID
         output_format: 'human' for readable output, 'json' for raw JSON
     """
-    resp = requests.get(f"{BASE_URL}/v1/databases/{database_id}", headers=HEADERS)
-    if resp.status_code != 200:
-        print(f"Error: {resp.status_code}")
-        print(resp.text)
+    # Always fetch: this command is how users see the current schema. The
+    # result also refreshes the schema cache for subsequent writes.
+    try:
+        data, _ = fetch_database_schema(database_id, refresh=True)
+    except RuntimeError as e:
+        print(f"Error: {e}")
         return None
 
-    data = resp.json()
-
     if output_format == "json":
         print(json.dumps(data, indent=2, ensure_ascii=False))
         return data
@@ -652,7 +1715,7 @@ def create_page(parent_id: str, title: str, content: str = ""):
     if children:
         payload["children"] = children
 
-    resp = requests.post(f"{BASE_URL}/v1/pages", headers=HEADERS, json=payload)
+    resp = get_client().post(f"/v1/pages", json=payload)
     if resp.status_code == 200:
         page = resp.json()
         print(f"Page created successfully!")
@@ -761,7 +1824,7 @@ def create_database(parent_page_id: str, title: str, schema_json: str):
         "properties": schema,
     }
 
-    resp = requests.post(f"{BASE_URL}/v1/databases", headers=HEADERS, json=payload)
+    resp = get_client().post(f"/v1/databases", json=payload)
 
     if resp.status_code == 200:
         db = resp.json()
@@ -777,24 +1840,22 @@ def create_database(parent_page_id: str, title: str, schema_json: str):
             print(resp.text)
 
 
-def create_db_item(database_id: str, title: str, properties_json: str = None, content: str = None):
-    """Create a new item in a database.
+AUTO_POPULATED_TYPES = ["created_by", "created_time", "last_edited_by", "last_edited_time", "formula", "rollup"]
+
+
+def build_item_properties(db_properties: dict, title, extra_props: dict = None):
+    """Build the properties payload for a new database item.
 
     Args:
-        database_id: The database ID
+        db_properties: The database schema's "properties" object
         title: The title/name of the item
-        properties_json: JSON string of additional properties, e.g. '{"Category": "Proposal", "Done": true}'
-        content: Optional page content (text)
-    """
-    # First, get the database schema to know property types
-    resp = requests.get(f"{BASE_URL}/v1/databases/{database_id}", headers=HEADERS)
-    if resp.status_code != 200:
-        print(f"Error getting database schema: {resp.status_code}")
-        print(resp.text)
-        return
+        extra_props: {property name: value} for additional properties
 
-    db_schema = resp.json()
-    db_properties = db_schema.get("properties", {})
+    Returns:
+        tuple: (properties dict, list of warning strings); properties is None
+            if the schema has no title property
+    """
+    warnings = []
 
     # Find the title property name
     title_prop_name = None
@@ -804,15 +1865,45 @@ def create_db_item(database_id: str, title: str, properties_json: str = None, co
             break
 
     if not title_prop_name:
-        print("Error: Could not find title property in database schema")
-        return
+        return None, ["Could not find title property in database schema"]
 
-    # Build properties
     properties = {
         title_prop_name: build_property_value("title", title)
     }
 
-    # Parse and add additional properties
+    for prop_name, prop_value in (extra_props or {}).items():
+        if prop_name not in db_properties:
+            warnings.append(f"Property '{prop_name}' not found in database schema, skipping")
+            continue
+
+        prop_info = db_properties[prop_name]
+        prop_type = prop_info.get("type")
+
+        # Skip auto-populated properties
+        if prop_type in AUTO_POPULATED_TYPES:
+            warnings.append(f"Property '{prop_name}' is auto-populated, skipping")
+            continue
+
+        built_value = build_property_value(prop_type, prop_value, prop_info)
+        if built_value:
+            properties[prop_name] = built_value
+        else:
+            warnings.append(f"Unsupported property type '{prop_type}' for '{prop_name}', skipping")
+
+    return properties, warnings
+
+
+def create_db_item(database_id: str, title: str, properties_json: str = None, content: str = None):
+    """Create a new item in a database.
+
+    Args:
+        database_id: The database ID
+        title: The title/name of the item
+        properties_json: JSON string of additional properties, e.g. '{"Category": "Proposal", "Done": true}'
+        content: Optional page content (text)
+    """
+    # Parse additional properties
+    extra_props = None
     if properties_json:
         try:
             extra_props = json.loads(properties_json)
@@ -821,37 +1912,43 @@ def create_db_item(database_id: str, title: str, properties_json: str = None, co
             print("Expected format: '{\"Category\": \"Proposal\", \"Done\": true}'")
             return
 
-        for prop_name, prop_value in extra_props.items():
-            if prop_name not in db_properties:
-                print(f"Warning: Property '{prop_name}' not found in database schema, skipping")
-                continue
-
-            prop_info = db_properties[prop_name]
-            prop_type = prop_info.get("type")
-
-            # Skip auto-populated properties
-            if prop_type in ["created_by", "created_time", "last_edited_by", "last_edited_time", "formula", "rollup"]:
-                print(f"Warning: Property '{prop_name}' is auto-populated, skipping")
-                continue
-
-            built_value = build_property_value(prop_type, prop_value, prop_info)
-            if built_value:
-                properties[prop_name] = built_value
-            else:
-                print(f"Warning: Unsupported property type '{prop_type}' for '{prop_name}', skipping")
-
     # Build children blocks from markdown
     children = markdown_to_notion_blocks(content) if content else []
 
-    # Create the page
-    payload = {
-        "parent": {"database_id": database_id},
-        "properties": properties,
-    }
-    if children:
-        payload["children"] = children
+    # The schema (property types) usually comes from the schema cache. If
+    # Notion rejects a payload built from a cached schema, the schema may have
+    # changed: refetch it and try once more.
+    refresh = False
+    while True:
+        try:
+            db_schema, from_cache = fetch_database_schema(database_id, refresh=refresh)
+        except RuntimeError as e:
+            print(f"Error getting database schema: {e}")
+            return
+        db_properties = db_schema.get("properties", {})
+
+        properties, warnings = build_item_properties(db_properties, title, extra_props)
+        if properties is None:
+            print(f"Error: {warnings[0]}")
+            return
+
+        # Create the page
+        payload = {
+            "parent": {"database_id": database_id},
+            "properties": properties,
+        }
+        if children:
+            payload["children"] = children
+
+        resp = get_client().post(f"/v1/pages", json=payload)
+        if resp.status_code == 400 and from_cache:
+            invalidate_database_schema(database_id)
+            refresh = True
+            continue
+        break
 
-    resp = requests.post(f"{BASE_URL}/v1/pages", headers=HEADERS, json=payload)
+    for warning in warnings:
+        print(f"Warning: {warning}")
     if resp.status_code == 200:
         page = resp.json()
         print(f"Database item created successfully!")
@@ -869,6 +1966,158 @@ def create_db_item(database_id: str, title: str, properties_json: str = None, co
             print("\nHint: Check property names and values. Use 'get-db-schema' to see available properties.")
 
 
+def _iter_import_rows(path: str):
+    """Yield (row number, dict) from a CSV or NDJSON file, streaming."""
+    if path.endswith((".ndjson", ".jsonl")):
+        with open(path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f):
+                if line.strip():
+                    yield n, json.loads(line)
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for n, row in enumerate(csv.DictReader(f)):
+                yield n, row
+
+
+def _load_checkpoint(path: str) -> set:
+    """Row numbers already imported, from a checkpoint file of JSON lines."""
+    done = set()
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["row"])
+                except (json.JSONDecodeError, KeyError):
+                    continue  # torn last line from an interrupted run
+    return done
+
+
+def bulk_import(database_id: str, path: str, title_column: str = None, content_column: str = None,
+                workers: int = 4, checkpoint: str = None):
+    """Create one database item per row of a CSV or NDJSON file.
+
+    The schema is fetched once; every row is mapped through
+    build_item_properties/build_property_value and created concurrently on
+    the shared rate-limited client. Each created row is appended to a
+    checkpoint file, so rerunning the same command after an interruption
+    skips rows already imported. Failed rows are not checkpointed and are
+    retried on the next run.
+
+    Args:
+        database_id: The database ID
+        path: .csv (header row = property names) or .ndjson/.jsonl file
+        title_column: Column holding the item title (default: the schema's title property name)
+        content_column: Optional column holding markdown page content
+        workers: Concurrent create requests
+        checkpoint: Checkpoint file (default: <path>.checkpoint)
+    """
+    try:
+        db_schema, from_cache = fetch_database_schema(database_id)
+    except RuntimeError as e:
+        print(f"Error getting database schema: {e}")
+        return
+    db_properties = db_schema.get("properties", {})
+
+    if not title_column:
+        title_column = next((name for name, info in db_properties.items() if info.get("type") == "title"), None)
+        if not title_column:
+            print("Error: Could not find title property in database schema")
+            return
+
+    checkpoint = checkpoint or f"{path}.checkpoint"
+    done = _load_checkpoint(checkpoint)
+    if done:
+        print(f"Resuming: {len(done)} rows already imported (checkpoint {checkpoint})")
+
+    def create(row: dict):
+        title = row.get(title_column, "")
+        content = row.get(content_column) if content_column else None
+        extra = {k: v for k, v in row.items()
+                 if k not in (title_column, content_column) and v not in ("", None)}
+        try:
+            properties, warnings = build_item_properties(db_properties, title, extra)
+            children = markdown_to_notion_blocks(content) if content else []
+        except (ValueError, TypeError, AttributeError) as e:
+            # A bad cell (e.g. "n/a" in a number column) fails only its own row
+            return None, f"invalid value: {e}", []
+        if properties is None:
+            return None, warnings[0], warnings
+        payload = {"parent": {"database_id": database_id}, "properties": properties}
+        if children:
+            payload["children"] = children[:100]
+        r = get_client().post("/v1/pages", json=payload)
+        if r.status_code != 200:
+            return None, f"{r.status_code} {r.text[:200]}", warnings
+        page_id = r.json().get("id")
+        # Page creation accepts at most 100 children; append the rest
+        for i in range(100, len(children), 100):
+            r = get_client().patch(f"/v1/blocks/{page_id}/children", json={"children": children[i:i + 100]})
+            if r.status_code != 200:
+                warnings = warnings + [f"page {page_id} created but content truncated: {r.status_code}"]
+                break
+        return page_id, None, warnings
+
+    stats = {"created": 0, "failed": 0, "skipped": len(done)}
+    seen_warnings = set()
+    max_in_flight = max(1, workers) * 4
+
+    with open(checkpoint, "a", encoding="utf-8") as ckpt, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {}
+
+        def drain(return_when):
+            finished, _ = wait(pending, return_when=return_when)
+            for fut in finished:
+                n = pending.pop(fut)
+                try:
+                    page_id, error, warnings = fut.result()
+                except Exception as e:
+                    page_id, error, warnings = None, str(e), []
+                for warning in warnings:
+                    if warning not in seen_warnings:
+                        seen_warnings.add(warning)
+                        print(f"Warning: {warning}")
+                if page_id:
+                    ckpt.write(json.dumps({"row": n, "id": page_id}) + "\n")
+                    ckpt.flush()
+                    stats["created"] += 1
+                else:
+                    stats["failed"] += 1
+                    print(f"  Row {n} failed: {error}")
+            total = stats["created"] + stats["failed"]
+            if finished and total % 100 < len(finished):
+                print(f"  ... {stats['created']} created, {stats['failed']} failed")
+
+        try:
+            # Bounded submission keeps memory flat regardless of file size
+            for n, row in _iter_import_rows(path):
+                if n in done:
+                    continue
+                pending[pool.submit(create, row)] = n
+                if len(pending) >= max_in_flight:
+                    drain(FIRST_COMPLETED)
+            while pending:
+                drain(FIRST_COMPLETED)
+        except BaseException:
+            # Drop queued rows, but checkpoint the ones already sent so a
+            # rerun does not create them a second time
+            for fut in list(pending):
+                if fut.cancel():
+                    del pending[fut]
+            while pending:
+                drain(ALL_COMPLETED)
+            print(f"Bulk import interrupted: created={stats['created']}, failed={stats['failed']}, "
+                  f"skipped={stats['skipped']}")
+            raise
+
+    print(f"Bulk import: created={stats['created']}, failed={stats['failed']}, skipped={stats['skipped']}")
+    if stats["failed"]:
+        if from_cache:
+            # Failures may stem from a stale cached schema; the rerun refetches it
+            invalidate_database_schema(database_id)
+        print("Rerun the same command to retry failed rows.")
+
+
 def update_page(page_id: str, content: str = "", content_file: str = ""):
     """Update a page by replacing all content.
 
@@ -893,34 +2142,33 @@ def update_page(page_id: str, content: str = "", content_file: str = ""):
     if lines and lines[0].startswith("# "):
         content = "\n".join(lines[1:])
 
-    # Step 1: Get existing blocks
-    resp = requests.get(f"{BASE_URL}/v1/blocks/{page_id}/children?page_size=100", headers=HEADERS)
-    if resp.status_code != 200:
-        print(f"Error getting blocks: {resp.status_code}")
-        print(resp.text)
+    # Step 1: Get existing blocks (all of them, not just the first 100)
+    try:
+        old_blocks = _fetch_all_children(page_id)
+    except RuntimeError as e:
+        print(f"Error getting blocks: {e}")
         return
-
-    old_blocks = resp.json().get("results", [])
     print(f"Deleting {len(old_blocks)} existing blocks...")
 
     # Step 2: Delete all existing blocks
+    _invalidate_cached(page_id)
     for block in old_blocks:
         bid = block["id"]
-        r = requests.delete(f"{BASE_URL}/v1/blocks/{bid}", headers=HEADERS)
+        r = get_client().delete(f"/v1/blocks/{bid}")
         if r.status_code != 200:
             print(f"  Warning: failed to delete block {bid}: {r.status_code}")
 
     # Step 3: Convert markdown to blocks
-    new_blocks = markdown_to_notion_blocks(content)
+    with get_client().phase("convert"):
+        new_blocks = markdown_to_notion_blocks(content)
     print(f"Appending {len(new_blocks)} new blocks...")
 
     # Step 4: Append in batches of 100
     total = 0
     for i in range(0, len(new_blocks), 100):
         batch = new_blocks[i:i + 100]
-        resp = requests.patch(
-            f"{BASE_URL}/v1/blocks/{page_id}/children",
-            headers=HEADERS,
+        resp = get_client().patch(
+            f"/v1/blocks/{page_id}/children",
             json={"children": batch}
         )
         if resp.status_code != 200:
@@ -930,7 +2178,7 @@ def update_page(page_id: str, content: str = "", content_file: str = ""):
         total += len(batch)
 
     # Step 5: Report
-    resp = requests.get(f"{BASE_URL}/v1/pages/{page_id}", headers=HEADERS)
+    resp = get_client().get(f"/v1/pages/{page_id}")
     if resp.status_code == 200:
         page = resp.json()
         print(f"Page updated successfully!")
@@ -943,6 +2191,10 @@ def update_page(page_id: str, content: str = "", content_file: str = ""):
         print(f"Updated {total} blocks (could not fetch page info)")
 
 
+def _is_list_item(block: dict) -> bool:
+    return block.get("type") in LIST_ITEM_TYPES
+
+
 def _block_fingerprint_existing(block: dict) -> str:
     """Stable hash for a block returned by Notion API (has plain_text in rich_text)."""
     btype = block.get("type", "")
@@ -951,6 +2203,10 @@ def _block_fingerprint_existing(block: dict) -> str:
         text = "".join(rt.get("plain_text", "") for rt in payload.get("rich_text", []))
         if btype == "code":
             return f"code|{payload.get('language', '')}|{text}"
+        if btype in LIST_ITEM_TYPES and block.get("has_children"):
+            # Nested items live under the fetched "children" key (see fetch_block_tree)
+            nested = "\n".join(_block_fingerprint_existing(c) for c in block.get("children", []))
+            return f"{btype}|{text}|[{nested}]"
         return f"{btype}|{text}"
     if btype == "divider":
         return "divider"
@@ -971,6 +2227,9 @@ def _block_fingerprint_new(block: dict) -> str:
         text = "".join((rt.get("text", {}) or {}).get("content", "") for rt in payload.get("rich_text", []))
         if btype == "code":
             return f"code|{payload.get('language', '')}|{text}"
+        if btype in LIST_ITEM_TYPES and payload.get("children"):
+            nested = "\n".join(_block_fingerprint_new(c) for c in payload["children"])
+            return f"{btype}|{text}|[{nested}]"
         return f"{btype}|{text}"
     if btype == "divider":
         return "divider"
@@ -979,16 +2238,156 @@ def _block_fingerprint_new(block: dict) -> str:
     return f"{btype}|{json.dumps({k: v for k, v in payload.items() if k != 'children'}, sort_keys=True, ensure_ascii=False)}"
 
 
+def _digest(fingerprint: str) -> int:
+    """64-bit digest of a block fingerprint, so the diff compares ints, not strings."""
+    return int.from_bytes(hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# Beyond this many edits the middle of a diff is emitted as one replace; by
+# then almost nothing matches and Myers' O(D^2) trace would cost more than the
+# few blocks it could keep.
+DIFF_MAX_EDITS = 1000
+
+
+def _myers_matches(a: list, b: list, max_d: int):
+    """Matching runs of a shortest edit script between a and b (Myers' O(ND) diff).
+
+    Returns:
+        list: (i, j, length) runs in order, or None if more than max_d edits are needed
+    """
+    n, m = len(a), len(b)
+    offset = n + m + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    for d in range(min(n + m, max_d) + 1):
+        # Only diagonals -d..d are read when backtracking through round d
+        trace.append(v[offset - d:offset + d + 1])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _myers_backtrack(trace, n, m)
+    return None
+
+
+def _myers_backtrack(trace: list, x: int, y: int) -> list:
+    """Walk the saved V arrays back from (x, y) and collect the snakes as runs."""
+    runs = []
+    for d in range(len(trace) - 1, 0, -1):
+        v = trace[d]  # diagonals -d..d after round d-1, indexed k + d
+        k = x - y
+        if k == -d or (k != d and v[k - 1 + d] < v[k + 1 + d]):
+            prev_k = k + 1
+            mid_x = v[prev_k + d]          # step down: insertion from b
+        else:
+            prev_k = k - 1
+            mid_x = v[prev_k + d] + 1      # step right: deletion from a
+        if x > mid_x:
+            runs.append((mid_x, mid_x - k, x - mid_x))
+        x = v[prev_k + d]
+        y = x - prev_k
+    if x > 0:
+        runs.append((0, 0, x))
+    runs.reverse()
+    return runs
+
+
+def _matching_runs(a: list, b: list, max_d: int):
+    """Myers' diff over only the elements the two sides have in common.
+
+    Blocks that exist on one side only (new paragraphs, deleted sections) can
+    never match, so they are dropped before diffing and the matches mapped
+    back to original positions. This keeps D small for typical edits.
+    """
+    in_b, in_a = set(b), set(a)
+    ai = [i for i, x in enumerate(a) if x in in_b]
+    bj = [j for j, x in enumerate(b) if x in in_a]
+    if not ai or not bj:
+        return []
+    runs = _myers_matches([a[i] for i in ai], [b[j] for j in bj], max_d)
+    if runs is None:
+        return None
+    out = []
+    for ri, rj, length in runs:
+        for t in range(length):
+            i, j = ai[ri + t], bj[rj + t]
+            if out and out[-1][0] + out[-1][2] == i and out[-1][1] + out[-1][2] == j:
+                out[-1][2] += 1
+            else:
+                out.append([i, j, 1])
+    return [tuple(r) for r in out]
+
+
+def diff_opcodes(a: list, b: list, max_edits: int = DIFF_MAX_EDITS) -> list:
+    """Diff two digest sequences into SequenceMatcher-style opcodes.
+
+    Common prefix and suffix are trimmed first, so append-only and local edits
+    cost O(N) regardless of page length; only the changed middle goes through
+    Myers' diff.
+
+    Returns:
+        list: (tag, i1, i2, j1, j2) tuples with tag in equal/replace/delete/insert
+    """
+    n, m = len(a), len(b)
+    pre = 0
+    while pre < n and pre < m and a[pre] == b[pre]:
+        pre += 1
+    suf = 0
+    while suf < n - pre and suf < m - pre and a[n - 1 - suf] == b[m - 1 - suf]:
+        suf += 1
+
+    opcodes = []
+    if pre:
+        opcodes.append(("equal", 0, pre, 0, pre))
+
+    a_mid, b_mid = a[pre:n - suf], b[pre:m - suf]
+    if a_mid or b_mid:
+        if not a_mid or not b_mid:
+            runs = []
+        else:
+            runs = _matching_runs(a_mid, b_mid, max_edits) or []
+        i = j = 0
+        for ri, rj, length in runs + [(len(a_mid), len(b_mid), 0)]:
+            if i < ri and j < rj:
+                opcodes.append(("replace", pre + i, pre + ri, pre + j, pre + rj))
+            elif i < ri:
+                opcodes.append(("delete", pre + i, pre + ri, pre + j, pre + j))
+            elif j < rj:
+                opcodes.append(("insert", pre + i, pre + i, pre + j, pre + rj))
+            if length:
+                opcodes.append(("equal", pre + ri, pre + ri + length, pre + rj, pre + rj + length))
+            i, j = ri + length, rj + length
+
+    if suf:
+        opcodes.append(("equal", n - suf, n, m - suf, m))
+    return opcodes
+
+
 def _clone_block_for_recreate(block: dict):
     """Convert a block fetched from Notion's GET API into a creatable block payload.
 
     Returns None for block types whose nested children cannot be safely
     recreated without recursive fetch (table, column_list, synced_block, etc.).
+    List items are cloned together with their fetched nested items.
     """
     btype = block.get("type", "")
     if btype in ("table", "column_list", "column", "synced_block",
                  "child_database", "child_page", "unsupported", ""):
         return None
+    children = []
+    if block.get("has_children"):
+        if btype not in LIST_ITEM_TYPES or "children" not in block:
+            return None
+        children = [_clone_block_for_recreate(c) for c in block["children"]]
+        if any(c is None for c in children):
+            return None
     payload_in = block.get(btype, {}) or {}
     payload_out = {}
     for k, v in payload_in.items():
@@ -1017,36 +2416,135 @@ def _clone_block_for_recreate(block: dict):
             payload_out[k] = cleaned
         elif k in ("color", "language", "checked", "is_toggleable", "icon", "url"):
             payload_out[k] = v
+    if children:
+        payload_out["children"] = children
     return {"object": "block", "type": btype, btype: payload_out}
 
 
 def _fetch_all_children(page_id: str) -> list:
     """Fetch all child blocks of a page, paginated."""
     blocks = []
-    cursor = None
+    params = {"page_size": 100}
     while True:
-        url = f"{BASE_URL}/v1/blocks/{page_id}/children?page_size=100"
-        if cursor:
-            url += f"&start_cursor={cursor}"
-        resp = requests.get(url, headers=HEADERS)
+        resp = get_client().get(f"/v1/blocks/{page_id}/children", params=params)
         if resp.status_code != 200:
             raise RuntimeError(f"fetch children failed: {resp.status_code} {resp.text[:200]}")
         data = resp.json()
         blocks.extend(data.get("results", []))
         if not data.get("has_more"):
             break
-        cursor = data.get("next_cursor")
+        params["start_cursor"] = data.get("next_cursor")
     return blocks
 
 
-def update_page_incremental(page_id: str, content: str = "", content_file: str = ""):
+def _has_fetchable_children(block: dict) -> bool:
+    """Nested content that belongs to this block (not a separate page/database)."""
+    return bool(block.get("has_children")) and block.get("type") not in ("child_page", "child_database")
+
+
+def _fetch_children_timed(block_id: str):
+    """_fetch_all_children plus the epoch time the fetch started (for the cache)."""
+    started = time.time()
+    return _fetch_all_children(block_id), started
+
+
+def fetch_block_tree(block_id: str, max_depth: int = None, max_workers: int = TREE_WORKERS,
+                     last_edited_time: str = None, descend=None) -> list:
+    """Fetch a block's full descendant tree with a bounded worker pool.
+
+    Children of every `has_children` block (toggles, columns, synced blocks,
+    nested lists, table rows) are fetched in parallel as soon as their parent
+    is known, all through the shared client's rate limiter. Each such block
+    gets its children attached under a top-level "children" key. Child pages
+    and databases are not descended into.
+
+    With the block cache enabled, a parent whose last_edited_time matches its
+    cached entry is served from disk and only changed subtrees are refetched.
+
+    Args:
+        block_id: Page or block ID whose children to fetch
+        max_depth: Levels to fetch (1 = direct children only; None = unlimited)
+        max_workers: Max concurrent child requests
+        last_edited_time: The root's current last_edited_time; required for the
+            root's own children to be served from cache
+        descend: Optional predicate; only blocks it accepts are descended into
+
+    Returns:
+        list: Top-level blocks, with nested "children" filled in
+
+    Raises:
+        RuntimeError: if any children request fails
+    """
+    cache = get_cache()
+    use_cached = cache is not None and _cache_mode == "use"
+
+    root = cache.lookup(block_id, last_edited_time) if use_cached else None
+    if root is None:
+        root, started = _fetch_children_timed(block_id)
+        if cache is not None and last_edited_time:
+            cache.store(block_id, last_edited_time, root, started)
+    if max_depth is not None and max_depth <= 1:
+        return root
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        pending = {}
+
+        def schedule(blocks, depth):
+            if max_depth is not None and depth >= max_depth:
+                return
+            for block in blocks:
+                if not _has_fetchable_children(block) or (descend and not descend(block)):
+                    continue
+                cached = cache.lookup(block["id"], block.get("last_edited_time")) if use_cached else None
+                if cached is not None:
+                    block["children"] = cached
+                    schedule(cached, depth + 1)
+                else:
+                    pending[pool.submit(_fetch_children_timed, block["id"])] = (block, depth)
+
+        schedule(root, 1)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                block, depth = pending.pop(fut)
+                children, started = fut.result()
+                block["children"] = children
+                if cache is not None:
+                    cache.store(block["id"], block.get("last_edited_time"), children, started)
+                schedule(children, depth + 1)
+    return root
+
+
+def _current_edited_time(block_id: str):
+    """last_edited_time of a page or block, or None when the cache is not in use.
+
+    Costs one request, so it is skipped unless a cache lookup can use it.
+    """
+    if get_cache() is None or _cache_mode != "use":
+        return None
+    resp = get_client().get(f"/v1/blocks/{block_id}")
+    if resp.status_code != 200:
+        return None
+    return resp.json().get("last_edited_time")
+
+
+def _invalidate_cached(block_id: str):
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(block_id)
+
+
+def update_page_incremental(page_id: str, content: str = "", content_file: str = "", workers: int = TREE_WORKERS,
+                            quiet: bool = False):
     """Update a page using a minimal diff (preserves unchanged blocks).
 
     Differs from update_page (which deletes all blocks then re-appends):
-    - Computes a SequenceMatcher diff between old and new block fingerprints
+    - Diffs 64-bit digests of old and new block fingerprints (prefix/suffix
+      trimming, then Myers' diff on the changed middle; see diff_opcodes)
     - For 'equal' opcodes: no API call (block kept in place)
     - For 'insert' / 'replace': inserts new blocks after the appropriate anchor
-    - For 'delete' / 'replace': marks old blocks for deletion (executed last)
+    - For 'delete' / 'replace': marks old blocks for deletion (executed last,
+      in parallel on the rate-limited client)
 
     Public URL and page ID are always preserved (same as update_page).
     Side benefits: fewer API calls, no churn on comments anchored to unchanged blocks.
@@ -1058,9 +2556,12 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
         page_id: The page ID to update
         content: Markdown content string
         content_file: Path to a markdown file (used if content is empty)
-    """
-    from difflib import SequenceMatcher
+        workers: Concurrent delete requests
+        quiet: Skip the summary and the page URL lookup (errors are still printed)
 
+    Returns:
+        dict: {"kept", "inserted", "deleted"} counts, or None if the update failed
+    """
     if not content and content_file:
         with open(content_file, "r") as f:
             content = f.read()
@@ -1073,20 +2574,26 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
         content = "\n".join(lines[1:])
 
     try:
-        old_blocks = _fetch_all_children(page_id)
+        # Nested list items are part of their parent's fingerprint; other nested
+        # content (toggles, tables, columns) is compared by its top-level block only.
+        old_blocks = fetch_block_tree(page_id, max_depth=MAX_LIST_NESTING + 1, max_workers=workers,
+                                      last_edited_time=_current_edited_time(page_id),
+                                      descend=_is_list_item)
     except RuntimeError as e:
         print(f"Error: {e}")
         return
+    # Drop the cached children before any write so a failure midway cannot leave stale IDs.
+    _invalidate_cached(page_id)
 
-    new_blocks = markdown_to_notion_blocks(content)
-    old_fps = [_block_fingerprint_existing(b) for b in old_blocks]
-    new_fps = [_block_fingerprint_new(b) for b in new_blocks]
-
-    matcher = SequenceMatcher(None, old_fps, new_fps, autojunk=False)
-    opcodes = matcher.get_opcodes()
+    with get_client().phase("diff"):
+        new_blocks = markdown_to_notion_blocks(content)
+        old_fps = [_digest(_block_fingerprint_existing(b)) for b in old_blocks]
+        new_fps = [_digest(_block_fingerprint_new(b)) for b in new_blocks]
+        opcodes = diff_opcodes(old_fps, new_fps)
 
     stats = {"kept": 0, "inserted": 0, "deleted": 0}
     to_delete = []  # collected and executed last to avoid invalidating anchors
+    anchors = [b["id"] for b in old_blocks]  # old[0] is swapped for its clone by _insert_at_start
 
     def _insert_after(anchor_id, blocks_to_insert):
         if not blocks_to_insert:
@@ -1097,9 +2604,8 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
             body = {"children": batch}
             if last:
                 body["after"] = last
-            r = requests.patch(
-                f"{BASE_URL}/v1/blocks/{page_id}/children",
-                headers=HEADERS,
+            r = get_client().patch(
+                f"/v1/blocks/{page_id}/children",
                 json=body,
             )
             if r.status_code != 200:
@@ -1131,8 +2637,10 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
         last = _insert_after(first_old["id"], blocks_to_insert)
         if last is None:
             return None
-        if _insert_after(last, [cloned]) is None:
+        clone_id = _insert_after(last, [cloned])
+        if clone_id is None:
             return None
+        anchors[0] = clone_id
         to_delete.append(first_old["id"])
         # The clone itself is one extra insert + one extra delete in net terms;
         # account for them so the report is honest.
@@ -1152,7 +2660,7 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
                 if _insert_at_start(new_blocks[j1:j2]) is None:
                     return
             else:
-                anchor = old_blocks[i1 - 1]["id"] if i1 > 0 else None
+                anchor = anchors[i1 - 1] if i1 > 0 else None
                 if _insert_after(anchor, new_blocks[j1:j2]) is None:
                     return
             stats["inserted"] += j2 - j1
@@ -1161,9 +2669,9 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
             # so we can safely use old[i2-1] as the insert anchor (it will be
             # deleted in the cleanup pass). Net order: [new, old[i2:]].
             if i1 == 0 and old_blocks:
-                anchor = old_blocks[i2 - 1]["id"] if i2 > 0 else None
+                anchor = anchors[i2 - 1] if i2 > 0 else None
             else:
-                anchor = old_blocks[i1 - 1]["id"] if i1 > 0 else None
+                anchor = anchors[i1 - 1] if i1 > 0 else None
             if _insert_after(anchor, new_blocks[j1:j2]) is None:
                 return
             for k in range(i1, i2):
@@ -1171,10 +2679,24 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
             stats["inserted"] += j2 - j1
             stats["deleted"] += i2 - i1
 
-    for bid in to_delete:
-        r = requests.delete(f"{BASE_URL}/v1/blocks/{bid}", headers=HEADERS)
-        if r.status_code != 200:
-            print(f"Warning: delete {bid} failed: {r.status_code}")
+    def _delete(bid):
+        try:
+            return bid, get_client().delete(f"/v1/blocks/{bid}").status_code
+        except requests.RequestException as e:
+            return bid, str(e)
+
+    # Deletes are independent of each other, so run them concurrently; the
+    # shared rate limiter still caps throughput.
+    delete_failures = 0
+    if to_delete:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(to_delete)))) as pool:
+            for bid, status in pool.map(_delete, to_delete):
+                if status != 200:
+                    delete_failures += 1
+                    print(f"Warning: delete {bid} failed: {status}")
+
+    if quiet:
+        return None if delete_failures else stats
 
     print(
         "Incremental update: "
@@ -1182,12 +2704,140 @@ def update_page_incremental(page_id: str, content: str = "", content_file: str =
         f"total now={stats['kept'] + stats['inserted']}"
     )
 
-    resp = requests.get(f"{BASE_URL}/v1/pages/{page_id}", headers=HEADERS)
+    resp = get_client().get(f"/v1/pages/{page_id}")
     if resp.status_code == 200:
         page = resp.json()
         print(f"URL: {page.get('url', 'N/A')}")
         if page.get("public_url"):
             print(f"Public URL: {page['public_url']}")
+    return None if delete_failures else stats
+
+
+SYNC_MANIFEST = ".notion-sync.json"
+
+
+def _load_manifest(path: str) -> dict:
+    """Read a sync manifest: {relative path: page ID or {"page_id", "sha256", "synced_at"}}.
+
+    Plain string entries (hand-written mappings) are normalised to dicts with
+    no hash, so they count as changed on the first sync.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    manifest = {}
+    for rel, entry in raw.items():
+        if isinstance(entry, str):
+            entry = {"page_id": entry}
+        manifest[rel] = entry
+    return manifest
+
+
+def _save_manifest(path: str, manifest: dict):
+    """Write the manifest atomically so an interrupted sync never truncates it."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def sync_dir(directory: str, manifest_path: str = None, workers: int = 4, full: bool = False,
+             dry_run: bool = False):
+    """Update the Notion pages mapped to a directory of markdown files.
+
+    The manifest maps each file (path relative to the directory) to a page ID
+    and records the SHA-256 of the content last synced. Only files whose hash
+    differs are updated, concurrently, each with update_page_incremental on the
+    shared rate-limited client. The manifest is rewritten after every
+    successful page, so an interrupted sync resumes with the pages it missed.
+
+    Args:
+        directory: Directory containing the markdown files
+        manifest_path: Manifest JSON file (default: <directory>/.notion-sync.json)
+        workers: Pages updated concurrently
+        full: Update every mapped page, ignoring stored hashes
+        dry_run: Only list the pages that would be updated
+    """
+    manifest_path = manifest_path or os.path.join(directory, SYNC_MANIFEST)
+    if not os.path.exists(manifest_path):
+        print(f"Error: manifest not found: {manifest_path}")
+        print('Create it as JSON mapping files to page IDs, e.g. {"guide/intro.md": "PAGE_ID"}')
+        return
+    try:
+        manifest = _load_manifest(manifest_path)
+    except (json.JSONDecodeError, AttributeError) as e:
+        print(f"Error: invalid manifest {manifest_path}: {e}")
+        return
+
+    changed = []  # (relative path, raw bytes, sha256)
+    missing = []
+    for rel, entry in sorted(manifest.items()):
+        path = os.path.join(directory, rel)
+        if not os.path.isfile(path):
+            missing.append(rel)
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if full or entry.get("sha256") != digest:
+            changed.append((rel, data, digest))
+
+    mapped = set(manifest)
+    unmapped = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.endswith(".md"):
+                rel = os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+                if rel not in mapped:
+                    unmapped += 1
+
+    print(f"{len(changed)} of {len(manifest)} mapped pages changed")
+    for rel in missing:
+        print(f"Warning: {rel} is in the manifest but does not exist")
+    if unmapped:
+        print(f"Note: {unmapped} markdown files are not in the manifest and were skipped")
+    if dry_run:
+        for rel, _, _ in changed:
+            print(f"  would update {rel} -> {manifest[rel]['page_id']}")
+        return
+    if not changed:
+        return
+
+    stats = {"updated": 0, "failed": 0, "kept": 0, "inserted": 0, "deleted": 0}
+
+    def sync_one(rel, data):
+        content = data.decode("utf-8")
+        if not content.strip():
+            raise RuntimeError("file is empty")
+        # Page-level concurrency already fills the rate limit, so each page
+        # fetches and deletes with a small pool of its own.
+        result = update_page_incremental(manifest[rel]["page_id"], content, workers=2, quiet=True)
+        if result is None:
+            raise RuntimeError("update failed")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(sync_one, rel, data): (rel, digest) for rel, data, digest in changed}
+        for fut in as_completed(futures):
+            rel, digest = futures[fut]
+            try:
+                result = fut.result()
+            except (requests.RequestException, RuntimeError, UnicodeDecodeError) as e:
+                stats["failed"] += 1
+                print(f"  {rel}: {e}")
+                continue
+            stats["updated"] += 1
+            for k in ("kept", "inserted", "deleted"):
+                stats[k] += result[k]
+            print(f"  {rel}: kept={result['kept']}, inserted={result['inserted']}, deleted={result['deleted']}")
+            manifest[rel].update(sha256=digest, synced_at=datetime.now().isoformat(timespec="seconds"))
+            _save_manifest(manifest_path, manifest)
+
+    print(
+        f"Synced {stats['updated']} pages ({stats['failed']} failed): "
+        f"kept={stats['kept']}, inserted={stats['inserted']}, deleted={stats['deleted']} blocks"
+    )
 
 
 def update_page_properties(page_id: str, properties_json: str):
@@ -1198,7 +2848,7 @@ def update_page_properties(page_id: str, properties_json: str):
         properties_json: JSON string of properties to update,
             e.g. '{"Status": "done", "Priority": "high"}'
     """
-    resp = requests.get(f"{BASE_URL}/v1/pages/{page_id}", headers=HEADERS)
+    resp = get_client().get(f"/v1/pages/{page_id}")
     if resp.status_code != 200:
         print(f"Error getting page: {resp.status_code}")
         try:
@@ -1226,11 +2876,12 @@ def update_page_properties(page_id: str, properties_json: str):
     db_properties = {}
 
     if database_id:
-        resp = requests.get(f"{BASE_URL}/v1/databases/{database_id}", headers=HEADERS)
-        if resp.status_code == 200:
-            db_properties = resp.json().get("properties", {})
-        else:
-            print(f"Warning: Could not fetch database schema: {resp.status_code}")
+        # A database row carries every schema property with its type, so the
+        # page just fetched answers type lookups without a schema round-trip.
+        db_properties = {
+            name: {"type": value.get("type")}
+            for name, value in page.get("properties", {}).items()
+        }
 
     for prop_name, prop_value in properties_dict.items():
         if prop_name.lower() in ["title", "name"]:
@@ -1242,7 +2893,7 @@ def update_page_properties(page_id: str, properties_json: str):
             prop_info = db_properties[prop_name]
             prop_type = prop_info.get("type")
 
-            if prop_type in ["created_by", "created_time", "last_edited_by", "last_edited_time", "formula", "rollup"]:
+            if prop_type in AUTO_POPULATED_TYPES:
                 print(f"Warning: Property '{prop_name}' is auto-populated, skipping")
                 continue
         elif db_properties:
@@ -1267,7 +2918,7 @@ def update_page_properties(page_id: str, properties_json: str):
         return
 
     payload = {"properties": built_properties}
-    resp = requests.patch(f"{BASE_URL}/v1/pages/{page_id}", headers=HEADERS, json=payload)
+    resp = get_client().patch(f"/v1/pages/{page_id}", json=payload)
 
     if resp.status_code == 200:
         updated_page = resp.json()
@@ -1297,18 +2948,12 @@ def list_children(page_id: str, output_format: str = "human"):
         page_id: Parent page ID
         output_format: 'human' for readable output, 'json' for machine-readable
     """
-    # Get all blocks (paginated)
-    all_blocks = []
-    url = f"{BASE_URL}/v1/blocks/{page_id}/children?page_size=100"
-    while url:
-        resp = requests.get(url, headers=HEADERS)
-        if resp.status_code != 200:
-            print(f"Error: {resp.status_code}")
-            print(resp.text)
-            return
-        data = resp.json()
-        all_blocks.extend(data.get("results", []))
-        url = f"{BASE_URL}/v1/blocks/{page_id}/children?page_size=100&start_cursor={data['next_cursor']}" if data.get("has_more") else None
+    # Get all blocks (paginated, or from cache if the page is unchanged)
+    try:
+        all_blocks = fetch_block_tree(page_id, max_depth=1, last_edited_time=_current_edited_time(page_id))
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
 
     # Filter child_page blocks
     child_pages = [b for b in all_blocks if b.get("type") == "child_page"]
@@ -1326,7 +2971,7 @@ def list_children(page_id: str, output_format: str = "human"):
     for block in child_pages:
         title = block.get("child_page", {}).get("title", "")
         # Also fetch public_url
-        page_resp = requests.get(f"{BASE_URL}/v1/pages/{block['id']}", headers=HEADERS)
+        page_resp = get_client().get(f"/v1/pages/{block['id']}")
         public_url = ""
         if page_resp.status_code == 200:
             public_url = page_resp.json().get("public_url", "") or ""
@@ -1337,9 +2982,8 @@ def list_children(page_id: str, output_format: str = "human"):
 
 def list_databases():
     """List all accessible databases."""
-    resp = requests.post(
-        f"{BASE_URL}/v1/search",
-        headers=HEADERS,
+    resp = get_client().post(
+        "/v1/search",
         json={"filter": {"property": "object", "value": "database"}},
     )
     if resp.status_code != 200:
@@ -1358,6 +3002,14 @@ def list_databases():
 
 def main():
     parser = argparse.ArgumentParser(description="Notion API CLI")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help=f"HTTP connection pool size (default {POOL_SIZE}, env NOTION_POOL_SIZE)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT, help=f"Max sustained requests/second (default {RATE_LIMIT:g}, env NOTION_RATE_LIMIT; 0 disables)")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, help=f"Retries on 429/409/5xx (default {MAX_RETRIES}, env NOTION_MAX_RETRIES)")
+    parser.add_argument("--cache", choices=["use", "refresh", "off"], default=CACHE_MODE,
+                        help="Block cache: use (revalidate by last_edited_time), refresh (refetch and rewrite), off (env NOTION_CACHE)")
+    parser.add_argument("--timing", action="store_true", help="Print request count and latency summary to stderr on exit")
+    parser.add_argument("--trace", default=os.getenv("NOTION_TRACE"),
+                        help="Write one JSON line per request, then a summary line, to this file ('-' for stderr; env NOTION_TRACE)")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # verify
@@ -1366,10 +3018,21 @@ def main():
     # search
     p_search = subparsers.add_parser("search", help="Search content")
     p_search.add_argument("query", help="Search query")
+    p_search.add_argument("--local", action="store_true", help="Search the local full-text index (see `index`) without calling the API")
+    p_search.add_argument("--limit", type=int, default=20, help="Max results for --local (default 20)")
+    p_search.add_argument("--json", action="store_true", help="Output JSON for machine parsing")
+
+    # index
+    p_index = subparsers.add_parser("index", help="Update the local search index (only pages changed since the last run)")
+    p_index.add_argument("--full", action="store_true", help="Revisit every page and drop ones no longer shared")
+    p_index.add_argument("--rebuild", action="store_true", help="Clear the index, then crawl everything")
+    p_index.add_argument("--workers", type=int, default=4, help="Pages fetched concurrently (default 4)")
 
     # read-page
     p_read = subparsers.add_parser("read-page", help="Read page content")
     p_read.add_argument("page_id", help="Page ID")
+    p_read.add_argument("--depth", type=int, default=None, help="Nesting levels to fetch (1 = top-level only; default: all)")
+    p_read.add_argument("--workers", type=int, default=TREE_WORKERS, help=f"Concurrent child fetches (default {TREE_WORKERS})")
 
     # query-db
     p_query = subparsers.add_parser("query-db", help="Query database")
@@ -1377,6 +3040,9 @@ def main():
     p_query.add_argument("--filter", "-F", help='Filter JSON, e.g. \'{"property": "Status", "select": {"equals": "done"}}\'')
     p_query.add_argument("--sort", "-S", help='Sort JSON, e.g. \'[{"property": "Created", "direction": "descending"}]\'')
     p_query.add_argument("--page-size", type=int, default=100, help="Results per page (default 100, max 100)")
+    p_query.add_argument("--ndjson", action="store_true", help="Stream one flattened JSON row per line as results arrive")
+    p_query.add_argument("--limit", type=int, default=None, help="Stop after N rows")
+    p_query.add_argument("--fields", help="Comma-separated property names to include in --ndjson rows (default: all)")
 
     # get-db-schema
     p_schema = subparsers.add_parser("get-db-schema", help="Get database schema")
@@ -1391,6 +3057,9 @@ def main():
     # list-databases
     subparsers.add_parser("list-databases", help="List all accessible databases")
 
+    # cache-clear
+    subparsers.add_parser("cache-clear", help="Delete all cached blocks")
+
     # update-page
     p_update = subparsers.add_parser("update-page", help="Replace page content (default: full replace; --incremental: minimal diff)")
     p_update.add_argument("page_id", help="Page ID")
@@ -1401,6 +3070,7 @@ def main():
         action="store_true",
         help="Apply a minimal diff (keep unchanged blocks, only patch what differs). Public URL and page ID are preserved either way; this just avoids destroying unchanged blocks.",
     )
+    p_update.add_argument("--workers", type=int, default=TREE_WORKERS, help=f"Concurrent delete requests for --incremental (default {TREE_WORKERS})")
 
     # create-page (for creating under a page, not database)
     p_create = subparsers.add_parser("create-page", help="Create page under a page")
@@ -1423,6 +3093,23 @@ def main():
     p_db_item.add_argument("--content", "-c", help="Page content (text)")
     p_db_item.add_argument("--file", "-f", dest="content_file", help="Path to markdown file (overrides --content)")
 
+    # bulk-import
+    p_bulk = subparsers.add_parser("bulk-import", help="Create database items from a CSV or NDJSON file (resumable)")
+    p_bulk.add_argument("database_id", help="Database ID")
+    p_bulk.add_argument("file", help=".csv (header = property names) or .ndjson/.jsonl file")
+    p_bulk.add_argument("--title-column", help="Column holding the item title (default: schema's title property name)")
+    p_bulk.add_argument("--content-column", help="Column holding markdown page content")
+    p_bulk.add_argument("--workers", type=int, default=4, help="Concurrent create requests (default 4)")
+    p_bulk.add_argument("--checkpoint", help="Checkpoint file (default: FILE.checkpoint)")
+
+    # sync-dir
+    p_sync = subparsers.add_parser("sync-dir", help="Update pages mapped to a directory of markdown files (changed files only)")
+    p_sync.add_argument("directory", help="Directory of markdown files")
+    p_sync.add_argument("--manifest", help=f"Manifest JSON mapping files to page IDs (default: DIRECTORY/{SYNC_MANIFEST})")
+    p_sync.add_argument("--workers", type=int, default=4, help="Pages updated concurrently (default 4)")
+    p_sync.add_argument("--full", action="store_true", help="Update every mapped page, ignoring stored hashes")
+    p_sync.add_argument("--dry-run", action="store_true", help="List pages that would be updated without changing anything")
+
     # update-db-item-properties
     p_update_props = subparsers.add_parser("update-db-item-properties", help="Update page/database item properties")
     p_update_props.add_argument("page_id", help="Page ID to update")
@@ -1431,23 +3118,72 @@ def main():
 
     args = parser.parse_args()
 
+    # Concurrent commands need at least one pooled connection per worker.
+    pool_size = max(args.pool_size, getattr(args, "workers", 0) or 0)
+    set_cache_mode(args.cache)
+    trace = None
+    if args.trace:
+        trace = sys.stderr if args.trace == "-" else open(args.trace, "a", encoding="utf-8")
+    client = configure_client(pool_size=pool_size, rate_limit=args.rate_limit, max_retries=args.max_retries,
+                              trace=trace)
+    started = time.perf_counter()
+    try:
+        _dispatch(args)
+    finally:
+        wall = time.perf_counter() - started
+        if trace is not None:
+            trace.write(json.dumps(dict(client.stats(wall), command=args.command)) + "\n")
+            if trace is not sys.stderr:
+                trace.close()
+        if args.timing:
+            for line in client.report(wall):
+                print(f"[timing] {line}", file=sys.stderr)
+            if _cache is not None:
+                print(f"[timing] cache: {_cache.hits} hits, {_cache.misses} misses", file=sys.stderr)
+            if _schema_cache is not None:
+                print(f"[timing] schema cache: {_schema_cache.hits} hits, {_schema_cache.misses} misses", file=sys.stderr)
+        client.close()
+        if _cache is not None:
+            _cache.close()
+        if _schema_cache is not None:
+            _schema_cache.close()
+        if _search_index is not None:
+            _search_index.close()
+
+
+def _dispatch(args):
+    """Run the selected subcommand."""
     if args.command == "verify":
         verify()
     elif args.command == "search":
-        search(args.query)
+        search(args.query, args.local, args.limit, "json" if args.json else "human")
+    elif args.command == "index":
+        if args.rebuild:
+            get_search_index().clear()
+        index_workspace(args.full or args.rebuild, args.workers)
     elif args.command == "read-page":
-        read_page(args.page_id)
+        read_page(args.page_id, args.depth, args.workers)
     elif args.command == "query-db":
-        query_db(args.database_id, getattr(args, "filter", None), getattr(args, "sort", None), getattr(args, "page_size", 100))
+        fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None
+        query_db(args.database_id, getattr(args, "filter", None), getattr(args, "sort", None), getattr(args, "page_size", 100),
+                 "ndjson" if args.ndjson else "human", args.limit, fields)
     elif args.command == "get-db-schema":
         get_db_schema(args.database_id, "json" if args.json else "human")
     elif args.command == "list-children":
         list_children(args.page_id, "json" if args.json else "human")
     elif args.command == "list-databases":
         list_databases()
+    elif args.command == "cache-clear":
+        cache = get_cache()
+        if cache is None:
+            print("Cache is disabled.")
+        else:
+            cache.clear()
+            get_schema_cache().clear()
+            print(f"Cleared block and schema caches in {CACHE_DIR}")
     elif args.command == "update-page":
         if getattr(args, "incremental", False):
-            update_page_incremental(args.page_id, args.content, args.content_file)
+            update_page_incremental(args.page_id, args.content, args.content_file, args.workers)
         else:
             update_page(args.page_id, args.content, args.content_file)
     elif args.command == "create-page":
@@ -1467,6 +3203,11 @@ def main():
             with open(args.content_file, "r") as f:
                 content = f.read()
         create_db_item(args.database_id, args.title, args.properties, content)
+    elif args.command == "bulk-import":
+        bulk_import(args.database_id, args.file, args.title_column, args.content_column,
+                    args.workers, args.checkpoint)
+    elif args.command == "sync-dir":
+        sync_dir(args.directory, args.manifest, args.workers, args.full, args.dry_run)
     elif args.command == "update-db-item-properties":
         props_json = args.props
         if hasattr(args, "props_file") and args.props_file: